@@ -1,5 +1,36 @@
 from django.contrib import admin
+from django.contrib.auth import admin as auth_admin
+from django.contrib.auth.models import User
 
-# Register your models here.
+from core.admin import ScalableAdmin
+from .models import UserStats
 
 
+admin.site.unregister(User)
+
+
+@admin.register(User)
+class UserAdmin(ScalableAdmin, auth_admin.UserAdmin):
+    """The stock user admin's forms, with ScalableAdmin's changelist:
+    search by exact id or username, no group filter."""
+
+    list_filter = ("is_staff", "is_superuser", "is_active")
+    search_fields = ("id", "username")
+
+
+@admin.register(UserStats)
+class UserStatsAdmin(ScalableAdmin):
+    """Read-only: fix drift with ``manage.py check_user_stats --fix``."""
+
+    list_display = ("user", "posts", "comments", "likes_received", "karma")
+    list_select_related = ("user",)
+    search_fields = ("user__username", "user")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
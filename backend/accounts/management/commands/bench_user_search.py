@@ -0,0 +1,92 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from accounts import search
+from accounts.models import UserStats
+from core.benchmarks import benchmark_database, ms, percentile
+
+SYLLABLES = (
+    "al", "an", "ar", "ba", "be", "bo", "ca", "ce", "da", "de", "di", "el", "em", "en", "fa", "fi",
+    "ga", "gi", "ha", "he", "ia", "in", "ja", "jo", "ka", "ki", "la", "le", "li", "lo", "ma", "me",
+    "mi", "mo", "na", "ne", "ni", "no", "or", "pa", "pe", "ra", "re", "ri", "ro", "sa", "se", "si",
+    "ta", "te", "ti", "to", "va", "vi", "xa", "ya", "yo", "za", "ze", "zo",
+)
+
+
+def fake_username(index):
+    name = "".join(random.choices(SYLLABLES, k=random.randint(2, 4)))
+    if random.random() < 0.5:
+        name += random.choice(("_", "", ".")) + str(random.randint(1, 9999))
+    if random.random() < 0.2:
+        name = name.capitalize()
+    return f"{name}{index}" if random.random() < 0.1 else name
+
+
+class Command(BaseCommand):
+    help = (
+        "Type random usernames one keystroke at a time against --users "
+        "users on a throwaway database and report per-keystroke latency "
+        "of /accounts/search/ (cold trie, warm trie) and of the "
+        "username__istartswith query it replaces."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--typed", type=int, default=300, help="Usernames to type.")
+        parser.add_argument("--naive", type=int, default=200, help="Keystrokes to time the old query on.")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self.seed(options["users"])
+            names = list(
+                UserStats.objects.filter(user_id__in=random.sample(range(1, options["users"] + 1), options["typed"]))
+                .values_list("username_lower", flat=True)
+            )
+            keystrokes = [name[:length] for name in names for length in range(1, len(name) + 1)]
+            random.shuffle(keystrokes)
+
+            search.cache.clear()
+            self.report("index only (trie off)", keystrokes, lambda prefix: search._query(prefix, 20))
+            search.cache.clear()
+            self.report("with trie, first pass", keystrokes, lambda prefix: search.search(prefix, 10))
+            self.report("with trie, warm", keystrokes, lambda prefix: search.search(prefix, 10))
+            self.report("username__istartswith", keystrokes[:options["naive"]], self.naive)
+
+    def seed(self, count):
+        started = time.perf_counter()
+        start = (User.objects.aggregate(top=Max("id"))["top"] or 0) + 1
+        seen = set()
+        for offset in range(0, count, 10_000):
+            users, stats = [], []
+            for index in range(start + offset, start + min(offset + 10_000, count)):
+                name = fake_username(index)
+                if name.lower() in seen:
+                    name = f"{name}_{index}"
+                seen.add(name.lower())
+                users.append(User(id=index, username=name, password="!"))
+                # Heavy-tailed like real karma: most users have little.
+                stats.append(UserStats(user_id=index, username_lower=name.lower(), karma=int(random.paretovariate(1.2)) - 1))
+            User.objects.bulk_create(users, batch_size=5000)
+            UserStats.objects.bulk_create(stats, batch_size=5000)
+        self.stdout.write(f"Seeded {count:,} users in {time.perf_counter() - started:.1f}s")
+
+    def naive(self, prefix):
+        return list(
+            User.objects.filter(username__istartswith=prefix)
+            .order_by("-stats__karma").values_list("username", "stats__karma")[:20]
+        )
+
+    def report(self, label, keystrokes, lookup):
+        latencies = []
+        for prefix in keystrokes:
+            started = time.perf_counter()
+            lookup(prefix)
+            latencies.append(time.perf_counter() - started)
+        self.stdout.write(
+            f"  {label:<26} {len(latencies):6d} keystrokes  p50 {ms(percentile(latencies, 50)):>10}  "
+            f"p99 {ms(percentile(latencies, 99)):>10}  max {ms(max(latencies)):>10}"
+        )
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from accounts.stats import FIELDS, check
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every user's profile stats from the source tables in "
+        "batches and report rows that have drifted. --fix overwrites them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--fix", action="store_true", help="Store the recomputed values.")
+        parser.add_argument("--show", type=int, default=20, help="Drifted users to print in full.")
+
+    def handle(self, *args, **options):
+        drifted = 0
+        totals = dict.fromkeys(FIELDS, 0)
+        for user_id, stored, actual in check(options["batch_size"], fix=options["fix"]):
+            drifted += 1
+            for field in FIELDS:
+                totals[field] += abs(actual[field] - stored[field])
+            if drifted <= options["show"]:
+                changes = ", ".join(
+                    f"{field} {stored[field]} -> {actual[field]}"
+                    for field in FIELDS if stored[field] != actual[field]
+                )
+                self.stdout.write(f"user {user_id}: {changes}")
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("No drift."))
+            return
+        summary = ", ".join(f"{field} off by {total}" for field, total in totals.items() if total)
+        verb = "Fixed" if options["fix"] else "Found"
+        self.stdout.write(self.style.WARNING(f"{verb} {drifted} drifted users ({summary})."))
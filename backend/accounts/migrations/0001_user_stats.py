@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+import django.db.models.deletion
+
+
+def backfill(apps, schema_editor):
+    User = apps.get_model("auth", "User")
+    UserStats = apps.get_model("accounts", "UserStats")
+    Post = apps.get_model("posts", "Post")
+    Comment = apps.get_model("comments", "Comment")
+    Like = apps.get_model("likes", "Like")
+    KarmaTransaction = apps.get_model("karma", "KarmaTransaction")
+
+    stats = {user_id: UserStats(user_id=user_id) for user_id in User.objects.values_list("id", flat=True)}
+    for user_id, total in Post.objects.values_list("user_id").annotate(total=Count("*")):
+        stats[user_id].posts = total
+    for user_id, total in Comment.objects.values_list("author_id").annotate(total=Count("*")):
+        stats[user_id].comments = total
+    for owner in ("post__user_id", "comment__author_id"):
+        for user_id, total in Like.objects.filter(**{f"{owner}__isnull": False}).values_list(owner).annotate(total=Count("*")):
+            stats[user_id].likes_received += total
+    for user_id, total in KarmaTransaction.objects.values_list("user_id").annotate(total=Sum("points")):
+        stats[user_id].karma = total or 0
+    UserStats.objects.bulk_create(stats.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0006_soft_delete"),
+        ("comments", "0007_soft_delete"),
+        ("likes", "0002_alter_like_comment_alter_like_post_alter_like_user"),
+        ("karma", "0004_endpoint_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserStats",
+            fields=[
+                ("user", models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name="stats", serialize=False, to=settings.AUTH_USER_MODEL)),
+                ("posts", models.IntegerField(default=0)),
+                ("comments", models.IntegerField(default=0)),
+                ("likes_received", models.IntegerField(default=0)),
+                ("karma", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
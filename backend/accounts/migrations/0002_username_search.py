@@ -0,0 +1,42 @@
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Lower
+
+
+def backfill(apps, schema_editor):
+    User = apps.get_model("auth", "User")
+    UserStats = apps.get_model("accounts", "UserStats")
+
+    # Users who never posted, commented or got a like have no row yet;
+    # search needs one for everybody.
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id) for user_id in User.objects.filter(stats__isnull=True).values_list("id", flat=True)),
+        batch_size=2000,
+    )
+    UserStats.objects.update(
+        username_lower=Lower(Subquery(User.objects.filter(id=OuterRef("user_id")).values("username")[:1]))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0001_user_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userstats",
+            name="username_lower",
+            field=models.CharField(default="", max_length=150),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="userstats",
+            index=models.Index(
+                fields=["username_lower", "karma"],
+                name="userstats_username_prefix_idx",
+                opclasses=["text_pattern_ops", "int4_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_username_search"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="userstats",
+            name="userstats_username_prefix_idx",
+        ),
+        migrations.AddIndex(
+            model_name="userstats",
+            index=models.Index(
+                fields=["username_lower", "karma", "user"],
+                name="userstats_username_prefix_idx",
+                opclasses=["text_pattern_ops", "int4_ops", "int8_ops"],
+            ),
+        ),
+    ]
@@ -1,3 +1,43 @@
 from django.db import models
+from django.contrib.auth.models import User
 
-# Create your models here.
+
+class UserStats(models.Model):
+    """Profile numbers, kept current by the write paths via ``accounts.stats``.
+
+    Counts cover rows that still exist: deleted posts and comments (and the
+    likes and karma they earned) drop out when reap_deleted removes them.
+    ``check_user_stats`` recomputes them from the source tables.
+
+    ``likes_received`` and ``karma`` move after the like commits, so a
+    popular user's row isn't locked for the length of every like. ``karma``
+    is the copy search ranks by; the counter in ``counters.sharded`` stays
+    the one the profile shows.
+
+    ``username_lower`` is the username lowercased, for prefix search
+    ranked by karma (``accounts.search``). Every user gets a row when they
+    are created, and renames carry over (``accounts.signals``); for rows
+    written around the ORM, ``check_user_stats --fix`` realigns them.
+    """
+
+    user = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name="stats")
+    posts = models.IntegerField(default=0)
+    comments = models.IntegerField(default=0)
+    likes_received = models.IntegerField(default=0)
+    karma = models.IntegerField(default=0)
+    username_lower = models.CharField(max_length=150, default="")
+
+    class Meta:
+        indexes = [
+            # Prefix ranges of username_lower (text_pattern_ops: LIKE 'ab%'
+            # can use it under any collation), with karma and user_id
+            # along so ranking the matches is an index-only scan.
+            models.Index(
+                fields=["username_lower", "karma", "user"],
+                name="userstats_username_prefix_idx",
+                opclasses=["text_pattern_ops", "int4_ops", "int8_ops"],
+            ),
+        ]
+
+    def __str__(self):
+        return f"Stats for user {self.user_id}"
@@ -0,0 +1,119 @@
+# Username prefix search for finding people and @-mention autocomplete.
+#
+# Matches come from UserStats.username_lower through its (username_lower,
+# karma, user_id) index, best karma first. Short prefixes match the most users and
+# are typed the most, so the results for prefixes up to
+# USER_SEARCH_CACHE_PREFIX characters are kept per process in a trie for
+# USER_SEARCH_CACHE_TTL seconds. A cached result with fewer than
+# USER_SEARCH_MAX_LIMIT users holds every match, so longer prefixes under
+# it are answered by filtering it without a query.
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+
+from .models import UserStats
+
+
+def normalize(query):
+    """The prefix to look up: ``@Ali`` and ``ali`` both search ``ali``."""
+    return query.strip().lstrip("@").lower()
+
+
+def _matching(prefix):
+    if connection.vendor == "postgresql":
+        # LIKE 'ab%' on the text_pattern_ops index.
+        return UserStats.objects.filter(username_lower__startswith=prefix)
+    # SQLite only uses an index for LIKE on NOCASE columns; a range on
+    # the lowercased column is the same set of rows.
+    return UserStats.objects.filter(username_lower__gte=prefix, username_lower__lt=prefix + "\U0010ffff")
+
+
+def _query(prefix, limit):
+    rows = list(
+        _matching(prefix).order_by("-karma", "username_lower")
+        .values_list("user_id", "username_lower", "karma")[:limit]
+    )
+    usernames = dict(User.objects.filter(id__in=[row[0] for row in rows]).values_list("id", "username"))
+    return [
+        (usernames[user_id], lower, karma)
+        for user_id, lower, karma in rows
+        if user_id in usernames
+    ]
+
+
+class PrefixCache:
+    """Trie of prefixes to ``(expires, results)``. Each node is a dict of
+    children by character with the node's entry under the key None. Past
+    ``max_entries`` entries the whole trie is dropped and refills with
+    whatever is hot."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.root = {}
+        self.entries = 0
+        self.lock = threading.Lock()
+
+    def get(self, prefix, complete_size):
+        """Fresh results for ``prefix``: its own entry, or those of the
+        deepest complete ancestor that start with it. None if neither."""
+        now = time.monotonic()
+        node = self.root
+        inherited = None
+        for char in prefix:
+            entry = node.get(None)
+            if entry and entry[0] > now and len(entry[1]) < complete_size:
+                inherited = entry[1]
+            node = node.get(char)
+            if node is None:
+                break
+        else:
+            entry = node.get(None)
+            if entry and entry[0] > now:
+                return entry[1]
+        if inherited is None:
+            return None
+        return [row for row in inherited if row[1].startswith(prefix)]
+
+    def put(self, prefix, results, ttl):
+        with self.lock:
+            node = self._node(prefix)
+            if None not in node:
+                # Replacing an entry doesn't grow the trie.
+                if self.entries >= self.max_entries:
+                    self.root = {}
+                    self.entries = 0
+                    node = self._node(prefix)
+                self.entries += 1
+            node[None] = (time.monotonic() + ttl, results)
+
+    def _node(self, prefix):
+        node = self.root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        return node
+
+    def clear(self):
+        with self.lock:
+            self.root = {}
+            self.entries = 0
+
+
+cache = PrefixCache(settings.USER_SEARCH_CACHE_SIZE)
+
+
+def search(query, limit):
+    """``[(username, karma), ...]`` of up to ``limit`` users whose name
+    starts with ``query``, most karma first."""
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    size = settings.USER_SEARCH_MAX_LIMIT
+    results = cache.get(prefix, size)
+    if results is None:
+        results = _query(prefix, size)
+        if len(prefix) <= settings.USER_SEARCH_CACHE_PREFIX:
+            cache.put(prefix, results, settings.USER_SEARCH_CACHE_TTL)
+    return [(username, karma) for username, _, karma in results[:limit]]
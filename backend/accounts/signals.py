@@ -0,0 +1,19 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import UserStats
+
+
+@receiver(post_save, sender=User)
+def keep_searchable(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Give every new user a stats row, however they were created
+    (``createsuperuser``, the admin, the API), so prefix search finds
+    them before any stats are bumped; carry renames over to it."""
+    if raw:
+        return
+    lower = instance.username.lower()
+    if created:
+        UserStats.objects.bulk_create([UserStats(user=instance, username_lower=lower)], ignore_conflicts=True)
+    elif update_fields is None or "username" in update_fields:
+        UserStats.objects.filter(user=instance).exclude(username_lower=lower).update(username_lower=lower)
@@ -0,0 +1,126 @@
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from comments.models import Comment
+from karma.models import KarmaTransaction
+from likes.models import Like
+from posts.models import Post
+from .models import UserStats
+
+FIELDS = ("posts", "comments", "likes_received", "karma")
+
+
+def bump(user_id, **deltas):
+    """Add ``deltas`` (e.g. ``posts=1``) to a user's stats row, creating it
+    if needed. Call inside the transaction that makes the change.
+
+    Unlike the like counters this is a single row per user, so concurrent
+    likes for the same user queue on it for the length of their transaction.
+    """
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+    rows = UserStats.objects.filter(user_id=user_id)
+    if not rows.update(**changes):
+        username = User.objects.filter(id=user_id).values_list("username", flat=True).first() or ""
+        try:
+            with transaction.atomic():
+                UserStats.objects.create(user_id=user_id, username_lower=username.lower(), **deltas)
+        except IntegrityError:
+            # Someone else created the row between our update and insert.
+            rows.update(**changes)
+
+
+def bump_after_commit(user_id, **deltas):
+    """``bump`` once the current transaction commits, in its own short
+    statement. For stats of a user other than the writer (likes received,
+    karma): many likes for one popular user would otherwise queue on the
+    row for the length of each like's transaction. A crash between the
+    commit and the bump leaves drift for ``check_user_stats`` to fix."""
+    if any(deltas.values()):
+        transaction.on_commit(lambda: bump(user_id, **deltas))
+
+
+def recompute(user_ids):
+    """``{user_id: {field: value}}`` from the source tables, one aggregate
+    query per field for the whole batch."""
+    actual = {user_id: dict.fromkeys(FIELDS, 0) for user_id in user_ids}
+    queries = (
+        ("posts", Post.objects.filter(user_id__in=user_ids).values_list("user_id").annotate(total=Count("*"))),
+        ("comments", Comment.objects.filter(author_id__in=user_ids).values_list("author_id").annotate(total=Count("*"))),
+        ("likes_received", Like.objects.filter(post__user_id__in=user_ids).values_list("post__user_id").annotate(total=Count("*"))),
+        ("likes_received", Like.objects.filter(comment__author_id__in=user_ids).values_list("comment__author_id").annotate(total=Count("*"))),
+        ("karma", KarmaTransaction.objects.filter(user_id__in=user_ids).values_list("user_id").annotate(total=Sum("points"))),
+    )
+    for field, query in queries:
+        for user_id, total in query:
+            actual[user_id][field] += total or 0
+    return actual
+
+
+def _check_batch(user_ids, fix):
+    stored = {
+        row["user_id"]: row
+        for row in UserStats.objects.filter(user_id__in=user_ids).values("user_id", *FIELDS)
+    }
+    actual = recompute(user_ids)
+    drift = []
+    for user_id in user_ids:
+        have = stored.get(user_id, dict.fromkeys(FIELDS, 0))
+        want = actual[user_id]
+        if any(have[field] != want[field] for field in FIELDS):
+            drift.append((user_id, {field: have[field] for field in FIELDS}, want))
+            if fix:
+                UserStats.objects.filter(user_id=user_id).update(**want)
+    return drift
+
+
+def _fix_usernames(users):
+    """Realign username_lower after renames (e.g. in the admin)."""
+    stored = dict(
+        UserStats.objects.filter(user_id__in=[user_id for user_id, _ in users])
+        .values_list("user_id", "username_lower")
+    )
+    for user_id, username in users:
+        if stored.get(user_id) != username.lower():
+            UserStats.objects.filter(user_id=user_id).update(username_lower=username.lower())
+
+
+def check(batch_size=1000, fix=False, progress=None):
+    """Recompute every user's stats in batches of ``batch_size`` users and
+    yield ``(user_id, stored, actual)`` for each one that has drifted.
+
+    With ``fix=True`` drifted rows are overwritten, missing ones created
+    and stale ``username_lower`` values realigned. Each batch's rows are
+    locked first, so a write that bumps one of them waits until the batch
+    is done instead of being lost under the recomputed value.
+    """
+    last_id = 0
+    while True:
+        users = list(
+            User.objects.filter(id__gt=last_id).order_by("id").values_list("id", "username")[:batch_size]
+        )
+        if not users:
+            return
+        user_ids = [user_id for user_id, _ in users]
+        if fix:
+            with transaction.atomic():
+                UserStats.objects.bulk_create(
+                    [UserStats(user_id=user_id, username_lower=username.lower()) for user_id, username in users],
+                    ignore_conflicts=True,
+                )
+                list(UserStats.objects.select_for_update().filter(user_id__in=user_ids).values_list("pk"))
+                drift = _check_batch(user_ids, fix)
+                _fix_usernames(users)
+        else:
+            drift = _check_batch(user_ids, fix)
+        yield from drift
+        last_id = user_ids[-1]
+        if progress:
+            progress(last_id)
+
+
+def rebuild(batch_size=1000):
+    """Recompute and store every user's stats; returns how many were wrong."""
+    return sum(1 for _ in check(batch_size, fix=True))
@@ -1,3 +1,195 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core import testing
+from core.testing import PASSWORD, Endpoint
+from posts.models import Post
+from . import search
+from .models import UserStats
+
+
+class AccountQueryBudgetTests(testing.QueryBudgetTestCase):
+    endpoints = [
+        Endpoint("GET", "/accounts/{username}/"),
+        Endpoint("GET", "/accounts/search/?q=m"),
+        Endpoint("GET", "/accounts/search/?q=member1"),
+        Endpoint("GET", "/accounts/search/?q=@pro", anonymous=True),
+        Endpoint("POST", "/accounts/register/", {"username": "newcomer", "password": PASSWORD}, anonymous=True),
+        Endpoint("POST", "/accounts/login/", {"username": "{username}", "password": PASSWORD}, anonymous=True),
+        Endpoint("POST", "/accounts/token/", {"username": "{username}", "password": PASSWORD}, anonymous=True),
+        Endpoint("POST", "/accounts/token/refresh/", {"refresh": "{refresh}"}, anonymous=True),
+        Endpoint("POST", "/accounts/logout/"),
+        Endpoint("GET", "/admin/accounts/userstats/", user="admin", scales=True),
+        Endpoint("GET", "/admin/auth/user/", user="admin", scales=True),
+        Endpoint("GET", "/admin/auth/user/?q={username}", user="admin", scales=True),
+    ]
+
+
+class StatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user("owner")
+        self.fan = User.objects.create_user("fan")
+        self.post = Post.objects.create(user=self.owner, content="Hello")
+
+    def like(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                testing.client(self.fan).post(f"/likes/post/{self.post.id}/")
+        return callbacks, [query["sql"] for query in queries.captured_queries]
+
+    def test_like_leaves_the_owners_row_alone_until_commit(self):
+        callbacks, queries = self.like()
+        self.assertFalse([sql for sql in queries if "accounts_userstats" in sql])
+
+        for callback in callbacks:
+            callback()
+        stats_row = UserStats.objects.get(user=self.owner)
+        self.assertEqual((stats_row.karma, stats_row.likes_received), (5, 1))
+
+        for callback in self.like()[0]:
+            callback()
+        stats_row.refresh_from_db()
+        self.assertEqual((stats_row.karma, stats_row.likes_received), (0, 0))
+
+    def test_profile_karma_comes_from_the_counter(self):
+        self.like()  # never committed as far as UserStats knows
+        response = testing.client().get("/accounts/owner/")
+        self.assertEqual(response.data["karma"], 5)
+        self.assertEqual(response.data["likes_received"], 0)
+
+
+class PrefixCacheTests(SimpleTestCase):
+    rows = [("Alice", "alice", 9), ("alfred", "alfred", 5), ("Bob", "bob", 3)]
+
+    def test_complete_ancestors_answer_longer_prefixes(self):
+        trie = search.PrefixCache(10)
+        trie.put("a", self.rows[:2], 60)
+        self.assertEqual(trie.get("a", 3), self.rows[:2])
+        self.assertEqual(trie.get("alf", 3), [self.rows[1]])
+        self.assertEqual(trie.get("ab", 3), [])
+        # Two rows may be the first two of many matches.
+        self.assertIsNone(trie.get("alf", 2))
+        self.assertIsNone(trie.get("b", 3))
+
+    def test_entries_expire(self):
+        trie = search.PrefixCache(10)
+        with mock.patch("time.monotonic", return_value=100):
+            trie.put("a", self.rows[:2], 60)
+        with mock.patch("time.monotonic", return_value=159):
+            self.assertEqual(trie.get("al", 3), self.rows[:2])
+        with mock.patch("time.monotonic", return_value=160):
+            self.assertIsNone(trie.get("a", 3))
+            self.assertIsNone(trie.get("al", 3))
+
+    def test_full_trie_starts_over(self):
+        trie = search.PrefixCache(2)
+        trie.put("a", [], 60)
+        trie.put("b", [], 60)
+        trie.put("a", [], 60)
+        self.assertEqual(trie.entries, 2)
+        trie.put("c", [], 60)
+        self.assertEqual(trie.entries, 1)
+        self.assertIsNone(trie.get("a", 3))
+        self.assertEqual(trie.get("c", 3), [])
+
+
+@override_settings(USER_SEARCH_MAX_LIMIT=3, USER_SEARCH_CACHE_PREFIX=3)
+class UserSearchTests(TestCase):
+    names = {
+        "ann": 1, "Anna": 7, "annabel": 7, "anne": 3, "Anton": 12, "ant": 0,
+        "bo": 2, "Bob": 2, "bobby": 5, "zoë": 4, "Zoe": 1,
+    }
+
+    def setUp(self):
+        search.cache.clear()
+        self.addCleanup(search.cache.clear)
+        for name, karma in self.names.items():
+            user = User.objects.create_user(name)
+            UserStats.objects.filter(user=user).update(karma=karma)
+
+    def expected(self, prefix, limit):
+        rows = sorted(
+            (-karma, name.lower(), name) for name, karma in self.names.items() if name.lower().startswith(prefix)
+        )
+        return [(name, -karma) for karma, _, name in rows][:limit]
+
+    def prefixes(self):
+        found = {name.lower()[:end] for name in self.names for end in range(1, len(name) + 1)}
+        return sorted(found | {"annx", "c", "bobbyz"})
+
+    def test_cached_results_match_the_index(self):
+        for prefix in self.prefixes():
+            for limit in (1, 3):
+                self.assertEqual(search.search(prefix, limit), self.expected(prefix, limit), (prefix, limit))
+        # Again: the cached prefixes are answered from the trie, and the
+        # longer ones from it or the index, the same either way.
+        with self.assertNumQueries(0):
+            for prefix in self.prefixes():
+                if len(prefix) <= 3:
+                    self.assertEqual(search.search(prefix, 3), self.expected(prefix, 3), prefix)
+        for prefix in self.prefixes():
+            self.assertEqual(search.search(prefix, 3), self.expected(prefix, 3), prefix)
+
+    def test_prefixes_under_a_complete_entry_cost_no_queries(self):
+        search.search("z", 3)  # zoë and Zoe: every match
+        with self.assertNumQueries(0):
+            self.assertEqual(search.search("zo", 3), [("zoë", 4), ("Zoe", 1)])
+            self.assertEqual(search.search("@ZOË", 3), [("zoë", 4)])
+            self.assertEqual(search.search("zoex", 3), [])
+
+    def test_truncated_entries_are_not_filtered(self):
+        search.search("an", 3)  # Anton, Anna, annabel: three of six
+        search.search("bo", 3)  # bobby, Bob, bo: maybe not all of them
+        with self.assertNumQueries(2):
+            self.assertEqual(search.search("ann", 3), [("Anna", 7), ("annabel", 7), ("anne", 3)])
+        with self.assertNumQueries(2):
+            self.assertEqual(search.search("bob", 3), [("bobby", 5), ("Bob", 2)])
+
+    def test_api(self):
+        response = testing.client().get("/accounts/search/", {"q": "@zo", "limit": 5})
+        self.assertEqual(response.data, [{"username": "zoë", "karma": 4}, {"username": "Zoe", "karma": 1}])
+        self.assertEqual(testing.client().get("/accounts/search/", {"q": "@"}).data, [])
+        self.assertEqual(testing.client().get("/accounts/search/", {"q": "a", "limit": "x"}).status_code, 400)
+
+
+class StatsRowTests(TestCase):
+    def test_every_new_user_is_searchable(self):
+        search.cache.clear()
+        self.addCleanup(search.cache.clear)
+        User.objects.create_superuser("Root")
+        User.objects.create(username="Staffer")
+        self.assertEqual([name for name, _ in search.search("r", 5)], ["Root"])
+        self.assertEqual([name for name, _ in search.search("st", 5)], ["Staffer"])
+
+    def test_renames_carry_over(self):
+        user = User.objects.create_user("before")
+        user.last_login = None
+        user.save(update_fields=["last_login"])
+        user.username = "After"
+        user.save()
+        self.assertEqual(UserStats.objects.get(user=user).username_lower, "after")
+
+
+@override_settings(STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage")
+class UserAdminTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser("admin"))
+        self.users = [User.objects.create_user(name) for name in ("probe", "prober")]
+
+    def test_changelist_is_bounded_and_searches_exactly(self):
+        with self.settings(ADMIN_EXACT_COUNT_LIMIT=1):
+            response = self.client.get("/admin/auth/user/")
+        self.assertContains(response, "More than 1 users")
+        found = self.client.get("/admin/auth/user/", {"q": "probe"}).context["cl"].result_list
+        self.assertEqual(list(found), self.users[:1])
+
+    def test_user_forms_still_work(self):
+        response = self.client.get(f"/admin/auth/user/{self.users[0].id}/change/")
+        self.assertContains(response, "probe")
+        self.assertEqual(self.client.get("/admin/auth/user/add/").status_code, 200)
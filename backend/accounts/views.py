@@ -3,9 +3,17 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.db import transaction
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.shortcuts import get_object_or_404
+
+from counters import sharded
+from karma.leaderboard import get_leaderboard
+from . import search
+from .models import UserStats
 
 
 class LoginView(APIView):
@@ -60,7 +68,9 @@ class RegisterView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        user = User.objects.create_user(username=username, password=password)
+        with transaction.atomic():
+            # Creating the user also creates its stats row (accounts.signals).
+            user = User.objects.create_user(username=username, password=password)
         refresh = RefreshToken.for_user(user)
         return Response(
             {
@@ -72,3 +82,49 @@ class RegisterView(APIView):
             },
             status=status.HTTP_201_CREATED
         )
+
+
+class ProfileView(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request, username):
+        # One indexed lookup: username is unique and stats share the user's pk.
+        user = get_object_or_404(User.objects.select_related("stats"), username=username)
+        try:
+            stats = user.stats
+        except UserStats.DoesNotExist:
+            stats = UserStats(user=user)
+        # The rolling window lives in the leaderboard, not in the database.
+        _, karma_24h = get_leaderboard().rank("24h", user.id)
+
+        return Response({
+            "username": user.username,
+            "date_joined": user.date_joined,
+            "posts": stats.posts,
+            "comments": stats.comments,
+            "likes_received": stats.likes_received,
+            # The counter the like is written to; stats.karma trails it until
+            # the like's transaction commits.
+            "karma": sharded.get_count(sharded.USER_KARMA, user.id),
+            "karma_24h": karma_24h,
+        })
+
+
+class UserSearchView(APIView):
+    """Users whose name starts with ``q`` (a leading @ is ignored), most
+    karma first: people search and @-mention autocomplete."""
+
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        query = request.query_params.get("q", "")
+        try:
+            limit = int(request.query_params.get("limit", settings.USER_SEARCH_LIMIT))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+        limit = max(1, min(limit, settings.USER_SEARCH_MAX_LIMIT))
+
+        return Response([
+            {"username": username, "karma": karma}
+            for username, karma in search.search(query[:150], limit)
+        ])
@@ -0,0 +1,206 @@
+# Opt-in per-request profiling for production debugging.
+#
+# ProfilingMiddleware runs cProfile over a request that sends
+# PROFILING_HEADER with a token from ``manage.py profile_token``, and over
+# a PROFILING_SAMPLE_RATE fraction of all others, recording every SQL
+# statement it runs with its time. Streaming bodies are profiled until
+# the last chunk. Each profile is written to PROFILING_DIR as
+# <name>.prof (pstats format, for ``python -m pstats`` or snakeviz) and
+# <name>.json (endpoint, timings, SQL); only the newest
+# PROFILING_MAX_PROFILES are kept. ``profile_summary`` aggregates them.
+#
+# One request per process is profiled at a time: since Python 3.12
+# cProfile sees every thread and two profilers can't be active at once.
+import cProfile
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+from pathlib import Path
+
+import orjson
+from django.conf import settings
+from django.core import signing
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+SALT = "backend.profiling"
+RESPONSE_HEADER = "X-Profile-Id"
+
+_active = threading.Lock()
+
+
+def token(label):
+    """Value for PROFILING_HEADER; ``label`` (e.g. who asked) is stored
+    with every profile it triggers."""
+    return signing.TimestampSigner(salt=SALT).sign(label)
+
+
+def _requested(request):
+    """The label of a valid signed header, else None."""
+    value = request.headers.get(settings.PROFILING_HEADER)
+    if not value:
+        return None
+    try:
+        return signing.TimestampSigner(salt=SALT).unsign(value, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+
+
+class QueryLog:
+    """``connection.execute_wrapper`` that times every statement and keeps
+    the first PROFILING_MAX_QUERIES (without their parameters)."""
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            if len(self.queries) < settings.PROFILING_MAX_QUERIES:
+                self.queries.append({"sql": sql, "ms": round(elapsed * 1000, 3), "many": many})
+
+
+class _Capture:
+    def __init__(self, request, label):
+        self.request = request
+        self.label = label
+        self.name = f"{time.time_ns()}-{os.getpid()}"
+        self.profiler = cProfile.Profile()
+        self.queries = QueryLog()
+        self.seconds = 0.0
+        self.status = None
+        self.finished = False
+
+    def run(self, call, *args):
+        started = time.perf_counter()
+        with connection.execute_wrapper(self.queries):
+            self.profiler.enable()
+            try:
+                return call(*args)
+            finally:
+                self.profiler.disable()
+                self.seconds += time.perf_counter() - started
+
+    def finish(self):
+        """Store the profile; returns whether it was. A failure (full disk,
+        unwritable PROFILING_DIR) is logged and never fails the request."""
+        if self.finished:
+            return False
+        self.finished = True
+        try:
+            match = self.request.resolver_match
+            route = f"/{match.route}" if match else self.request.path
+            save(self.profiler, {
+                "name": self.name,
+                "endpoint": f"{self.request.method} {route}",
+                "path": self.request.get_full_path(),
+                "status": self.status,
+                "trigger": "header" if self.label is not None else "sample",
+                "label": self.label,
+                "at": time.time(),
+                "ms": round(self.seconds * 1000, 3),
+                "query_count": self.queries.count,
+                "query_ms": round(self.queries.seconds * 1000, 3),
+                "queries": self.queries.queries,
+            })
+            return True
+        except Exception:
+            logger.exception("Saving profile %s failed", self.name)
+            return False
+        finally:
+            _active.release()
+
+
+class _Stream:
+    """Streaming body that keeps profiling while it is produced. Django
+    closes it with the response, even when it is never read."""
+
+    def __init__(self, capture, content):
+        self.capture = capture
+        self.iterator = iter(content)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return self.capture.run(next, self.iterator)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        self.capture.finish()
+
+
+def save(profiler, meta):
+    """Write one profile and drop the oldest beyond PROFILING_MAX_PROFILES;
+    returns its name."""
+    directory = Path(settings.PROFILING_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    name = meta["name"]
+    profiler.dump_stats(directory / f"{name}.prof")
+    # The .json is what marks a profile complete, so it goes in last.
+    partial = directory / f"{name}.json.tmp"
+    partial.write_bytes(orjson.dumps(meta))
+    os.replace(partial, directory / f"{name}.json")
+
+    names = sorted(path.stem for path in directory.glob("*.json"))
+    for stale in names[:-settings.PROFILING_MAX_PROFILES]:
+        (directory / f"{stale}.json").unlink(missing_ok=True)
+        (directory / f"{stale}.prof").unlink(missing_ok=True)
+    return name
+
+
+def stored(directory=None):
+    """``(meta, pstats.Stats)`` for every complete profile, oldest first."""
+    directory = Path(directory or settings.PROFILING_DIR)
+    for path in sorted(directory.glob("*.json")):
+        try:
+            meta = orjson.loads(path.read_bytes())
+            stats = pstats.Stats(str(path.with_suffix(".prof")))
+        except (OSError, ValueError, EOFError):
+            continue  # trimmed by another process while we read it
+        yield meta, stats
+
+
+class ProfilingMiddleware:
+    """Profile requests that ask for it with a signed header, plus a
+    PROFILING_SAMPLE_RATE sample; the response names the stored profile in
+    X-Profile-Id. Costs one dict lookup on every other request."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        label = _requested(request)
+        if label is None and not random.random() < settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        if not _active.acquire(blocking=False):
+            return self.get_response(request)
+
+        capture = _Capture(request, label)
+        try:
+            response = capture.run(self.get_response, request)
+        except BaseException:
+            _active.release()
+            raise
+        capture.status = response.status_code
+        if response.streaming:
+            # Named up front: the profile is saved after the headers are sent.
+            response[RESPONSE_HEADER] = capture.name
+            response.streaming_content = _Stream(capture, response.streaming_content)
+        elif capture.finish():
+            response[RESPONSE_HEADER] = capture.name
+        return response
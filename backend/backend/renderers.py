@@ -0,0 +1,52 @@
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# orjson handles dicts, lists, str, int, float, UUID and datetimes natively.
+# Everything else (Decimal, QuerySet, lazy strings, timedelta, ...) goes
+# through DRF's encoder so the output matches JSONRenderer.
+_default = JSONEncoder().default
+
+# OPT_UTC_Z writes "...Z" instead of "+00:00", like DRF does.
+OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(data):
+    """Serialize ``data`` to JSON bytes, compatible with DRF's JSONRenderer."""
+    ret = orjson.dumps(data, default=_default, option=OPTIONS)
+    # JSONRenderer always escapes U+2028/U+2029 so the output stays a strict
+    # JavaScript subset; keep doing the same.
+    if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+        ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+    return ret
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Drop-in JSONRenderer backed by orjson.
+
+    Indented output (``Accept: application/json; indent=4`` or the
+    browsable API) still goes through the stdlib renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps(data)
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get("encoding", settings.DEFAULT_CHARSET)
+        if encoding.lower().replace("-", "") != "utf8":
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError("JSON parse error - %s" % str(exc))
@@ -0,0 +1,183 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.query import QuerySet
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+PREFIX = "resp"
+OUTCOMES = ("hit", "miss", "stale")
+
+# How long a rebuild may hold the lock before another request may try.
+LOCK_TIMEOUT = 30
+
+
+def _gen_key(group):
+    return f"{PREFIX}:gen:{group}"
+
+
+def _stat_key(name, outcome):
+    return f"{PREFIX}:stats:{name}:{outcome}"
+
+
+def _record(name, outcome):
+    key = _stat_key(name, outcome)
+    if not cache.add(key, 1, None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+def invalidate(*groups):
+    """Mark every cached response in ``groups`` as out of date.
+
+    Entries aren't deleted: the next anonymous request rebuilds one while
+    concurrent requests keep getting the old copy. The generation is bumped
+    now and again on commit, so a rebuild that raced the write and cached
+    pre-commit data is thrown away too.
+    """
+    def bump():
+        cache.set_many({_gen_key(group): time.time_ns() for group in groups}, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def stats():
+    """``{name: {"hit": n, "miss": n, "stale": n}}`` for every cached view seen."""
+    names = cache.get(f"{PREFIX}:stats:names") or set()
+    keys = [_stat_key(name, outcome) for name in names for outcome in OUTCOMES]
+    values = cache.get_many(keys)
+    return {
+        name: {outcome: values.get(_stat_key(name, outcome), 0) for outcome in OUTCOMES}
+        for name in sorted(names)
+    }
+
+
+def _register(name):
+    names = cache.get(f"{PREFIX}:stats:names") or set()
+    if name not in names:
+        cache.set(f"{PREFIX}:stats:names", names | {name}, None)
+
+
+def _to_entry(response, gen, ttl):
+    entry = {"gen": gen, "fresh_until": time.time() + ttl, "status": response.status_code}
+    if isinstance(response, Response):
+        data = response.data
+        if isinstance(data, QuerySet):
+            data = list(data)
+        entry["data"] = data
+    else:
+        entry["content"] = response.content
+        entry["content_type"] = response["Content-Type"]
+    return entry
+
+
+def _from_entry(entry, outcome):
+    if "data" in entry:
+        response = Response(entry["data"], status=entry["status"])
+    else:
+        response = HttpResponse(
+            entry["content"], status=entry["status"], content_type=entry["content_type"]
+        )
+    response["X-Cache"] = outcome.upper()
+    return response
+
+
+def _entry_key(group_name, request, params):
+    """Only the path and the query parameters the view reads count, in a
+    fixed order, so ``?x=1`` or a reordered query string hits the same entry."""
+    query = [(param, request.GET.get(param)) for param in params if param in request.GET]
+    raw = request.path + "?" + "&".join(f"{param}={value}" for param, value in query)
+    digest = hashlib.md5(raw.encode(), usedforsecurity=False).hexdigest()
+    return f"{PREFIX}:{group_name}:{digest}"
+
+
+def _wait_for(entry_key, gen):
+    """Poll for the entry another request is building, up to
+    RESPONSE_CACHE_COLD_WAIT seconds; None if it doesn't show up."""
+    deadline = time.monotonic() + settings.RESPONSE_CACHE_COLD_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        entry = cache.get(entry_key)
+        if entry is not None and entry["gen"] == gen:
+            return entry
+    return None
+
+
+def cached_get(group, params=()):
+    """Cache an APIView ``get`` for anonymous users.
+
+    ``group`` is formatted with the URL kwargs (e.g. ``"comments:{post_id}"``)
+    and is what write views pass to ``invalidate``. Its first part names the
+    entry in RESPONSE_CACHE_TTL. ``params`` are the query parameters the
+    view reads; any others are left out of the key. Entries are fresh for
+    that many seconds and may then be served stale for
+    RESPONSE_CACHE_STALE_TTL more while a single request rebuilds them.
+    When there is no entry at all, requests that arrive during the rebuild
+    wait up to RESPONSE_CACHE_COLD_WAIT for it instead of all running the
+    view. Authenticated requests and streaming responses always bypass the
+    cache.
+
+    Invalidation only reaches the processes sharing the cache: with the
+    LocMemCache fallback each gunicorn worker keeps its own entries, which
+    can be up to RESPONSE_CACHE_TTL old after a write. Set REDIS_URL in
+    production.
+    """
+    def decorator(view):
+        name = group.split(":")[0]
+
+        @functools.wraps(view)
+        def wrapper(self, request, *args, **kwargs):
+            if request.user.is_authenticated:
+                return view(self, request, *args, **kwargs)
+
+            group_name = group.format(**kwargs)
+            entry_key = _entry_key(group_name, request, params)
+            lock_key = f"{entry_key}:lock"
+            gen_key = _gen_key(group_name)
+
+            values = cache.get_many([entry_key, gen_key])
+            entry = values.get(entry_key)
+            gen = values.get(gen_key, 0)
+
+            if entry is not None and entry["gen"] == gen and entry["fresh_until"] > time.time():
+                _record(name, "hit")
+                return _from_entry(entry, "hit")
+
+            locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+            if entry is not None and not locked:
+                # Someone else is already rebuilding this entry.
+                _record(name, "stale")
+                return _from_entry(entry, "stale")
+            if not locked:
+                entry = _wait_for(entry_key, gen)
+                if entry is not None:
+                    _record(name, "hit")
+                    return _from_entry(entry, "hit")
+
+            _register(name)
+            _record(name, "miss")
+            try:
+                response = view(self, request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    ttl = settings.RESPONSE_CACHE_TTL[name]
+                    cache.set(
+                        entry_key,
+                        _to_entry(response, gen, ttl),
+                        ttl + settings.RESPONSE_CACHE_STALE_TTL,
+                    )
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+            response["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorator
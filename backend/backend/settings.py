@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 import dj_database_url
 from corsheaders.defaults import default_headers
 
@@ -41,7 +42,12 @@ INSTALLED_APPS = [
     "posts",
     "comments",
     "karma",
-    
+    "counters",
+    "notifications",
+    "sync",
+    "impressions",
+    "core",
+
     'cloudinary',
     'cloudinary_storage',
 ]
@@ -55,6 +61,12 @@ MIDDLEWARE = [
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
 
+    # Opt-in request profiles (PROFILING below); outside everything it measures.
+    "backend.profiling.ProfilingMiddleware",
+
+    # Brotli/gzip for API responses; must wrap everything that writes bodies.
+    "backend.middleware.CompressionMiddleware",
+
     # 🔥 REQUIRED for Cloud Run static files
     "whitenoise.middleware.WhiteNoiseMiddleware",
 
@@ -97,13 +109,15 @@ WSGI_APPLICATION = "backend.wsgi.application"
 # ================================
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Off for a local Postgres without TLS (docker-compose, CI).
+DATABASE_SSL_REQUIRE = os.getenv("DATABASE_SSL_REQUIRE", "True").lower() == "true"
 
 if DATABASE_URL:
     DATABASES = {
         "default": dj_database_url.parse(
             DATABASE_URL,
             conn_max_age=600,
-            ssl_require=True,
+            ssl_require=DATABASE_SSL_REQUIRE,
         )
     }
 else:
@@ -116,6 +130,55 @@ else:
     }
 
 
+# Postgres only: Like and KarmaTransaction become tables partitioned by
+# month on created_at, so time-window queries touch only recent months.
+# Read by the likes/karma partitioning migrations (or run
+# `manage.py manage_partitions --convert` later); keep
+# PARTITION_MONTHS_AHEAD months created ahead with the same command.
+DB_PARTITION_BY_MONTH = os.getenv("DB_PARTITION_BY_MONTH", "False").lower() == "true"
+PARTITION_MONTHS_AHEAD = 3
+
+
+# ================================
+# CACHE
+# ================================
+
+# Redis when REDIS_URL is set (shared by all gunicorn workers), otherwise
+# per-process local memory, which is what dev and the test suite use.
+# Without Redis, invalidating cached responses, counters and unread counts
+# only reaches the worker that made the write; the others catch up when
+# their entries expire.
+REDIS_URL = os.getenv("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "playto",
+        }
+    }
+
+# Anonymous response cache for the public GET endpoints (seconds). Entries
+# are served stale for RESPONSE_CACHE_STALE_TTL more while one request
+# rebuilds them.
+RESPONSE_CACHE_TTL = {
+    "feed": 10,
+    "comments": 10,
+    "leaderboard": 30,
+}
+RESPONSE_CACHE_STALE_TTL = 60
+# A request that finds no entry while another one is building it waits this
+# long (seconds) for it before running the view itself.
+RESPONSE_CACHE_COLD_WAIT = 2
+
+
 # ================================
 # PASSWORD VALIDATION
 # ================================
@@ -151,10 +214,11 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 # ================================
 # MEDIA FILES Cloudnairy
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
+# ================================
 
+# The SDK is imported by whatever uses it (CloudinaryField, the storage
+# backend) rather than here, so settings stay cheap to load; it reads its
+# credentials from the CLOUDINARY_* environment variables.
 
 CLOUDINARY_STORAGE = {
     'CLOUD_NAME': os.getenv("CLOUDINARY_CLOUD_NAME"),
@@ -162,7 +226,15 @@ CLOUDINARY_STORAGE = {
     'API_SECRET': os.getenv("CLOUDINARY_API_SECRET"),
 }
 
-DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+# Cloudinary when it is configured; otherwise files (e.g. image variants)
+# go to MEDIA_ROOT so uploads also work offline.
+if os.getenv("CLOUDINARY_URL") or os.getenv("CLOUDINARY_CLOUD_NAME"):
+    DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
+else:
+    DEFAULT_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
+
+MEDIA_URL = "/media/"
+MEDIA_ROOT = BASE_DIR / "media"
 
 
 
@@ -170,6 +242,22 @@ DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 GS_QUERYSTRING_AUTH = False
 
 
+# ================================
+# POST IMAGES
+# ================================
+
+# Variants generated at upload (posts.images). Formats this Pillow build
+# can't encode are skipped; AVIF needs Pillow 11.3+ wheels or libavif.
+POST_IMAGE_WIDTHS = (320, 640, 1080)
+POST_IMAGE_FORMATS = ("avif", "webp")
+POST_IMAGE_ENCODER_OPTIONS = {
+    "webp": {"quality": 75, "method": 4},
+    "avif": {"quality": 50, "speed": 8},
+}
+POST_IMAGE_PLACEHOLDER_WIDTH = 16
+POST_IMAGE_MAX_PIXELS = 40_000_000
+
+
 # ================================
 # DJANGO REST
 # ================================
@@ -181,9 +269,195 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "backend.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "backend.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 
+# ================================
+# ADMIN
+# ================================
+
+# Changelists count matching rows up to this many, then show the
+# planner's estimate (Postgres) or "More than ..." instead.
+ADMIN_EXACT_COUNT_LIMIT = 10_000
+
+
+# ================================
+# BATCH API
+# ================================
+
+# POST /batch/ runs up to this many GETs; with "parallel": true they are
+# spread over up to BATCH_MAX_WORKERS threads, each with its own DB
+# connection, which pays off when the database is a network hop away.
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+# Sub-requests may only target the API under these prefixes: not the
+# admin, and not /batch/ itself.
+BATCH_PATH_PREFIXES = (
+    "/posts/", "/comments/", "/likes/", "/leaderboard/", "/accounts/",
+    "/notifications/", "/sync/", "/impressions/",
+)
+
+
+# ================================
+# RESPONSE COMPRESSION
+# ================================
+
+# Bodies smaller than this aren't worth the CPU or the extra headers.
+COMPRESSION_MIN_SIZE = 1024
+# 4-5 is the usual sweet spot for on-the-fly brotli.
+COMPRESSION_BROTLI_QUALITY = 5
+
+
+# ================================
+# SHARDED COUNTERS
+# ================================
+
+# Rows per counter. More shards = less lock contention on hot posts,
+# slightly more rows to sum on a cache miss.
+COUNTER_SHARDS = int(os.getenv("COUNTER_SHARDS", "16"))
+# A write drops the cached total in the cache it can reach. Without Redis
+# that is only its own worker's, so a like toggled there would show the
+# old count from the others until the entry expires: keep it to seconds.
+COUNTER_CACHE_TIMEOUT = 60 if REDIS_URL else 3
+
+
+# ================================
+# DELETION
+# ================================
+
+# DELETE only hides content; `manage.py reap_deleted` (run it from cron)
+# removes it this many rows per transaction, pausing between batches.
+REAP_BATCH_SIZE = 500
+REAP_PAUSE_MS = 50
+
+
+# ================================
+# LEADERBOARD
+# ================================
+
+# Sorted sets live in Redis when set; otherwise each process keeps its own
+# copy, loaded from the karma ledger once (in the gunicorn master), and
+# catches up on the users whose karma changed every
+# LEADERBOARD_LOCAL_REFRESH seconds, in the background.
+LEADERBOARD_REDIS_URL = os.getenv("LEADERBOARD_REDIS_URL", REDIS_URL)
+LEADERBOARD_LOCAL_REFRESH = 60
+LEADERBOARD_MAX_LIMIT = 100
+
+# snapshot_leaderboard stores one snapshot per interval (run it at least
+# that often); rank history reads them.
+LEADERBOARD_SNAPSHOT_INTERVAL = 86400
+LEADERBOARD_SNAPSHOT_OVERLAP = 300
+LEADERBOARD_SNAPSHOT_RETENTION_DAYS = 730
+LEADERBOARD_HISTORY_MAX_DAYS = 366
+
+
+# ================================
+# USER SEARCH
+# ================================
+
+# /accounts/search/ returns up to USER_SEARCH_MAX_LIMIT users per prefix.
+# Results for prefixes of up to USER_SEARCH_CACHE_PREFIX characters are
+# cached per process (at most USER_SEARCH_CACHE_SIZE prefixes), so new
+# users and karma show up within USER_SEARCH_CACHE_TTL seconds.
+USER_SEARCH_LIMIT = 10
+USER_SEARCH_MAX_LIMIT = 20
+USER_SEARCH_CACHE_PREFIX = 3
+USER_SEARCH_CACHE_TTL = 60
+USER_SEARCH_CACHE_SIZE = 20_000
+
+
+# ================================
+# PROFILING
+# ================================
+
+# ProfilingMiddleware profiles requests carrying PROFILING_HEADER with a
+# token from ``manage.py profile_token`` (valid PROFILING_TOKEN_MAX_AGE
+# seconds) and a PROFILING_SAMPLE_RATE fraction of all others. The newest
+# PROFILING_MAX_PROFILES stay in PROFILING_DIR for profile_summary.
+PROFILING_HEADER = "X-Profile"
+PROFILING_TOKEN_MAX_AGE = 3600
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "playto-profiles"))
+PROFILING_MAX_PROFILES = 200
+PROFILING_MAX_QUERIES = 200
+
+
+# ================================
+# WRITE BUFFERS
+# ================================
+
+# gunicorn workers start a thread (core.background) that flushes the
+# notification and impression buffers this often, off the request path.
+BACKGROUND_FLUSH_INTERVAL = 1
+
+
+# ================================
+# NOTIFICATIONS
+# ================================
+
+NOTIFICATION_PAGE_SIZE = 20
+NOTIFICATION_MAX_PAGE_SIZE = 100
+# Cached unread counts are adjusted as notifications arrive; the timeout
+# only bounds how long a missed adjustment can show. Without Redis the
+# adjustment only reaches the worker that made it, so the others must
+# recount within seconds.
+NOTIFICATION_UNREAD_TTL = 3600 if REDIS_URL else 5
+# With a flusher thread (see BACKGROUND_FLUSH_INTERVAL) each process
+# buffers notification events and delivers them in one batch once it holds
+# this many, or once the oldest is this old.
+NOTIFICATION_FLUSH_SIZE = 500
+NOTIFICATION_FLUSH_SECONDS = 2
+
+
+# ================================
+# IMPRESSIONS
+# ================================
+
+# "Seen by N people" comes from HyperLogLog sketches of 2**precision
+# one-byte registers: 4 KB and ~1.6% standard error at 12 (each step up
+# doubles the size and divides the error by 1.4). Changing it invalidates
+# the stored sketches.
+IMPRESSION_HLL_PRECISION = 12
+# Each process buffers impressions and merges them into the sketches once
+# it holds this many, or once the oldest is this old.
+IMPRESSION_FLUSH_SIZE = 1000
+IMPRESSION_FLUSH_SECONDS = 10
+IMPRESSION_MAX_POSTS = 100
+# The longest window GET /impressions/post/<id>/ reports on.
+# `manage.py prune_impressions` drops the day sketches older than that.
+IMPRESSION_MAX_DAYS = 90
+
+
+# ================================
+# SYNC
+# ================================
+
+# Changes per GET /sync/ page. Pages follow the commit-ordered sequence
+# sync.log numbers changes with, so a slow transaction can't be jumped over.
+SYNC_PAGE_SIZE = 200
+SYNC_MAX_PAGE_SIZE = 1000
+# `manage.py prune_changes` drops older changes; clients holding an older
+# token get a 410 and reload in full.
+SYNC_RETENTION_DAYS = 7
+
+
+# ================================
+# COMMENT TREES
+# ================================
+
+# Rows fetched per round-trip when streaming a tree with ?stream=1.
+COMMENT_STREAM_CHUNK_SIZE = 2000
+
+
 # ================================
 # CORS + CSRF (React Ready)
 # ================================
@@ -193,7 +467,9 @@ CORS_ALLOW_CREDENTIALS = True
 
 CORS_ALLOW_HEADERS = list(default_headers) + [
     "x-user",
+    "x-profile",
 ]
+CORS_EXPOSE_HEADERS = ["x-profile-id"]
 
 CSRF_TRUSTED_ORIGINS = [
     "https://*.run.app",
@@ -0,0 +1,75 @@
+"""
+Slim settings for the API container (Cloud Run).
+
+Everything from ``backend.settings``, minus the parts an API-only service
+never uses: the admin, sessions, messages, CSRF/clickjacking middleware,
+the browsable API and the Cloudinary template/management apps. Requests
+authenticate with JWTs, so none of them need a session. Fewer apps and
+middleware mean fewer imports before the first response; measure with
+
+    python manage.py profile_startup backend.settings backend.settings_api
+
+Use ``backend.settings`` for the admin and local development.
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, TEMPLATES
+
+
+# ================================
+# APPLICATIONS
+# ================================
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS
+    if app not in (
+        "django.contrib.admin",
+        "django.contrib.sessions",
+        "django.contrib.messages",
+        "cloudinary",
+        "cloudinary_storage",
+    )
+]
+
+
+# ================================
+# MIDDLEWARE
+# ================================
+
+# AuthenticationMiddleware needs sessions; DRF authenticates each request
+# from its Authorization header instead.
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE
+    if middleware not in (
+        "django.contrib.sessions.middleware.SessionMiddleware",
+        "django.middleware.csrf.CsrfViewMiddleware",
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+        "django.contrib.messages.middleware.MessageMiddleware",
+        "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    )
+]
+
+
+# ================================
+# TEMPLATES
+# ================================
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        "OPTIONS": {
+            "context_processors": [
+                "django.template.context_processors.request",
+            ],
+        },
+    },
+]
+
+
+# ================================
+# DJANGO REST
+# ================================
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": ("backend.renderers.ORJSONRenderer",),
+}
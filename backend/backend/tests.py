@@ -0,0 +1,215 @@
+import gzip
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipIf
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core.testing import client
+from posts.models import Post
+from . import profiling, response_cache
+
+from .middleware import CompressionMiddleware, brotli, choose_encoding
+from .renderers import ORJSONRenderer
+
+
+class RendererTests(SimpleTestCase):
+    def test_matches_drf_json_renderer(self):
+        data = {
+            "at": datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc),
+            "price": Decimal("1.50"),
+            "text": "line\u2028break\u2029",
+            "nested": [1, None, True, {"x": "é"}],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class CompressionTests(SimpleTestCase):
+    body = b'{"comments": "' + b"lorem ipsum " * 500 + b'"}'
+
+    def respond(self, accept, response):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+        return CompressionMiddleware(lambda request: response)(request)
+
+    def test_negotiation(self):
+        self.assertEqual(choose_encoding("gzip;q=0.5, br;q=0.4"), "gzip")
+        self.assertEqual(choose_encoding("br;q=0, gzip;q=0"), None)
+        self.assertEqual(choose_encoding("identity"), None)
+        self.assertEqual(choose_encoding("*"), "br" if brotli else "gzip")
+
+    def test_gzip(self):
+        response = self.respond("gzip", HttpResponse(self.body, content_type="application/json"))
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    @skipIf(brotli is None, "brotli is not installed")
+    def test_brotli_stream(self):
+        chunks = [self.body[:100], self.body[100:]]
+        response = self.respond("br, gzip", StreamingHttpResponse(chunks, content_type="application/json"))
+        self.assertEqual(response["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(b"".join(response.streaming_content)), self.body)
+
+    def test_small_and_binary_bodies_are_left_alone(self):
+        small = self.respond("gzip", HttpResponse(b"{}", content_type="application/json"))
+        image = self.respond("gzip", HttpResponse(self.body, content_type="image/png"))
+        self.assertFalse(small.has_header("Content-Encoding"))
+        self.assertFalse(image.has_header("Content-Encoding"))
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("author")
+        Post.objects.create(user=self.user, content="First")
+
+    def get(self, path, api=None):
+        return (api or APIClient()).get(path)
+
+    def test_unread_parameters_share_an_entry(self):
+        self.assertEqual(self.get("/posts/?limit=5")["X-Cache"], "MISS")
+        self.assertEqual(self.get("/posts/?limit=5&x=1")["X-Cache"], "HIT")
+        self.assertEqual(self.get("/posts/?x=2&limit=5")["X-Cache"], "HIT")
+        self.assertEqual(self.get("/posts/?limit=6")["X-Cache"], "MISS")
+
+    def test_invalidated_by_writes(self):
+        self.get("/posts/")
+        with self.captureOnCommitCallbacks(execute=True):
+            client(self.user).post("/posts/", {"content": "Second"})
+        response = self.get("/posts/")
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(len(response.data), 2)
+
+    def test_authenticated_requests_bypass(self):
+        self.get("/posts/")
+        self.assertFalse(self.get("/posts/", client(self.user)).has_header("X-Cache"))
+
+    def test_cold_miss_waits_for_the_rebuild(self):
+        request = RequestFactory().get("/posts/")
+        entry_key = response_cache._entry_key("feed", request, ("limit",))
+        # Another worker holds the lock and stores its result shortly.
+        cache.add(f"{entry_key}:lock", 1)
+        built = HttpResponse(b'["built elsewhere"]', content_type="application/json")
+        timer = threading.Timer(0.05, cache.set, (entry_key, response_cache._to_entry(built, 0, 10)))
+        timer.start()
+        try:
+            response = self.get("/posts/")
+        finally:
+            timer.join()
+        self.assertEqual(response["X-Cache"], "HIT")
+        self.assertEqual(response.content, b'["built elsewhere"]')
+
+
+class AdminRouteTests(TestCase):
+    def test_admin_is_mounted_with_full_settings(self):
+        response = APIClient().get("/admin/")
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response["Location"].startswith("/admin/login/"))
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings_override = override_settings(PROFILING_DIR=self.directory, PROFILING_SAMPLE_RATE=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user("author")
+        self.post = Post.objects.create(user=self.user, content="First")
+
+    def get(self, path, token=None):
+        headers = {"HTTP_X_PROFILE": token} if token else {}
+        return APIClient().get(path, **headers)
+
+    def stored(self):
+        return [meta for meta, _ in profiling.stored(self.directory)]
+
+    def test_only_signed_requests_are_profiled(self):
+        self.assertFalse(self.get("/posts/").has_header(profiling.RESPONSE_HEADER))
+        self.assertFalse(self.get("/posts/", token="me:forged").has_header(profiling.RESPONSE_HEADER))
+        with self.settings(PROFILING_TOKEN_MAX_AGE=-1):
+            self.assertFalse(self.get("/posts/", token=profiling.token("me")).has_header(profiling.RESPONSE_HEADER))
+        self.assertEqual(self.stored(), [])
+
+        cache.clear()
+        response = self.get("/posts/", token=profiling.token("me"))
+        [meta] = self.stored()
+        self.assertEqual(response[profiling.RESPONSE_HEADER], meta["name"])
+        self.assertEqual(
+            (meta["endpoint"], meta["status"], meta["trigger"], meta["label"]), ("GET /posts/", 200, "header", "me")
+        )
+        self.assertGreater(meta["query_count"], 0)
+        self.assertEqual(len(meta["queries"]), meta["query_count"])
+        self.assertTrue(os.path.exists(os.path.join(self.directory, f"{meta['name']}.prof")))
+
+    def test_sampled_requests(self):
+        with self.settings(PROFILING_SAMPLE_RATE=1):
+            self.get("/posts/")
+        self.assertEqual([meta["trigger"] for meta in self.stored()], ["sample"])
+
+    def test_streams_are_profiled_to_the_last_chunk(self):
+        for _ in range(3):
+            client(self.user).post(f"/comments/post/{self.post.id}/", {"content": "Hi"})
+        response = self.get(f"/comments/post/{self.post.id}/?stream=1", token=profiling.token("me"))
+        self.assertTrue(response.streaming)
+        self.assertEqual(self.stored(), [])
+        self.assertTrue(profiling._active.locked())
+
+        body = b"".join(response.streaming_content)
+        self.assertEqual(body.count(b'"content"'), 3)
+        [meta] = self.stored()
+        self.assertGreater(meta["query_count"], 0)
+        self.assertFalse(profiling._active.locked())
+
+    def test_a_failed_save_leaves_the_request_alone(self):
+        with mock.patch.object(profiling, "save", side_effect=OSError("disk full")), \
+                self.assertLogs("backend.profiling", "ERROR"):
+            response = self.get("/posts/", token=profiling.token("me"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header(profiling.RESPONSE_HEADER))
+        self.assertFalse(profiling._active.locked())
+
+    def test_one_profile_at_a_time(self):
+        with profiling._active:
+            response = self.get("/posts/", token=profiling.token("me"))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header(profiling.RESPONSE_HEADER))
+        self.assertEqual(self.stored(), [])
+
+    def test_only_the_newest_are_kept(self):
+        with self.settings(PROFILING_MAX_PROFILES=2):
+            names = [self.get("/posts/", token=profiling.token("me"))[profiling.RESPONSE_HEADER] for _ in range(3)]
+        self.assertEqual([meta["name"] for meta in self.stored()], names[1:])
+        self.assertEqual(len(os.listdir(self.directory)), 4)
+
+    def test_summary_and_token_commands(self):
+        out = StringIO()
+        call_command("profile_token", "me", stdout=out)
+        header, _, token = out.getvalue().strip().partition(": ")
+        self.assertEqual(header, "X-Profile")
+        self.get("/posts/", token=token)
+        self.get(f"/accounts/{self.user.username}/", token=token)
+
+        out = StringIO()
+        call_command("profile_summary", dir=self.directory, stdout=out)
+        summary = out.getvalue()
+        self.assertIn("== GET /posts/", summary)
+        self.assertIn("== GET /accounts/<str:username>/", summary)
+        self.assertIn("time by area:", summary)
+        self.assertIn("costliest SQL", summary)
+
+        out = StringIO()
+        call_command("profile_summary", dir=self.directory, endpoint="/posts/", stdout=out)
+        self.assertNotIn("/accounts/", out.getvalue())
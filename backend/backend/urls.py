@@ -14,26 +14,37 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.apps import apps
 from django.http import JsonResponse
-from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import BatchView, ResponseCacheStatsView
+
 def health(request):
     return JsonResponse({"status": "ok"})
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
-
     path("posts/", include("posts.urls")),
     path("comments/", include("comments.urls")),
     path("likes/", include("likes.urls")),
     path("leaderboard/", include("karma.urls")),
     path("accounts/", include("accounts.urls")),
+    path("notifications/", include("notifications.urls")),
+    path("sync/", include("sync.urls")),
+    path("impressions/", include("impressions.urls")),
+    path("cache-stats/", ResponseCacheStatsView.as_view()),
+    path("batch/", BatchView.as_view()),
     path("", health),
 ]
 
+# Not installed in the slim API profile (backend.settings_api).
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path("admin/", admin.site.urls))
+
 
 
 
@@ -8,9 +8,16 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/wsgi/
 """
 
 import os
+from importlib import import_module
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
+
+# Import the URLconf (and with it every view, serializer and model) now
+# instead of on the first request. Under gunicorn's preload_app this runs
+# once in the master, before the workers fork.
+import_module(settings.ROOT_URLCONF)
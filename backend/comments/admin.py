@@ -1,3 +1,31 @@
 from django.contrib import admin
+from django.utils.text import Truncator
 
-# Register your models here.
+from core import reaper
+from core.admin import DeletedFilter, ScalableAdmin
+from .models import Comment
+
+
+@admin.register(Comment)
+class CommentAdmin(ScalableAdmin):
+    list_display = ("id", "author", "post_id", "parent_id", "excerpt", "created_at", "deleted_at")
+    list_select_related = ("author",)
+    list_filter = (DeletedFilter,)
+    search_fields = ("id", "post", "author__username")
+    raw_id_fields = ("post", "author", "parent")
+    readonly_fields = ("path", "created_at", "deleted_at")
+    actions = ("hide",)
+
+    @admin.display(description="content")
+    def excerpt(self, comment):
+        return Truncator(comment.content).chars(80)
+
+    def has_delete_permission(self, request, obj=None):
+        # As for posts: hide, and let reap_deleted remove the subtree.
+        return False
+
+    @admin.action(description="Hide selected comments and their replies", permissions=["change"])
+    def hide(self, request, queryset):
+        rows = list(queryset.filter(deleted_at__isnull=True).values_list("id", "post_id", "parent_id"))
+        reaper.hide_comments(rows)
+        self.message_user(request, f"Hid {len(rows)} comments.")
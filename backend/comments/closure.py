@@ -0,0 +1,101 @@
+from django.db import connection, transaction
+from django.db.models import Count
+
+from .models import Comment, CommentClosure
+
+
+def path_segment(comment_id):
+    return f"{comment_id:0{Comment.PATH_STEP}d}"
+
+
+def closure_rows(parent_of):
+    """Yield closure rows for every comment in ``{comment_id: parent_id}``.
+
+    Parents missing from the mapping are treated as roots.
+    """
+    for comment_id in parent_of:
+        depth = 0
+        node = comment_id
+        while node is not None:
+            yield CommentClosure(ancestor_id=node, descendant_id=comment_id, depth=depth)
+            node = parent_of.get(node)
+            depth += 1
+
+
+def paths(parent_of):
+    """Return ``{comment_id: path}`` for every comment in ``{comment_id: parent_id}``."""
+    result = {}
+    for comment_id in parent_of:
+        chain = []
+        node = comment_id
+        while node is not None and node not in result:
+            chain.append(node)
+            node = parent_of.get(node)
+        prefix = result.get(node, "")
+        for node in reversed(chain):
+            prefix += path_segment(node)
+            result[node] = prefix
+    return result
+
+
+def link(comment):
+    """Add the closure rows and path for a newly created comment.
+
+    Expects ``comment.parent`` to be loaded already, as it is right after
+    ``Comment.objects.create(parent=...)``.
+    """
+    rows = [CommentClosure(ancestor_id=comment.id, descendant_id=comment.id, depth=0)]
+    if comment.parent_id:
+        rows += [
+            CommentClosure(ancestor_id=ancestor_id, descendant_id=comment.id, depth=depth + 1)
+            for ancestor_id, depth in (
+                CommentClosure.objects
+                .filter(descendant_id=comment.parent_id)
+                .values_list("ancestor_id", "depth")
+            )
+        ]
+    CommentClosure.objects.bulk_create(rows)
+
+    parent_path = comment.parent.path if comment.parent_id else ""
+    comment.path = parent_path + path_segment(comment.id)
+    Comment.objects.filter(pk=comment.pk).update(path=comment.path)
+
+
+def rebuild(post_ids=None, batch_size=2000):
+    """Recreate closure rows and paths from Comment.parent.
+
+    Posts are processed in groups of roughly ``batch_size * 5`` comments,
+    which keeps memory bounded without a round-trip per small thread.
+    Rows for deleted comments go away through the FK cascade, so this is
+    only needed for backfills and bulk imports that bypass ``link``.
+    """
+    sizes = Comment.objects.order_by().values("post_id").annotate(total=Count("id"))
+    if post_ids is not None:
+        sizes = sizes.filter(post_id__in=post_ids)
+
+    group, pending = [], 0
+    for row in sizes.values_list("post_id", "total"):
+        group.append(row[0])
+        pending += row[1]
+        if pending >= batch_size * 5 or len(group) >= 500:
+            _rebuild_posts(group, batch_size)
+            group, pending = [], 0
+    if group:
+        _rebuild_posts(group, batch_size)
+
+
+@transaction.atomic
+def _rebuild_posts(post_ids, batch_size):
+    parent_of = dict(
+        Comment.objects.filter(post_id__in=post_ids).values_list("id", "parent_id")
+    )
+    CommentClosure.objects.filter(descendant__post_id__in=post_ids).delete()
+    CommentClosure.objects.bulk_create(closure_rows(parent_of), batch_size=batch_size)
+    # A plain executemany: bulk_update builds a CASE expression per row and
+    # spends most of a rebuild in the ORM.
+    table = connection.ops.quote_name(Comment._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {table} SET path = %s WHERE id = %s",
+            [(path, comment_id) for comment_id, path in paths(parent_of).items()],
+        )
@@ -0,0 +1,87 @@
+import hashlib
+import multiprocessing
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from rest_framework.test import APIRequestFactory
+
+from comments.views import PostCommentsView
+from core.benchmarks import benchmark_database, rss_kb
+from core import seed
+from posts.models import Post
+
+
+def _measure(post_id, stream, conn):
+    try:
+        conn.send(_run(post_id, stream))
+    except Exception as exc:
+        conn.send({"error": repr(exc)})
+    conn.close()
+
+
+def _run(post_id, stream):
+    baseline = rss_kb("VmRSS")
+    request = APIRequestFactory().get(
+        f"/comments/post/{post_id}/", {"stream": "1"} if stream else {}
+    )
+
+    started = time.perf_counter()
+    response = PostCommentsView.as_view()(request, post_id=post_id)
+    digest = hashlib.sha256()
+    size = 0
+    if stream:
+        for chunk in response.streaming_content:
+            digest.update(chunk)
+            size += len(chunk)
+    else:
+        digest.update(response.content)
+        size = len(response.content)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "seconds": elapsed,
+        "bytes": size,
+        "sha": digest.hexdigest(),
+        "peak_kb": rss_kb("VmHWM") - baseline,
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare peak RSS and time of the buffered vs streamed comment tree "
+        "on one large post. Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--comments", type=int, default=50000)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            author_ids = seed.seed_users(200)
+            post = Post.objects.create(user=User.objects.get(id=author_ids[0]), content="big thread")
+            seed.seed_comment_tree(post.id, options["comments"], author_ids)
+
+            # Each mode runs in a fresh child so peak RSS is measured in isolation.
+            context = multiprocessing.get_context("fork")
+            results = {}
+            for label, stream in (("buffered", False), ("streamed", True)):
+                connections.close_all()
+                parent_conn, child_conn = context.Pipe()
+                process = context.Process(target=_measure, args=(post.id, stream, child_conn))
+                process.start()
+                results[label] = parent_conn.recv()
+                process.join()
+                if "error" in results[label]:
+                    raise CommandError(f"{label} run failed: {results[label]['error']}")
+
+            self.stdout.write(f"{options['comments']} comments on one post")
+            for label, result in results.items():
+                self.stdout.write(
+                    f"{label:>9}: {result['seconds'] * 1000:8.1f}ms  "
+                    f"{result['bytes'] / 1024:8.0f}KB body  "
+                    f"peak RSS +{result['peak_kb'] / 1024:.1f}MB"
+                )
+            same = results["buffered"]["sha"] == results["streamed"]["sha"]
+            self.stdout.write(f"bodies identical: {'yes' if same else 'NO'}")
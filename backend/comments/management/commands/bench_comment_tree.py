@@ -0,0 +1,111 @@
+import gc
+import random
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from rest_framework.renderers import JSONRenderer
+
+from comments.models import Comment
+from comments.tree import CommentTree
+from core.seed import random_forest
+
+
+def legacy_build(comments):
+    # The dict-per-node builder PostCommentsView.get used before CommentTree.
+    nodes = {}
+    roots = []
+    for comment in comments:
+        node = {
+            "id": comment.id,
+            "content": comment.content,
+            "author": comment.author.username,
+            "created_at": comment.created_at,
+            "parent_id": comment.parent_id,
+            "like_count": comment.like_count,
+            "children": [],
+        }
+        nodes[comment.id] = node
+
+    for node in nodes.values():
+        parent_id = node["parent_id"]
+        if parent_id and parent_id in nodes:
+            nodes[parent_id]["children"].append(node)
+        else:
+            roots.append(node)
+
+    return JSONRenderer().render(roots)
+
+
+def make_rows(count):
+    authors = [f"user{i}" for i in range(200)]
+    started = now()
+    return [
+        (
+            comment_id,
+            f"Comment {comment_id} " + "lorem ipsum " * random.randint(1, 8),
+            random.choice(authors),
+            started + timedelta(milliseconds=comment_id),
+            parent_id,
+            random.randint(0, 20),
+        )
+        for comment_id, parent_id in random_forest(range(1, count + 1)).items()
+    ]
+
+
+def as_instances(rows):
+    # What the ORM hands the legacy builder: a Comment plus a select_related User.
+    comments = []
+    for comment_id, content, author, created_at, parent_id, like_count in rows:
+        comment = Comment(id=comment_id, content=content, created_at=created_at, parent_id=parent_id)
+        comment.author = User(username=author)
+        comment.like_count = like_count
+        comments.append(comment)
+    return comments
+
+
+class Command(BaseCommand):
+    help = (
+        "Build and render comment trees of 1k/10k/100k nodes with the legacy "
+        "dict builder and with CommentTree; reports time, peak memory and "
+        "whether the JSON output is identical. Needs no database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", default="1000,10000,100000")
+        parser.add_argument("--repeat", type=int, default=3)
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{'nodes':>8} {'builder':>9} {'build+render':>13} {'peak mem':>10}")
+        for size in (int(value) for value in options["sizes"].split(",")):
+            rows = make_rows(size)
+            cases = {
+                "legacy": lambda: legacy_build(as_instances(rows)),
+                "compact": lambda: CommentTree(rows).render(),
+            }
+
+            outputs = {}
+            for label, case in cases.items():
+                best = None
+                for _ in range(options["repeat"]):
+                    gc.collect()
+                    started = time.perf_counter()
+                    outputs[label] = case()
+                    elapsed = time.perf_counter() - started
+                    best = elapsed if best is None else min(best, elapsed)
+
+                gc.collect()
+                tracemalloc.start()
+                case()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                self.stdout.write(
+                    f"{size:>8} {label:>9} {best * 1000:>11.1f}ms {peak / 1024 / 1024:>8.1f}MB"
+                )
+
+            same = outputs["legacy"] == outputs["compact"]
+            self.stdout.write(f"{size:>8} output identical: {'yes' if same else 'NO'}")
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 12:45
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0002_alter_comment_author_alter_comment_post'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CommentClosure',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='descendant_links', to='comments.comment')),
+                ('descendant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ancestor_links', to='comments.comment')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='comment_closure_desc_depth')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='commentclosure',
+            constraint=models.UniqueConstraint(fields=('ancestor', 'descendant'), name='unique_comment_closure'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+def backfill(apps, schema_editor):
+    Comment = apps.get_model("comments", "Comment")
+    CommentClosure = apps.get_model("comments", "CommentClosure")
+
+    parent_of = dict(Comment.objects.values_list("id", "parent_id"))
+    rows = []
+    for comment_id in parent_of:
+        depth = 0
+        node = comment_id
+        while node is not None:
+            rows.append(CommentClosure(ancestor_id=node, descendant_id=comment_id, depth=depth))
+            node = parent_of.get(node)
+            depth += 1
+    CommentClosure.objects.bulk_create(rows, batch_size=2000)
+
+
+def clear(apps, schema_editor):
+    apps.get_model("comments", "CommentClosure").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comments", "0003_commentclosure"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, clear),
+    ]
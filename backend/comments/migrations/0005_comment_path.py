@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    Comment = apps.get_model("comments", "Comment")
+
+    parent_of = dict(Comment.objects.values_list("id", "parent_id"))
+    paths = {}
+
+    def path_of(comment_id):
+        chain = []
+        node = comment_id
+        while node is not None and node not in paths:
+            chain.append(node)
+            node = parent_of.get(node)
+        prefix = paths.get(node, "")
+        for node in reversed(chain):
+            prefix += f"{node:010d}"
+            paths[node] = prefix
+        return paths[comment_id]
+
+    comments = [Comment(id=comment_id, path=path_of(comment_id)) for comment_id in parent_of]
+    Comment.objects.bulk_update(comments, ["path"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("comments", "0004_backfill_closure"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="comment",
+            name="path",
+            field=models.TextField(blank=True, default="", editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -3,6 +3,14 @@ from django.contrib.auth.models import User
 from posts.models import Post
 
 
+class CommentQuerySet(models.QuerySet):
+    def visible(self):
+        """Comments not deleted, not under a deleted comment, on a live post."""
+        return self.filter(post__deleted_at__isnull=True).exclude(
+            ancestor_links__ancestor__deleted_at__isnull=False
+        )
+
+
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
@@ -15,6 +23,55 @@ class Comment(models.Model):
     )
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Materialized path of fixed-width ids from the root down to this comment.
+    # Ordering by it yields depth-first tree order, which lets the comment tree
+    # be streamed without holding the whole thread in memory.
+    path = models.TextField(blank=True, default="", editable=False)
+    # Set by DELETE, which hides the whole subtree; reap_deleted removes it.
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = CommentQuerySet.as_manager()
+
+    PATH_STEP = 10
+
+    class Meta:
+        indexes = [
+            # A post's comments in posting order (PostCommentsView) and in
+            # tree order (?stream=1), without a sort step.
+            models.Index(fields=["post", "created_at"], name="comment_post_created_idx"),
+            models.Index(fields=["post", "path"], name="comment_post_path_idx"),
+            # Top-level comment counts in the feed.
+            models.Index(fields=["post", "parent"], name="comment_post_parent_idx"),
+            # Only deleted rows, for visible() and the reaper.
+            models.Index(
+                fields=["deleted_at"],
+                condition=models.Q(deleted_at__isnull=False),
+                name="comment_deleted_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Comment {self.id} by {self.author.username}"
+
+
+class CommentClosure(models.Model):
+    # One row per (ancestor, descendant) pair, including each comment paired
+    # with itself at depth 0, so whole sub-threads and ancestor chains are a
+    # single indexed lookup instead of a walk over Comment.parent.
+    ancestor = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name="descendant_links")
+    descendant = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name="ancestor_links")
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ancestor", "descendant"],
+                name="unique_comment_closure"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["descendant", "depth"], name="comment_closure_desc_depth"),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
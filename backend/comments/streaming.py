@@ -0,0 +1,66 @@
+from django.conf import settings
+
+from .models import Comment
+from .tree import FIELDS, comment_rows, open_node
+
+FLUSH_BYTES = 64 * 1024
+
+
+def _batches(queryset, chunk_size):
+    """``queryset``'s rows in path order, ``chunk_size`` at a time.
+
+    Each batch is its own short query continuing after the last path seen,
+    so no transaction or cursor stays open while a slow client reads.
+    Comments added or hidden meanwhile show up, or not, as they would in a
+    fresh request; the output is still a well-formed tree because a reply
+    always sorts after its parent and is hidden with it.
+    """
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(path__gt=last)
+        rows = list(batch[:chunk_size])
+        yield from rows
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1][-1]
+
+
+def stream_tree(post_id, chunk_size=None):
+    """Yield the nested comment tree of a post as JSON, chunk by chunk.
+
+    Rows arrive in depth-first order, so only the chain of currently open
+    nodes is kept: memory is bounded by thread depth, not thread size.
+    """
+    chunk_size = chunk_size or settings.COMMENT_STREAM_CHUNK_SIZE
+    step = Comment.PATH_STEP
+    rows = comment_rows(
+        Comment.objects.visible().filter(post_id=post_id).order_by("path"),
+        FIELDS + ("path",),
+    )
+
+    buffer = [b"["]
+    size = 1
+    open_depths = []
+    need_comma = False
+
+    for row in _batches(rows, chunk_size):
+        depth = len(row[-1]) // step - 1
+        while open_depths and open_depths[-1] >= depth:
+            open_depths.pop()
+            buffer.append(b"]}")
+            need_comma = True
+
+        piece = (b"," if need_comma else b"") + open_node(FIELDS, row[:-1])
+        buffer.append(piece)
+        size += len(piece)
+        open_depths.append(depth)
+        need_comma = False
+
+        if size >= FLUSH_BYTES:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+
+    buffer.append(b"]}" * len(open_depths))
+    buffer.append(b"]")
+    yield b"".join(buffer)
@@ -1,3 +1,227 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
 
-# Create your tests here.
+from core import testing
+from core.testing import Endpoint
+from core.seed import seed_comment_tree, seed_posts, seed_users
+from posts.models import Post
+from sync.models import Change
+from . import closure
+from .models import Comment, CommentClosure
+from .streaming import stream_tree
+from .tree import FIELDS, CommentTree
+
+
+def closure_of(post_id):
+    return set(
+        CommentClosure.objects.filter(descendant__post_id=post_id)
+        .values_list("ancestor_id", "descendant_id", "depth")
+    )
+
+
+def expected_closure(post_id):
+    """Closure rows and paths derived from Comment.parent alone."""
+    parent_of = dict(Comment.objects.filter(post_id=post_id).values_list("id", "parent_id"))
+    rows = {(row.ancestor_id, row.descendant_id, row.depth) for row in closure.closure_rows(parent_of)}
+    return rows, closure.paths(parent_of)
+
+
+class CommentQueryBudgetTests(testing.QueryBudgetTestCase):
+    endpoints = [
+        Endpoint("GET", "/comments/post/{post}/", scales=True),
+        Endpoint("GET", "/comments/post/{post}/?stream=1", scales=True),
+        Endpoint("GET", "/comments/post/{post}/", anonymous=True, scales=True),
+        Endpoint("GET", "/comments/{comment}/thread/"),
+        Endpoint("GET", "/comments/{leaf}/ancestors/"),
+        Endpoint("POST", "/comments/post/{post}/", {"content": "A new reply", "parent_id": "{comment}"}),
+        Endpoint("POST", "/comments/post/{friend_post}/", {"content": "A new comment"}),
+        Endpoint("DELETE", "/comments/{reply}/"),
+        Endpoint("GET", "/admin/comments/comment/", user="admin", scales=True),
+        Endpoint("GET", "/admin/comments/comment/?q={post}", user="admin", scales=True),
+    ]
+
+
+class ClosureTests(TestCase):
+    def setUp(self):
+        self.users = seed_users(3)
+        self.post_id = seed_posts(1, self.users)[0]
+
+    def create(self, parent=None):
+        comment = Comment.objects.create(
+            post_id=self.post_id, author_id=self.users[0], parent=parent, content="Hi"
+        )
+        closure.link(comment)
+        return comment
+
+    def test_link_matches_parents(self):
+        root = self.create()
+        child = self.create(root)
+        grandchild = self.create(child)
+        self.create(root)
+
+        rows, paths = expected_closure(self.post_id)
+        self.assertEqual(closure_of(self.post_id), rows)
+        self.assertIn((root.id, grandchild.id, 2), rows)
+        stored = dict(Comment.objects.filter(post_id=self.post_id).values_list("id", "path"))
+        self.assertEqual(stored, paths)
+        self.assertTrue(stored[grandchild.id].startswith(stored[child.id]))
+
+    def test_rebuild_matches_link(self):
+        seed_comment_tree(self.post_id, 300, self.users)
+        linked = closure_of(self.post_id)
+        CommentClosure.objects.all().delete()
+        Comment.objects.update(path="")
+
+        closure.rebuild([self.post_id], batch_size=50)
+
+        rows, paths = expected_closure(self.post_id)
+        self.assertEqual(closure_of(self.post_id), rows)
+        self.assertEqual(linked, rows)
+        self.assertEqual(dict(Comment.objects.values_list("id", "path")), paths)
+
+    def test_delete_removes_the_subtree_links(self):
+        root = self.create()
+        child = self.create(root)
+        self.create(child)
+        sibling = self.create(root)
+
+        child.delete()
+
+        self.assertEqual(
+            closure_of(self.post_id),
+            {(root.id, root.id, 0), (root.id, sibling.id, 1), (sibling.id, sibling.id, 0)},
+        )
+
+    def test_thread_and_ancestors_endpoints(self):
+        root = self.create()
+        child = self.create(root)
+        leaf = self.create(child)
+
+        thread = testing.client().get(f"/comments/{child.id}/thread/").json()
+        self.assertEqual(thread["id"], child.id)
+        self.assertEqual([node["id"] for node in thread["children"]], [leaf.id])
+        self.assertEqual(thread["descendant_count"], 1)
+
+        chain = testing.client().get(f"/comments/{leaf.id}/ancestors/").json()
+        self.assertEqual([node["id"] for node in chain["ancestors"]], [root.id, child.id])
+        self.assertEqual(chain["depth"], 2)
+
+
+
+def ids_in(nodes):
+    return {node["id"] for node in nodes} | {
+        comment_id for node in nodes for comment_id in ids_in(node["children"])
+    }
+
+
+class SoftDeleteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = seed_users(2)
+        self.post_id = seed_posts(1, self.users)[0]
+        self.author = User.objects.get(id=self.users[0])
+
+    def create(self, parent=None):
+        comment = Comment.objects.create(
+            post_id=self.post_id, author=self.author, parent=parent, content="Hi"
+        )
+        closure.link(comment)
+        return comment
+
+    def test_deleted_subtree_is_hidden_and_not_counted(self):
+        root = self.create()
+        child = self.create(root)
+        leaf = self.create(child)
+        other = self.create(root)
+        self.create(other)
+
+        response = testing.client(self.author).delete(f"/comments/{child.id}/")
+        self.assertEqual(response.status_code, 204)
+
+        listed = ids_in(testing.client().get(f"/comments/post/{self.post_id}/").json())
+        self.assertNotIn(child.id, listed)
+        self.assertNotIn(leaf.id, listed)
+        thread = testing.client().get(f"/comments/{root.id}/thread/").json()
+        self.assertEqual([node["id"] for node in thread["children"]], [other.id])
+        self.assertEqual(thread["descendant_count"], 2)
+        self.assertEqual(testing.client().get(f"/comments/{leaf.id}/thread/").status_code, 404)
+
+    def test_deleted_post_hides_its_comments(self):
+        self.create()
+        owner = Post.objects.get(id=self.post_id).user
+        response = testing.client(owner).delete(f"/posts/{self.post_id}/")
+        self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(testing.client().get(f"/comments/post/{self.post_id}/").json(), [])
+        feed = testing.client().get("/posts/").json()
+        self.assertNotIn(self.post_id, [post["id"] for post in feed])
+
+
+    def test_admin_hide_action_hides_the_subtree(self):
+        root = self.create()
+        child = self.create(root)
+        self.create(child)
+        self.client.force_login(User.objects.create_superuser("admin"))
+        testing.client().get(f"/comments/post/{self.post_id}/")
+
+        response = self.client.post(
+            "/admin/comments/comment/", {"action": "hide", "_selected_action": [child.id]}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            list(Comment.objects.filter(deleted_at__isnull=False).values_list("id", flat=True)), [child.id]
+        )
+        self.assertEqual(ids_in(testing.client().get(f"/comments/post/{self.post_id}/").json()), {root.id})
+        self.assertTrue(Change.objects.filter(kind=Change.COMMENT, object_id=child.id, deleted=True).exists())
+
+
+def by_id(nodes):
+    return sorted(({**node, "children": by_id(node["children"])} for node in nodes), key=lambda node: node["id"])
+
+
+class StreamTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_stream_matches_buffered_tree(self):
+        users = seed_users(5)
+        post_id = seed_posts(1, users)[0]
+        seed_comment_tree(post_id, 500, users)
+        hidden = Comment.objects.filter(post_id=post_id, parent__isnull=False).first()
+        Comment.objects.filter(pk=hidden.pk).update(deleted_at=hidden.created_at)
+
+        buffered = testing.client().get(f"/comments/post/{post_id}/").json()
+        # Batches far smaller than the tree, so it is read in many queries.
+        streamed = json.loads(b"".join(stream_tree(post_id, chunk_size=7)))
+
+        self.assertEqual(by_id(streamed), by_id(buffered))
+        self.assertNotIn(f'"id": {hidden.id},', json.dumps(streamed))
+
+
+def row(comment_id, parent_id=None):
+    return (comment_id, f"c{comment_id}", "author", None, parent_id, 0)
+
+
+class CommentTreeTests(TestCase):
+    def test_rows_in_any_order(self):
+        tree = CommentTree([row(3, 2), row(1), row(2, 1), row(4, 1), row(5)])
+        rendered = json.loads(tree.render())
+
+        self.assertEqual([node["id"] for node in rendered], [1, 5])
+        self.assertEqual([node["id"] for node in rendered[0]["children"]], [2, 4])
+        self.assertEqual(rendered[0]["children"][0]["children"][0], dict(zip(FIELDS, row(3, 2)), children=[]))
+
+    def test_missing_parent_becomes_a_root(self):
+        tree = CommentTree([row(2, 99), row(3, 2)])
+        self.assertEqual([node.row[0] for node in tree.roots], [2])
+        self.assertEqual(json.loads(tree.render_node(tree.roots[0]))["children"][0]["id"], 3)
+
+    def test_deep_thread_renders_without_recursion(self):
+        rows = [row(1)] + [row(index, index - 1) for index in range(2, 5001)]
+        rendered = CommentTree(rows).render()
+        # Too deep for json.loads; every node opens and closes exactly once.
+        self.assertEqual(rendered.count(b'"children":['), 5000)
+        self.assertTrue(rendered.endswith(b"[" + b"]}" * 5000 + b"]"))
@@ -0,0 +1,98 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from backend.renderers import dumps
+from likes.models import Like
+
+FIELDS = ("id", "content", "author", "created_at", "parent_id", "like_count")
+
+_LOOKUPS = {"author": "author__username"}
+
+
+def comment_rows(queryset, fields=FIELDS):
+    """Turn a Comment queryset into flat tuples in ``fields`` order."""
+    like_count = (
+        Like.objects
+        .filter(comment=OuterRef("pk"))
+        .values("comment")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    return (
+        queryset
+        .annotate(like_count=Coalesce(Subquery(like_count), 0))
+        .values_list(*(_LOOKUPS.get(field, field) for field in fields))
+    )
+
+
+def open_node(fields, row):
+    """A node's JSON up to and including the opening of its children list."""
+    return dumps(dict(zip(fields, row)))[:-1] + b',"children":['
+
+
+class Node:
+    __slots__ = ("row", "children")
+
+    def __init__(self, row):
+        self.row = row
+        self.children = None
+
+
+class CommentTree:
+    """Nested comment tree built from flat row tuples and rendered straight to JSON bytes.
+
+    Each comment costs one tuple (straight from ``values_list``) and one
+    slotted node; children lists are only allocated for comments that
+    have replies. Rows may come in any order. A row whose parent is not
+    in the set becomes a root, as in the original dict-based builder.
+    """
+
+    def __init__(self, rows, fields=FIELDS):
+        self.fields = fields
+        self.roots = []
+
+        parent_index = fields.index("parent_id")
+        nodes = {}
+        for row in rows:
+            nodes[row[0]] = Node(row)
+
+        for node in nodes.values():
+            parent = nodes.get(node.row[parent_index])
+            if parent is None:
+                self.roots.append(node)
+            elif parent.children is None:
+                parent.children = [node]
+            else:
+                parent.children.append(node)
+
+    def render(self):
+        """The whole tree as a JSON list (bytes)."""
+        return b"[" + self._render(self.roots) + b"]"
+
+    def render_node(self, node):
+        """One node and its sub-thread as a JSON object (bytes)."""
+        return self._render([node])
+
+    def _render(self, nodes):
+        # Iterative rather than recursive, so deep threads can't hit the
+        # recursion limit.
+        fields = self.fields
+        out = []
+        stack = [iter(nodes)]
+        first = True
+
+        while stack:
+            node = next(stack[-1], None)
+            if node is None:
+                stack.pop()
+                if stack:
+                    out.append(b"]}")
+                first = False
+                continue
+            if not first:
+                out.append(b",")
+            out.append(open_node(fields, node.row))
+            stack.append(iter(node.children or ()))
+            first = True
+
+        return b"".join(out)
@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import PostCommentsView
+from .views import PostCommentsView, CommentDetailView, CommentThreadView, CommentAncestorsView
 
 urlpatterns = [
     path("post/<int:post_id>/", PostCommentsView.as_view()),
+    path("<int:comment_id>/", CommentDetailView.as_view()),
+    path("<int:comment_id>/thread/", CommentThreadView.as_view()),
+    path("<int:comment_id>/ancestors/", CommentAncestorsView.as_view()),
 ]
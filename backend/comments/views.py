@@ -1,10 +1,23 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Count
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 
+from accounts import stats
+from backend.response_cache import cached_get, invalidate
+from core import reaper
+from notifications.delivery import Event, send
+from notifications.models import Notification
 from posts.models import Post
-from .models import Comment
+from sync import log
+from sync.models import Change
+from .models import Comment, CommentClosure
+from . import closure
+from .streaming import stream_tree
+from .tree import FIELDS, CommentTree, comment_rows
 
 from rest_framework.permissions import IsAuthenticated
 
@@ -17,40 +30,19 @@ class PostCommentsView(APIView):
             return []
         return super().get_permissions()
 
+    @cached_get("comments:{post_id}", params=("stream",))
     def get(self, request, post_id):
-        comments = (
-            Comment.objects
-            .filter(post_id=post_id)
-            .select_related("author")
-            .annotate(like_count=Count("likes", distinct=True))
-            .order_by("created_at")
-        )
+        if request.query_params.get("stream") in ("1", "true"):
+            return StreamingHttpResponse(stream_tree(post_id), content_type="application/json")
 
-        nodes = {}
-        roots = []
-        for comment in comments:
-            node = {
-                "id": comment.id,
-                "content": comment.content,
-                "author": comment.author.username,
-                "created_at": comment.created_at,
-                "parent_id": comment.parent_id,
-                "like_count": comment.like_count,
-                "children": [],
-            }
-            nodes[comment.id] = node
-
-        for node in nodes.values():
-            parent_id = node["parent_id"]
-            if parent_id and parent_id in nodes:
-                nodes[parent_id]["children"].append(node)
-            else:
-                roots.append(node)
-
-        return Response(roots)
+        rows = comment_rows(
+            Comment.objects.visible().filter(post_id=post_id).order_by("created_at")
+        )
+        tree = CommentTree(rows)
+        return HttpResponse(tree.render(), content_type="application/json")
 
     def post(self, request, post_id):
-        post = get_object_or_404(Post, id=post_id)
+        post = get_object_or_404(Post, id=post_id, deleted_at__isnull=True)
         content = request.data.get("content", "").strip()
         parent_id = request.data.get("parent_id")
 
@@ -59,14 +51,27 @@ class PostCommentsView(APIView):
 
         parent = None
         if parent_id:
-            parent = get_object_or_404(Comment, id=parent_id, post_id=post_id)
+            parent = get_object_or_404(Comment.objects.visible(), id=parent_id, post_id=post_id)
 
-        comment = Comment.objects.create(
-            post=post,
-            author=request.user,
-            content=content,
-            parent=parent,
-        )
+        with transaction.atomic():
+            comment = Comment.objects.create(
+                post=post,
+                author=request.user,
+                content=content,
+                parent=parent,
+            )
+            closure.link(comment)
+            stats.bump(request.user.id, comments=1)
+            invalidate(f"comments:{post_id}", "feed")
+            # The post's author hears about every comment, the parent's
+            # author about replies; both go out in one batch.
+            events = [Event(post.user_id, Notification.COMMENT, request.user.id, post.id)]
+            if parent is not None and parent.author_id != post.user_id:
+                events.append(Event(parent.author_id, Notification.REPLY, request.user.id, post.id, parent.id))
+            send(events)
+            log.record(Change.COMMENT, comment.id, post.id)
+            if parent is None:
+                log.record(Change.POST_COUNTS, post.id, post.id)
 
         return Response(
             {
@@ -80,3 +85,76 @@ class PostCommentsView(APIView):
             },
             status=201,
         )
+
+
+class CommentDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, comment_id):
+        # Hides the comment and its replies at once; reap_deleted removes
+        # the subtree, its likes and karma in small batches later.
+        comment = get_object_or_404(Comment.objects.visible(), id=comment_id)
+        if comment.author_id != request.user.id:
+            return Response({"error": "Forbidden"}, status=403)
+
+        reaper.hide_comments([(comment.id, comment.post_id, comment.parent_id)])
+        return Response(status=204)
+
+
+class CommentThreadView(APIView):
+    """One comment and everything under it, with per-node descendant counts."""
+
+    def get(self, request, comment_id):
+        descendant_count = (
+            CommentClosure.objects
+            .filter(ancestor=OuterRef("pk"), depth__gt=0, descendant__deleted_at__isnull=True)
+            # Nor anything under a deleted reply further down.
+            .exclude(descendant__ancestor_links__ancestor__deleted_at__isnull=False)
+            .values("ancestor")
+            .annotate(total=Count("*"))
+            .values("total")
+        )
+        comments = (
+            Comment.objects.visible()
+            .filter(ancestor_links__ancestor_id=comment_id)
+            .annotate(descendant_count=Coalesce(Subquery(descendant_count), 0))
+            .order_by("created_at")
+        )
+
+        fields = FIELDS + ("descendant_count",)
+        tree = CommentTree(comment_rows(comments, fields), fields)
+        if not tree.roots:
+            raise Http404
+        return HttpResponse(tree.render_node(tree.roots[0]), content_type="application/json")
+
+
+class CommentAncestorsView(APIView):
+    """Root-first chain of comments leading to ``comment_id``, for deep links."""
+
+    def get(self, request, comment_id):
+        chain = list(
+            Comment.objects.visible()
+            .filter(descendant_links__descendant_id=comment_id)
+            .select_related("author")
+            .annotate(depth=F("descendant_links__depth"))
+            .order_by("-depth")
+        )
+        # A hidden comment still has visible ancestors; only the full chain counts.
+        if not chain or chain[-1].id != comment_id:
+            raise Http404
+
+        return Response({
+            "id": comment_id,
+            "post_id": chain[0].post_id,
+            "depth": chain[0].depth,
+            "ancestors": [
+                {
+                    "id": comment.id,
+                    "content": comment.content,
+                    "author": comment.author.username,
+                    "created_at": comment.created_at,
+                    "parent_id": comment.parent_id,
+                }
+                for comment in chain[:-1]
+            ],
+        })
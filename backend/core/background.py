@@ -0,0 +1,61 @@
+# Per-process write buffers flushed outside the requests that fill them.
+#
+# A buffer (notification events, impressions) registers a ``flush`` and a
+# ``due`` check; a periodic job (sync log sequencing) registers without
+# one. Under gunicorn, post_fork calls ``start`` and one daemon thread per
+# worker runs the jobs and every due flush each BACKGROUND_FLUSH_INTERVAL
+# seconds, so requests only append. Without that thread (runserver, tests,
+# management commands) nothing is held back: callers write as they always
+# did. Whatever is left in a buffer is flushed at exit.
+import atexit
+import logging
+import threading
+import time
+
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+_buffers = []
+_thread = None
+
+
+def register(flush, due=None):
+    _buffers.append((flush, due))
+
+
+def running():
+    """Whether this process has a flusher thread to leave writes to."""
+    return _thread is not None
+
+
+def run(at_exit=False):
+    """Run the periodic jobs and flush every buffer that is due; at exit,
+    flush every buffer and skip the jobs."""
+    for flush, due in _buffers:
+        if due is None and at_exit:
+            continue
+        if at_exit or due is None or due():
+            try:
+                flush()
+            except Exception:
+                logger.exception("Flushing %s failed", flush.__module__)
+
+
+def _loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            run()
+        finally:
+            connection.close()
+
+
+def start(interval):
+    global _thread
+    if _thread is None:
+        _thread = threading.Thread(target=_loop, args=(interval,), name="buffer-flush", daemon=True)
+        _thread.start()
+
+
+atexit.register(run, True)
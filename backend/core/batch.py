@@ -0,0 +1,103 @@
+# Internal dispatch for POST /batch/.
+#
+# Each sub-request is a GET under one of BATCH_PATH_PREFIXES, resolved
+# against ROOT_URLCONF and handed straight to its view. Anything else (the
+# admin, a nested /batch/) gets a 400 in its item.
+# The outer request already went through the middleware and authentication;
+# sub-requests reuse its user and token via DRF's forced authentication
+# instead of decoding the JWT again.
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpRequest, QueryDict
+from django.urls import Resolver404, resolve
+
+from backend.renderers import dumps
+
+logger = logging.getLogger(__name__)
+
+# Request headers that describe the outer POST body, not the sub-requests.
+_BODY_HEADERS = ("CONTENT_TYPE", "CONTENT_LENGTH", "HTTP_CONTENT_ENCODING")
+
+
+def _error(status, message):
+    return status, "application/json", dumps({"error": message})
+
+
+def _sub_request(request, path, query):
+    sub = HttpRequest()
+    sub.method = "GET"
+    sub.path = sub.path_info = path
+    sub.META = {key: value for key, value in request.META.items() if key not in _BODY_HEADERS}
+    sub.META.update(REQUEST_METHOD="GET", PATH_INFO=path, QUERY_STRING=query)
+    sub.GET = QueryDict(query)
+    sub.COOKIES = request.COOKIES
+    if request.user.is_authenticated:
+        sub._force_auth_user = request.user
+        sub._force_auth_token = request.auth
+    return sub
+
+
+def dispatch(request, path):
+    """Run one GET sub-request; returns ``(status, content_type, body)``."""
+    parts = urlsplit(path)
+    if parts.scheme or parts.netloc or not parts.path.startswith("/"):
+        return _error(400, "path must be an absolute path like /posts/")
+    if not parts.path.startswith(settings.BATCH_PATH_PREFIXES):
+        if parts.path.rstrip("/") == "/batch":
+            return _error(400, "batch requests can't be nested")
+        return _error(400, "path is not part of the batchable API")
+    try:
+        match = resolve(parts.path)
+    except Resolver404:
+        return _error(404, "Not found")
+
+    sub = _sub_request(request, parts.path, parts.query)
+    sub.resolver_match = match
+    try:
+        response = match.func(sub, *match.args, **match.kwargs)
+        if hasattr(response, "render"):
+            response.render()
+        if response.streaming:
+            body = b"".join(response.streaming_content)
+        else:
+            body = response.content
+    except Http404:
+        return _error(404, "Not found")
+    except Exception:
+        logger.exception("Batch sub-request %s failed", path)
+        return _error(500, "Internal error")
+    return response.status_code, response.get("Content-Type", ""), body
+
+
+def _dispatch_in_thread(request, path):
+    try:
+        return dispatch(request, path)
+    finally:
+        # Worker threads open their own connections; don't leave them behind.
+        connections.close_all()
+
+
+def run(request, paths, workers=1):
+    """Dispatch every path, in order on this thread's connection, or spread
+    over ``workers`` threads (one connection each) when above 1."""
+    if workers <= 1 or len(paths) <= 1:
+        return [dispatch(request, path) for path in paths]
+    with ThreadPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        return list(pool.map(lambda path: _dispatch_in_thread(request, path), paths))
+
+
+def render(paths, results):
+    """The batch response body. JSON sub-bodies are spliced in as they are
+    instead of being parsed and serialized again."""
+    items = []
+    for path, (status, content_type, body) in zip(paths, results):
+        if not content_type.startswith("application/json"):
+            body = dumps(body.decode("utf-8", "replace"))
+        elif not body:
+            body = b"null"
+        items.append(b'{"path":' + dumps(path) + b',"status":' + str(status).encode() + b',"body":' + body + b"}")
+    return b'{"responses":[' + b",".join(items) + b"]}"
@@ -0,0 +1,76 @@
+import os
+import resource
+import tempfile
+import threading
+from contextlib import contextmanager
+
+from django.db import connection, connections
+
+
+@contextmanager
+def benchmark_database(verbosity=0):
+    """Run the block against a throwaway test database, never the real one.
+
+    SQLite gets a file-backed database instead of the usual in-memory one so
+    that worker threads see real file locks and busy timeouts.
+    """
+    settings_dict = connection.settings_dict
+    old_name = settings_dict["NAME"]
+    old_test_name = settings_dict["TEST"].get("NAME")
+
+    tmp_path = None
+    if connection.vendor == "sqlite":
+        fd, tmp_path = tempfile.mkstemp(prefix="bench-", suffix=".sqlite3")
+        os.close(fd)
+        settings_dict["TEST"]["NAME"] = tmp_path
+
+    connection.creation.create_test_db(
+        verbosity=verbosity, autoclobber=True, serialize=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        settings_dict["TEST"]["NAME"] = old_test_name
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def run_threads(target, count):
+    """Start ``count`` threads running ``target(index)`` and wait for all of them."""
+    def worker(index):
+        try:
+            target(index)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def ms(seconds):
+    return f"{seconds * 1000:.2f}ms"
+
+
+def rss_kb(field="VmRSS"):
+    """Current (VmRSS) or peak (VmHWM) resident set size in KB."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
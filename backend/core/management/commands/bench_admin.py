@@ -0,0 +1,92 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+
+from accounts.models import UserStats
+from comments.models import Comment
+from core import seed
+from core.benchmarks import benchmark_database, ms
+
+
+class Command(BaseCommand):
+    help = (
+        "Time admin changelists (first page, a later page, searches, a "
+        "filter) for posts, comments, likes, karma and user stats on a "
+        "throwaway database with --rows rows per big table, and count the "
+        "queries each one runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        # Plain static storage: the manifest only exists after collectstatic.
+        with override_settings(
+            ALLOWED_HOSTS=["*"],
+            STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+        ), benchmark_database():
+            self.seed(options)
+            self.measure(options)
+
+    def seed(self, options):
+        started = time.perf_counter()
+        rows = options["rows"]
+        user_ids = seed.seed_users(options["users"])
+        post_ids = seed.seed_posts(rows, user_ids)
+        start = post_ids[0]
+        Comment.objects.bulk_create(
+            (
+                Comment(post_id=random.choice(post_ids), author_id=random.choice(user_ids), content=f"Comment {i}")
+                for i in range(rows)
+            ),
+            batch_size=5000,
+        )
+        seed.seed_likes(rows, user_ids, post_ids)
+        UserStats.objects.bulk_create((UserStats(user_id=user_id) for user_id in user_ids), batch_size=5000)
+        User.objects.create_superuser("bench-admin", password="!")
+        self.sample_user = User.objects.get(id=user_ids[len(user_ids) // 2]).username
+        self.sample_post = start + rows // 2
+        self.stdout.write(f"Seeded {rows:,} posts, comments, likes and karma rows in {time.perf_counter() - started:.1f}s")
+
+    def measure(self, options):
+        client = Client()
+        client.force_login(User.objects.get(username="bench-admin"))
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        pages = []
+        for model in ("posts/post", "comments/comment", "likes/like", "karma/karmatransaction", "accounts/userstats", "auth/user"):
+            base = f"/admin/{model}/"
+            pages += [
+                (base, ""),
+                (base, f"?before={self.sample_post}"),
+                (base, f"?q={self.sample_user}"),
+                (base, f"?q={self.sample_post}"),
+            ]
+        pages.append(("/admin/posts/post/", "?deleted=no"))
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== Changelists, median of {options['repeat']}"))
+        for base, query in pages:
+            samples = []
+            for _ in range(options["repeat"] + 1):
+                queries = 0
+                started = time.perf_counter()
+                with connection.execute_wrapper(count):
+                    response = client.get(base + query)
+                samples.append(time.perf_counter() - started)
+            assert response.status_code == 200, (base + query, response.status_code)
+            self.stdout.write(
+                f"  {base + query:<48} {ms(statistics.median(samples[1:])):>10}  {queries:3d} queries"
+            )
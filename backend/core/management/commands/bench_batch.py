@@ -0,0 +1,102 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core import seed
+from core.benchmarks import benchmark_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the requests an app start fires (feed, leaderboard, "
+        "leaderboard/me, several comment trees, unread badge) sent one by "
+        "one against a single POST /batch/, sequential and parallel. "
+        "--rtt adds a simulated network round-trip per HTTP request. Uses a "
+        "throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=200)
+        parser.add_argument("--comments", type=int, default=300, help="Comments per opened post.")
+        parser.add_argument("--threads", type=int, default=3, help="Comment trees the app opens.")
+        parser.add_argument("--repeat", type=int, default=30)
+        parser.add_argument("--rtt", type=float, default=0, help="Simulated round-trip per request, ms.")
+        parser.add_argument("--anonymous", action="store_true", help="No token (response cache applies).")
+
+    def measure(self, call, requests):
+        call()  # warm up caches and the leaderboard
+        # Counted with a wrapper: the test client resets connection.queries
+        # at the start of every request. Only this thread's connection is
+        # seen, so parallel batches show the queries they didn't hand off.
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count):
+            call()
+        samples = []
+        for _ in range(self.repeat):
+            started = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - started + requests * self.rtt)
+        return statistics.median(samples), queries
+
+    def handle(self, *args, **options):
+        self.repeat = options["repeat"]
+        self.rtt = options["rtt"] / 1000
+        with benchmark_database():
+            user_ids = seed.seed_users(100)
+            post_ids = seed.seed_posts(options["posts"], user_ids)
+            opened = post_ids[-options["threads"]:]
+            for post_id in opened:
+                seed.seed_comment_tree(post_id, options["comments"], user_ids)
+            seed.seed_likes(options["posts"] * 5, user_ids, post_ids)
+
+            client = Client()
+            headers = {}
+            paths = ["/posts/?limit=10", "/leaderboard/"]
+            if not options["anonymous"]:
+                token = RefreshToken.for_user(User.objects.get(id=user_ids[0])).access_token
+                headers["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+                paths += ["/leaderboard/me/", "/notifications/unread/"]
+            paths += [f"/comments/post/{post_id}/" for post_id in opened]
+
+            def one_by_one():
+                for path in paths:
+                    response = client.get(path, **headers)
+                    assert response.status_code == 200, (path, response.status_code)
+
+            def batched(parallel):
+                body = json.dumps({"requests": paths, "parallel": parallel})
+
+                def call():
+                    return client.post("/batch/", body, content_type="application/json", **headers)
+
+                # Checked once, outside the timings: parsing the combined
+                # body is client work the one-by-one side doesn't do either.
+                statuses = [item["status"] for item in call().json()["responses"]]
+                assert statuses == [200] * len(paths), statuses
+                return call
+
+            self.stdout.write(f"{len(paths)} GETs: {', '.join(paths)}")
+            self.stdout.write(f"{'mode':<22} {'median':>10} {'queries':>8}")
+            baseline = None
+            for label, call, requests in (
+                ("one request each", one_by_one, len(paths)),
+                ("batch", batched(False), 1),
+                ("batch, parallel", batched(True), 1),
+            ):
+                seconds, queries = self.measure(call, requests)
+                baseline = baseline or seconds
+                self.stdout.write(
+                    f"{label:<22} {seconds * 1000:>8.2f}ms {queries:>8}   {baseline / seconds:.2f}x"
+                )
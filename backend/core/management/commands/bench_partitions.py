@@ -0,0 +1,133 @@
+import math
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import override_settings
+from django.utils.timezone import now
+
+from core import partitions, seed
+from core.benchmarks import benchmark_database, ms, percentile
+from karma.models import KarmaTransaction
+from likes.models import Like
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the like and karma tables as single tables and partitioned "
+        "by month (Postgres only) on a throwaway database: load --rows rows "
+        "of each spread over --months, time leaderboard window reads, a "
+        "per-post lookup and like inserts, convert in place and time them "
+        "again. Loading 50M rows takes a while; try --rows 1000000 first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=50_000_000)
+        parser.add_argument("--months", type=int, default=24, help="History the rows are spread over.")
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--inserts", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning is Postgres only; point DATABASE_URL at a Postgres server.")
+        # Start from single tables whatever the environment says; the
+        # conversion in the middle is part of what is measured.
+        with override_settings(DB_PARTITION_BY_MONTH=False), benchmark_database():
+            self.load(options)
+            before = self.measure(options)
+            with override_settings(DB_PARTITION_BY_MONTH=True):
+                started = time.perf_counter()
+                with transaction.atomic():
+                    partitions.convert(Like)
+                    partitions.convert(KarmaTransaction)
+                self.stdout.write(f"Converted both tables in {time.perf_counter() - started:.1f}s")
+                self.analyze()
+                after = self.measure(options)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {options['rows']:,} rows per table"))
+        self.stdout.write(f"  {'':<28} {'single table':>14} {'partitioned':>14}")
+        for label in before:
+            self.stdout.write(f"  {label:<28} {ms(before[label]):>14} {ms(after[label]):>14}")
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Like._meta.db_table}")
+            cursor.execute(f"ANALYZE {KarmaTransaction._meta.db_table}")
+
+    def load(self, options):
+        rows, users = options["rows"], options["users"]
+        user_ids = seed.seed_users(users)
+        # Every (user, post) pair once: the tables' unique constraints hold.
+        post_ids = seed.seed_posts(math.ceil(rows / users), user_ids)
+        self.inserts_posts = seed.seed_posts(options["inserts"], user_ids)
+        self.user_ids = user_ids
+        self.sample_post = post_ids[len(post_ids) // 2]
+
+        started = time.perf_counter()
+        span = f"{options['months'] * 30} days"
+        params = [user_ids[0], users, post_ids[0], users, span, rows - 1]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {Like._meta.db_table} (user_id, post_id, comment_id, created_at) "
+                f"SELECT %s + i %% %s, %s + i / %s, NULL, now() - random() * %s::interval "
+                f"FROM generate_series(0, %s) AS i",
+                params,
+            )
+            cursor.execute(
+                f"INSERT INTO {KarmaTransaction._meta.db_table} "
+                f"(user_id, actor_id, post_id, comment_id, points, source, created_at) "
+                f"SELECT %s + (i * 7919) %% %s, %s + i %% %s, %s + i / %s, NULL, 5, 'post_like', "
+                f"now() - random() * %s::interval FROM generate_series(0, %s) AS i",
+                [user_ids[0], users, *params],
+            )
+        self.analyze()
+        self.stdout.write(f"Loaded {rows:,} likes and karma rows in {time.perf_counter() - started:.1f}s")
+
+    def timed(self, call, repeat):
+        call()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            call()
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples)
+
+    def measure(self, options):
+        repeat = options["repeat"]
+        results = {}
+        for label, window in (("24h", timedelta(hours=24)), ("7d", timedelta(days=7))):
+            since = now() - window
+            # What the leaderboard reads when it reloads a window.
+            results[f"window events {label}"] = self.timed(lambda: list(
+                KarmaTransaction.objects.filter(created_at__gte=since)
+                .values_list("user_id", "points", "created_at")
+            ), repeat)
+            results[f"window sums {label}"] = self.timed(lambda: list(
+                KarmaTransaction.objects.filter(created_at__gte=since)
+                .values("user_id").annotate(karma=Sum("points"))
+            ), repeat)
+        # Lookups without a time range have to visit every partition.
+        results["likes of one post"] = self.timed(
+            lambda: Like.objects.filter(post_id=self.sample_post).count(), repeat
+        )
+
+        latencies = []
+        for index, post_id in enumerate(self.inserts_posts):
+            user_id = self.user_ids[index % len(self.user_ids)]
+            started = time.perf_counter()
+            with transaction.atomic():
+                partitions.lock("like", user_id, "post", post_id)
+                Like.objects.create(user_id=user_id, post_id=post_id)
+                KarmaTransaction.objects.create(
+                    user_id=user_id, actor_id=user_id, post_id=post_id, points=5, source="post_like"
+                )
+            latencies.append(time.perf_counter() - started)
+        Like.objects.filter(post_id__in=self.inserts_posts).delete()
+        KarmaTransaction.objects.filter(post_id__in=self.inserts_posts).delete()
+        results["like insert p50"] = percentile(latencies, 50)
+        results["like insert p99"] = percentile(latencies, 99)
+        return results
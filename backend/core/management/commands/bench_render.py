@@ -0,0 +1,78 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from rest_framework.renderers import JSONRenderer
+
+from backend.renderers import ORJSONRenderer
+from comments.models import Comment
+from comments.tree import CommentTree, comment_rows
+from core import seed
+from core.benchmarks import benchmark_database, ms
+from posts.models import Post
+from posts.serializers import PostSerializer
+
+
+def best_of(repeat, func):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = (
+        "Render time (stdlib vs orjson) and bytes on the wire (identity, gzip, "
+        "brotli) for the feed and a large comment tree. Uses a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--posts", type=int, default=50)
+        parser.add_argument("--comments", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        repeat = options["repeat"]
+        with benchmark_database():
+            author_ids = seed.seed_users(100)
+            post_ids = seed.seed_posts(options["posts"], author_ids)
+            seed.seed_comment_tree(post_ids[-1], options["comments"], author_ids)
+
+            feed = PostSerializer(
+                Post.objects.select_related("user").order_by("-created_at")[:options["posts"]],
+                many=True,
+            ).data
+            rows = list(comment_rows(Comment.objects.filter(post_id=post_ids[-1]).order_by("created_at")))
+            tree = json.loads(CommentTree(rows).render())
+
+            self.stdout.write("Render time (best of %d)" % repeat)
+            for label, data in (("feed", feed), ("comment tree", tree)):
+                stdlib = best_of(repeat, lambda: JSONRenderer().render(data))
+                fast = best_of(repeat, lambda: ORJSONRenderer().render(data))
+                self.stdout.write(
+                    f"  {label:<13} stdlib {ms(stdlib):>10}  orjson {ms(fast):>10}  "
+                    f"({stdlib / fast:.1f}x)"
+                )
+            compact = best_of(repeat, lambda: CommentTree(rows).render())
+            self.stdout.write(f"  {'CommentTree':<13} build+render {ms(compact)}")
+
+            self.stdout.write("Bytes on the wire")
+            client = Client()
+            paths = (
+                ("feed", f"/posts/?limit={min(options['posts'], 50)}"),
+                ("comment tree", f"/comments/post/{post_ids[-1]}/"),
+            )
+            for label, path in paths:
+                sizes = []
+                for coding in ("identity", "gzip", "br"):
+                    started = time.perf_counter()
+                    response = client.get(path, HTTP_ACCEPT_ENCODING=coding)
+                    elapsed = time.perf_counter() - started
+                    sizes.append(
+                        f"{coding} {len(response.content) / 1024:.1f}KB/{ms(elapsed)}"
+                    )
+                self.stdout.write(f"  {label:<13} " + "  ".join(sizes))
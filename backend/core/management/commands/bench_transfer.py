@@ -0,0 +1,110 @@
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from comments import closure
+from comments.models import Comment
+from core import seed, transfer
+from core.benchmarks import benchmark_database
+from counters import sharded
+from karma.leaderboard import rebuild as rebuild_leaderboard
+
+# Share of --rows per table; likes also write one ledger row each.
+SHARES = {"users": 0.02, "posts": 0.10, "comments": 0.40, "likes": 0.24}
+
+
+def seed_comments(count, post_ids, author_ids, batch_size=5000):
+    """Comments spread over many posts, replying to earlier comments on the
+    same post. Paths and closure rows are left for the import to rebuild."""
+    recent = {}
+
+    def rows():
+        for comment_id in range(1, count + 1):
+            post_id = random.choice(post_ids)
+            siblings = recent.setdefault(post_id, [])
+            parent_id = random.choice(siblings) if siblings and random.random() < 0.7 else None
+            siblings.append(comment_id)
+            del siblings[:-20]
+            yield Comment(
+                id=comment_id,
+                post_id=post_id,
+                author_id=random.choice(author_ids),
+                parent_id=parent_id,
+                content=f"Comment {comment_id} " + "lorem ipsum " * random.randint(1, 8),
+            )
+
+    Comment.objects.bulk_create(rows(), batch_size=batch_size)
+    seed.reset_sequences(Comment)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed about --rows rows, export them with export_community's code, "
+        "import the file into a second empty database and report rows/s and "
+        "file size (plus peak heap with --memory). Uses throwaway databases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--memory", action="store_true",
+            help="Also trace peak Python heap per phase (slows every phase down several times).",
+        )
+
+    def phase(self, func):
+        # tracemalloc rather than RSS: seeding has already grown the heap,
+        # so RSS would hide what the phase itself allocates.
+        if self.memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started
+        peak = None
+        if self.memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        return result, elapsed, peak
+
+    def report(self, label, elapsed, peak, rows=None):
+        memory = f"peak heap {peak / 1024 / 1024:.1f}MB" if peak is not None else ""
+        rate = f"{rows:>9} rows {rows / max(elapsed, 1e-9):>9.0f} rows/s" if rows is not None else " " * 30
+        self.stdout.write(f"{label:<16} {elapsed:>8.1f}s {rate}  {memory}")
+
+    def handle(self, *args, **options):
+        total = options["rows"]
+        self.memory = options["memory"]
+        fd, path = tempfile.mkstemp(prefix="community-", suffix=".ndjson.gz")
+        os.close(fd)
+        try:
+            with benchmark_database():
+                self.stdout.write(f"Seeding about {total} rows...")
+                user_ids = seed.seed_users(int(total * SHARES["users"]))
+                post_ids = seed.seed_posts(int(total * SHARES["posts"]), user_ids)
+                seed_comments(int(total * SHARES["comments"]), post_ids, user_ids)
+                seed.seed_likes(int(total * SHARES["likes"]), user_ids, post_ids)
+
+                counts, elapsed, peak = self.phase(lambda: transfer.export(path))
+                self.report("export", elapsed, peak, sum(counts.values()))
+                self.stdout.write(f"{'file size':<16} {os.path.getsize(path) / 1024 / 1024:.1f}MB gzipped")
+
+            with benchmark_database():
+                counts, elapsed, peak = self.phase(
+                    lambda: transfer.import_(path, batch_size=options["batch_size"], rebuild=False)
+                )
+                self.report("import", elapsed, peak, sum(counts.values()))
+                for label, step in (
+                    ("rebuild closure", closure.rebuild),
+                    ("rebuild counters", sharded.rebuild),
+                    ("rebuild board", rebuild_leaderboard),
+                ):
+                    _, elapsed, peak = self.phase(step)
+                    self.report(label, elapsed, peak)
+        finally:
+            for leftover in (path, transfer.checkpoint_path(path)):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
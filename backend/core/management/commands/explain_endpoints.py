@@ -0,0 +1,131 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from comments.models import Comment
+from core import seed
+from core.benchmarks import benchmark_database
+from karma.leaderboard import Leaderboard, rebuild
+from karma.sorted_sets import InMemorySortedSets
+
+
+def explain(sql):
+    """Plan lines for one captured SELECT, in the backend's own words."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            return [row[-1] for row in cursor.fetchall()]
+        cursor.execute("EXPLAIN " + sql)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def flags(plan):
+    """Sequential scans and sorts worth an index, one note per plan line."""
+    found = []
+    for line in plan:
+        text = line.strip().lstrip("->").strip()
+        if connection.vendor == "sqlite":
+            if text.startswith("SCAN ") and "USING" not in text and "CONSTANT ROW" not in text:
+                found.append(f"full scan: {text}")
+            if "USE TEMP B-TREE" in text:
+                found.append(f"sort: {text}")
+        else:
+            if text.startswith(("Seq Scan", "Parallel Seq Scan")):
+                found.append(f"seq scan: {text}")
+            if text.startswith(("Sort", "Incremental Sort")):
+                found.append(f"sort: {text}")
+    return found
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a throwaway database, capture the SQL behind each endpoint, "
+        "EXPLAIN it (SQLite or Postgres) and flag full scans and sorts. Also "
+        "reports queries and median latency per endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--posts", type=int, default=20000)
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument("--likes", type=int, default=50000)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--plans", action="store_true", help="Print every plan, not just flagged ones.")
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user_ids = seed.seed_users(options["users"])
+            post_ids = seed.seed_posts(options["posts"], user_ids)
+            # One big thread plus nine small ones so per-post filters matter.
+            big_post = post_ids[-1]
+            comment_ids = seed.seed_comment_tree(big_post, options["comments"] // 2, user_ids)
+            for post_id in post_ids[-10:-1]:
+                seed.seed_comment_tree(post_id, options["comments"] // 18, user_ids)
+            seed.seed_likes(options["likes"], user_ids, post_ids)
+            with connection.cursor() as cursor:
+                # Fresh statistics so the planner sees the seeded row counts.
+                cursor.execute("ANALYZE")
+
+            deepest = (
+                Comment.objects.filter(post_id=big_post)
+                .order_by("-path").values_list("id", flat=True).first()
+            )
+            client = APIClient()
+            client.force_authenticate(User.objects.get(id=user_ids[0]))
+
+            def get(path):
+                def call():
+                    response = client.get(path)
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                return call
+
+            cases = {
+                "feed": get("/posts/?limit=10"),
+                "comments": get(f"/comments/post/{big_post}/"),
+                "comments stream": get(f"/comments/post/{big_post}/?stream=1"),
+                "thread": get(f"/comments/{comment_ids[0]}/thread/"),
+                "ancestors": get(f"/comments/{deepest}/ancestors/"),
+                "leaderboard": get("/leaderboard/?window=24h"),
+                "leaderboard reload": lambda: rebuild(Leaderboard(InMemorySortedSets())),
+            }
+
+            timings = {}
+            for label, call in cases.items():
+                call()  # warm caches (e.g. the in-process leaderboard)
+                with CaptureQueriesContext(connection) as captured:
+                    call()
+                queries = captured.captured_queries
+
+                self.stdout.write(self.style.MIGRATE_HEADING(f"== {label} ({len(queries)} queries)"))
+                seen = set()
+                for query in queries:
+                    sql = query["sql"]
+                    if sql in seen or not sql.lstrip().upper().startswith("SELECT"):
+                        continue
+                    seen.add(sql)
+                    plan = explain(sql)
+                    problems = flags(plan)
+                    if not problems and not options["plans"]:
+                        continue
+                    self.stdout.write(f"  {sql[:160]}{'...' if len(sql) > 160 else ''}")
+                    for line in plan:
+                        self.stdout.write(f"    | {line}")
+                    for problem in problems:
+                        self.stdout.write(self.style.WARNING(f"    ! {problem}"))
+
+                samples = []
+                for _ in range(options["repeat"]):
+                    started = time.perf_counter()
+                    call()
+                    samples.append(time.perf_counter() - started)
+                timings[label] = (len(queries), statistics.median(samples))
+
+            self.stdout.write(self.style.MIGRATE_HEADING("== summary"))
+            for label, (queries, seconds) in timings.items():
+                self.stdout.write(f"  {label:<20} {queries:>3} queries  median {seconds * 1000:8.2f}ms")
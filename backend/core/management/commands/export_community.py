@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream users, posts, comments, likes and the karma ledger to a "
+        "gzipped NDJSON file with constant memory. The file includes "
+        "password hashes; treat it as a secret."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        counts = transfer.export(options["path"], chunk_size=options["chunk_size"])
+        elapsed = time.perf_counter() - started
+        for label, count in counts.items():
+            self.stdout.write(f"{label:<25} {count:>10} rows")
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Exported {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s)."
+        ))
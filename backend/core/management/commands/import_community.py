@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a file written by export_community with batched bulk_create. "
+        "Progress is checkpointed after every batch; rerun with --resume to "
+        "continue an interrupted import."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--resume", action="store_true")
+        parser.add_argument(
+            "--no-rebuild", action="store_true",
+            help="Skip rebuilding comment closure, counters and the leaderboard.",
+        )
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be positive")
+
+        last_report = [time.perf_counter()]
+
+        def progress(counts):
+            if time.perf_counter() - last_report[0] >= 5:
+                last_report[0] = time.perf_counter()
+                self.stdout.write(f"  {sum(counts.values())} rows so far")
+
+        started = time.perf_counter()
+        counts = transfer.import_(
+            options["path"],
+            batch_size=options["batch_size"],
+            resume=options["resume"],
+            rebuild=not options["no_rebuild"],
+            progress=progress,
+        )
+        elapsed = time.perf_counter() - started
+        for label, count in counts.items():
+            self.stdout.write(f"{label:<25} {count:>10} rows")
+        total = sum(counts.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {total} rows in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} rows/s)."
+        ))
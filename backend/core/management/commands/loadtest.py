@@ -0,0 +1,319 @@
+import asyncio
+import json
+import random
+import ssl
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.benchmarks import percentile
+
+DEFAULT_MIX = "feed=70,comments=20,likes=8,posts=2"
+
+# Substrings of error bodies that mean a request lost a lock wait
+# (SQLite "database is locked", Postgres lock_timeout / deadlocks). Only
+# visible when the server sends error details (DEBUG); otherwise they are
+# counted as errors and show up in the status breakdown as 500s.
+LOCK_MARKERS = (b"database is locked", b"lock timeout", b"deadlock detected", b"LockNotAvailable")
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection speaking just enough of the protocol."""
+
+    def __init__(self, host, port, use_ssl):
+        self.host = host
+        self.port = port
+        self.ssl = ssl.create_default_context() if use_ssl else None
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=(), body=b""):
+        reused = self.writer is not None
+        try:
+            return await self._request(method, path, headers, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # The server may drop an idle keep-alive connection; retry once.
+            self.close()
+            if not reused:
+                raise
+            return await self._request(method, path, headers, body)
+
+    async def _request(self, method, path, headers, body):
+        if self.writer is None:
+            await self.open()
+        head = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}",
+            f"Content-Length: {len(body)}",
+            *headers,
+        ]
+        self.writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionError("server closed the connection")
+        status = int(status_line.split()[1])
+
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            response_headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in response_headers:
+            content = await self.reader.readexactly(int(response_headers["content-length"]))
+        elif response_headers.get("transfer-encoding", "").lower() == "chunked":
+            content = await self._read_chunked()
+        else:
+            content = await self.reader.read()
+            self.close()
+            return status, content
+
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, content
+
+    async def _read_chunked(self):
+        parts = []
+        while True:
+            size = int((await self.reader.readline()).split(b";")[0], 16)
+            if size == 0:
+                await self.reader.readline()
+                return b"".join(parts)
+            parts.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ACTIONS:
+            raise CommandError(f"Unknown endpoint {name!r}; choose from {', '.join(ACTIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Workload:
+    def __init__(self, tokens, post_ids, auth_reads, encoding):
+        self.tokens = tokens
+        self.post_ids = post_ids
+        self.auth_reads = auth_reads
+        self.encoding = encoding
+
+    def headers(self, auth):
+        headers = [f"Accept-Encoding: {self.encoding}"]
+        if auth:
+            headers.append(f"Authorization: Bearer {random.choice(self.tokens)}")
+        return headers
+
+
+def feed(load):
+    return "GET", "/posts/?limit=10", load.headers(load.auth_reads), b""
+
+
+def comments(load):
+    return "GET", f"/comments/post/{random.choice(load.post_ids)}/", load.headers(load.auth_reads), b""
+
+
+def likes(load):
+    return "POST", f"/likes/post/{random.choice(load.post_ids)}/", load.headers(True), b""
+
+
+def posts(load):
+    body = json.dumps({"content": f"load test post {uuid.uuid4().hex[:8]}"}).encode()
+    return "POST", "/posts/", load.headers(True) + ["Content-Type: application/json"], body
+
+
+ACTIONS = {"feed": feed, "comments": comments, "likes": likes, "posts": posts}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a weighted mix of feed reads, comment reads, like taps and "
+        "post creation against a running server from many concurrent asyncio "
+        "clients, then report throughput, latency percentiles, errors, "
+        "timeouts and lock failures per endpoint. Needs only the stdlib."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000")
+        parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weights per endpoint (default {DEFAULT_MIX}).")
+        parser.add_argument("--clients", type=int, default=50, help="Concurrent connections.")
+        parser.add_argument("--duration", type=float, default=30, help="Seconds to run.")
+        parser.add_argument(
+            "--rate", type=float,
+            help="Open loop: Poisson arrivals at this many requests/s. Default is closed loop.",
+        )
+        parser.add_argument("--think", type=float, default=0, help="Closed loop pause between requests, ms.")
+        parser.add_argument("--users", type=int, default=20, help="Accounts to register for writes.")
+        parser.add_argument("--timeout", type=float, default=10, help="Per-request timeout, seconds.")
+        parser.add_argument("--auth-reads", action="store_true", help="Send tokens on reads (bypasses the response cache).")
+        parser.add_argument("--compressed", action="store_true", help="Ask for br/gzip responses.")
+
+    def handle(self, *args, **options):
+        url = urlsplit(options["url"])
+        if url.scheme not in ("http", "https"):
+            raise CommandError("--url must be http:// or https://")
+        self.target = (
+            url.hostname,
+            url.port or (443 if url.scheme == "https" else 80),
+            url.scheme == "https",
+        )
+        self.options = options
+        self.mix = parse_mix(options["mix"])
+        asyncio.run(self.run())
+
+    def connection(self):
+        return Connection(*self.target)
+
+    async def setup(self):
+        conn = self.connection()
+        run = uuid.uuid4().hex[:6]
+        tokens = []
+        for i in range(self.options["users"]):
+            body = json.dumps({"username": f"load_{run}_{i}", "password": f"load-{run}-pass"}).encode()
+            status, content = await conn.request(
+                "POST", "/accounts/register/", ["Content-Type: application/json"], body
+            )
+            if status != 201:
+                raise CommandError(f"Registering load users failed ({status}): {content[:200]!r}")
+            tokens.append(json.loads(content)["access"])
+
+        status, content = await conn.request("GET", "/posts/?limit=50", [f"Authorization: Bearer {tokens[0]}"])
+        post_ids = [post["id"] for post in json.loads(content)] if status == 200 else []
+        while len(post_ids) < 5:
+            status, content = await conn.request(
+                "POST", "/posts/",
+                [f"Authorization: Bearer {tokens[0]}", "Content-Type: application/json"],
+                json.dumps({"content": "load test seed post"}).encode(),
+            )
+            if status != 201:
+                raise CommandError(f"Creating seed posts failed ({status}): {content[:200]!r}")
+            post_ids.append(json.loads(content)["id"])
+        conn.close()
+
+        encoding = "br, gzip" if self.options["compressed"] else "identity"
+        return Workload(tokens, post_ids, self.options["auth_reads"], encoding)
+
+    async def call(self, load, conn, name, started):
+        method, path, headers, body = ACTIONS[name](load)
+        try:
+            status, content = await asyncio.wait_for(
+                conn.request(method, path, headers, body), self.options["timeout"]
+            )
+        except asyncio.TimeoutError:
+            conn.close()
+            outcome = "timeout"
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            conn.close()
+            outcome = "error"
+        else:
+            if status < 400:
+                outcome = "ok"
+            elif any(marker in content for marker in LOCK_MARKERS):
+                outcome = "lock"
+            else:
+                outcome = "error"
+                self.statuses[name][status] += 1
+        self.results[name].append((time.perf_counter() - started, outcome))
+
+    def pick(self):
+        return random.choices(list(self.mix), weights=list(self.mix.values()))[0]
+
+    async def closed_loop(self, load, deadline):
+        async def client():
+            conn = self.connection()
+            while time.perf_counter() < deadline:
+                await self.call(load, conn, self.pick(), time.perf_counter())
+                if self.options["think"]:
+                    await asyncio.sleep(self.options["think"] / 1000)
+            conn.close()
+
+        await asyncio.gather(*(client() for _ in range(self.options["clients"])))
+
+    async def open_loop(self, load, deadline):
+        # Latency is measured from the scheduled arrival, so time spent
+        # waiting for a free connection counts (no coordinated omission).
+        pool = asyncio.Queue()
+        for _ in range(self.options["clients"]):
+            pool.put_nowait(self.connection())
+
+        async def arrival(name, started):
+            conn = await pool.get()
+            try:
+                await self.call(load, conn, name, started)
+            finally:
+                pool.put_nowait(conn)
+
+        tasks = []
+        next_at = time.perf_counter()
+        while next_at < deadline:
+            delay = next_at - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(arrival(self.pick(), next_at)))
+            next_at += random.expovariate(self.options["rate"])
+        await asyncio.gather(*tasks)
+        while not pool.empty():
+            pool.get_nowait().close()
+
+    async def run(self):
+        load = await self.setup()
+        self.results = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        mode = f"open loop at {self.options['rate']:g} req/s" if self.options["rate"] else "closed loop"
+        self.stdout.write(
+            f"{mode}, {self.options['clients']} clients, {self.options['duration']:g}s "
+            f"against {self.options['url']}"
+        )
+
+        started = time.perf_counter()
+        deadline = started + self.options["duration"]
+        if self.options["rate"]:
+            await self.open_loop(load, deadline)
+        else:
+            await self.closed_loop(load, deadline)
+        elapsed = time.perf_counter() - started
+
+        self.report(elapsed)
+
+    def report(self, elapsed):
+        self.stdout.write(
+            f"{'endpoint':<10} {'reqs':>7} {'req/s':>8} {'p50':>8} {'p90':>8} {'p99':>8} "
+            f"{'max':>8} {'errors':>7} {'timeouts':>9} {'locks':>6}"
+        )
+        everything = []
+        for name in list(self.mix) + ["total"]:
+            rows = everything if name == "total" else self.results.get(name, [])
+            if name != "total":
+                everything.extend(rows)
+            if not rows:
+                continue
+            latencies = [seconds * 1000 for seconds, _ in rows]
+            outcomes = defaultdict(int)
+            for _, outcome in rows:
+                outcomes[outcome] += 1
+            self.stdout.write(
+                f"{name:<10} {len(rows):>7} {len(rows) / elapsed:>8.1f} "
+                f"{percentile(latencies, 50):>6.1f}ms {percentile(latencies, 90):>6.1f}ms "
+                f"{percentile(latencies, 99):>6.1f}ms {max(latencies):>6.1f}ms "
+                f"{outcomes['error']:>7} {outcomes['timeout']:>9} {outcomes['lock']:>6}"
+            )
+        for name, counts in self.statuses.items():
+            breakdown = ", ".join(f"{status} x{count}" for status, count in sorted(counts.items()))
+            self.stdout.write(f"{name} error statuses: {breakdown}")
@@ -0,0 +1,74 @@
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core import partitions, reaper
+from karma.models import KarmaTransaction
+from likes.models import Like
+
+# Each table with what settles the counts its detached rows were part of.
+MODELS = ((Like, reaper.forget_likes), (KarmaTransaction, reaper.forget_karma))
+
+
+def parse_month(value):
+    try:
+        year, month = value.split("-")
+        return date(int(year), int(month), 1)
+    except ValueError:
+        raise CommandError(f"Expected a month like 2025-01, got {value!r}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Maintain the monthly partitions of the like and karma tables "
+        "(Postgres with DB_PARTITION_BY_MONTH only): create the coming "
+        "months' partitions, optionally detach old ones, and list what "
+        "exists. Run it from cron at least once a month."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--convert", action="store_true",
+            help="Partition tables that are still single tables (copies every row "
+                 "under an exclusive lock).",
+        )
+        parser.add_argument("--ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD)
+        parser.add_argument(
+            "--detach-before", type=parse_month, metavar="YYYY-MM",
+            help="Detach partitions of months before this one. Their likes and "
+                 "karma come off the counters, profile stats and leaderboard.",
+        )
+        parser.add_argument("--drop", action="store_true", help="Drop detached partitions instead of keeping them.")
+
+    def handle(self, *args, **options):
+        if not partitions.enabled():
+            raise CommandError("Partitioning needs Postgres and DB_PARTITION_BY_MONTH=True.")
+        if options["drop"] and not options["detach_before"]:
+            raise CommandError("--drop only applies with --detach-before.")
+
+        for model, forget in MODELS:
+            table = model._meta.db_table
+            with transaction.atomic():
+                if options["convert"] and partitions.convert(model):
+                    self.stdout.write(f"{table}: converted to monthly partitions")
+                for name in partitions.ensure(model, options["ahead"]):
+                    self.stdout.write(f"{table}: created {name}")
+                if options["detach_before"]:
+                    for name in partitions.detach(
+                        model, options["detach_before"], forget, drop=options["drop"]
+                    ):
+                        self.stdout.write(f"{table}: {'dropped' if options['drop'] else 'detached'} {name}")
+
+            with connection.cursor() as cursor:
+                if not partitions.is_partitioned(cursor, table):
+                    self.stdout.write(self.style.WARNING(f"{table}: not partitioned (run with --convert)"))
+                    continue
+                months = partitions.partitions(cursor, table)
+                cursor.execute(f"SELECT count(*) FROM {connection.ops.quote_name(table + partitions.DEFAULT_SUFFIX)}")
+                stray = cursor.fetchone()[0]
+            span = f"{months[0][1]:%Y-%m} .. {months[-1][1]:%Y-%m}" if months else "none"
+            self.stdout.write(self.style.SUCCESS(
+                f"{table}: {len(months)} monthly partitions ({span}), {stray} rows in the default partition"
+            ))
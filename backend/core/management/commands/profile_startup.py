@@ -0,0 +1,181 @@
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is imported or cached yet. Prints
+# one JSON line of phase end times, seconds since the script started.
+CHILD = r"""
+import json, sys, time
+from io import BytesIO
+started = time.perf_counter()
+marks = {}
+
+def mark(phase):
+    marks[phase] = time.perf_counter() - started
+
+from django.conf import settings
+settings.INSTALLED_APPS
+mark("settings")
+
+import django
+django.setup()
+mark("apps ready")
+
+from django.utils.module_loading import import_string
+application = import_string(settings.WSGI_APPLICATION)
+mark("wsgi app")
+
+from django.urls import get_resolver
+get_resolver().url_patterns
+mark("urlconf")
+
+def request(path):
+    from wsgiref.util import setup_testing_defaults
+    path, _, query = path.partition("?")
+    environ = {"PATH_INFO": path, "QUERY_STRING": query, "wsgi.input": BytesIO()}
+    setup_testing_defaults(environ)
+    status = []
+    body = application(environ, lambda code, headers, exc_info=None: status.append(code))
+    b"".join(body)
+    getattr(body, "close", lambda: None)()
+    return status[0]
+
+marks["status"] = request(sys.argv[1])
+mark("first response")
+request(sys.argv[1])
+mark("second response")
+print(json.dumps(marks))
+"""
+
+PHASES = ("settings", "apps ready", "wsgi app", "urlconf", "first response", "second response")
+
+
+def parse_importtime(stderr):
+    """``[(module, self_us, cumulative_us, depth)]`` from ``-X importtime`` output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        # One leading space, then two more per level of nesting.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), int(own), int(cumulative), depth))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure cold start: spawn fresh interpreters that load the given "
+        "settings modules, build the WSGI app and serve one request, then "
+        "report time per phase (median over --repeat runs), the slowest "
+        "imports and import time per top-level package."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "modules", nargs="*",
+            help="Settings modules to compare (default: the current one).",
+        )
+        parser.add_argument("--path", default="/", help="Request to serve as the first response.")
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--top", type=int, default=15, help="Imports to list per settings module.")
+        parser.add_argument(
+            "--server", action="store_true",
+            help="Also boot gunicorn.conf.py with and without preload_app and time "
+                 "launch to first response.",
+        )
+
+    def spawn(self, module, path, importtime=False):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": module, "PYTHONDONTWRITEBYTECODE": "1"}
+        command = [sys.executable, *(["-X", "importtime"] if importtime else []), "-c", CHILD, path]
+        started = time.perf_counter()
+        result = subprocess.run(
+            command, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True
+        )
+        elapsed = time.perf_counter() - started
+        if result.returncode:
+            raise CommandError(f"{module} failed to start:\n{result.stderr[-2000:]}")
+        marks = json.loads(result.stdout.strip().splitlines()[-1])
+        return marks, elapsed, result.stderr
+
+    def handle(self, *args, **options):
+        modules = options["modules"] or [os.environ["DJANGO_SETTINGS_MODULE"]]
+        for module in modules:
+            self.profile(module, options)
+            if options["server"]:
+                for preload in (True, False):
+                    samples = [self.serve(module, options["path"], preload) for _ in range(options["repeat"])]
+                    self.stdout.write(
+                        f"  gunicorn {'preload' if preload else 'no preload':<10} "
+                        f"first response {statistics.median(samples) * 1000:8.1f}ms (median)"
+                    )
+
+    def serve(self, module, path, preload):
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        env = {
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": module,
+            "PORT": str(port),
+            "GUNICORN_PRELOAD": str(preload),
+        }
+        started = time.perf_counter()
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+            cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            while True:
+                try:
+                    with urlopen(f"http://127.0.0.1:{port}{path}", timeout=30):
+                        break
+                except HTTPError:
+                    break
+                except (URLError, OSError):
+                    if server.poll() is not None or time.perf_counter() - started > 60:
+                        raise CommandError(f"gunicorn with {module} did not come up")
+                    time.sleep(0.005)
+            return time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait()
+
+    def profile(self, module, options):
+        runs = [self.spawn(module, options["path"]) for _ in range(options["repeat"])]
+        status = runs[0][0]["status"]
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"== {module}: GET {options['path']} -> {status}, median of {len(runs)} runs"
+        ))
+        previous = 0.0
+        for phase in PHASES:
+            at = statistics.median(marks[phase] for marks, _, _ in runs)
+            self.stdout.write(f"  {phase:<18} {(at - previous) * 1000:8.1f}ms   (at {at * 1000:7.1f}ms)")
+            previous = at
+        process = statistics.median(elapsed for _, elapsed, _ in runs)
+        self.stdout.write(f"  {'process total':<18} {process * 1000:8.1f}ms   (interpreter start to exit)")
+
+        # A separate run: -X importtime slows imports down a little.
+        _, _, stderr = self.spawn(module, options["path"], importtime=True)
+        modules = parse_importtime(stderr)
+        self.stdout.write(f"  slowest imports ({len(modules)} modules, cumulative incl. children):")
+        top_level = [entry for entry in modules if entry[3] == 0]
+        for name, _, cumulative, _ in sorted(top_level, key=lambda entry: -entry[2])[:options["top"]]:
+            self.stdout.write(f"    {cumulative / 1000:8.1f}ms  {name}")
+
+        packages = defaultdict(int)
+        for name, own, _, _ in modules:
+            packages[name.split(".")[0]] += own
+        self.stdout.write("  import time by package (self time summed):")
+        for name, own in sorted(packages.items(), key=lambda item: -item[1])[:options["top"]]:
+            self.stdout.write(f"    {own / 1000:8.1f}ms  {name}")
@@ -0,0 +1,123 @@
+import statistics
+import sysconfig
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend import profiling
+from core.benchmarks import ms, percentile
+
+# Own time is charged to the first area whose marker appears in the
+# function's file (or, for C functions, its name).
+AREAS = (
+    ("JWT", ("rest_framework_simplejwt", "/jwt/", "cryptography")),
+    ("Cloudinary", ("cloudinary",)),
+    ("serialization", ("rest_framework/serializers", "rest_framework/fields", "rest_framework/relations",
+                       "rest_framework/renderers", "backend/renderers", "orjson", "json/")),
+    ("DB driver", ("sqlite3", "psycopg2", "psycopg")),
+    ("ORM", ("django/db/",)),
+    ("DRF", ("rest_framework/",)),
+    ("Django", ("django/",)),
+    ("app", (str(settings.BASE_DIR),)),
+)
+
+PREFIXES = (
+    sysconfig.get_paths()["purelib"] + "/",
+    sysconfig.get_paths()["stdlib"] + "/",
+    str(settings.BASE_DIR) + "/",
+)
+
+
+def area(function):
+    filename, _, name = function
+    where = name if filename == "~" else filename
+    for label, markers in AREAS:
+        if any(marker in where for marker in markers):
+            return label
+    return "other"
+
+
+def describe(function):
+    filename, line, name = function
+    if filename == "~":
+        return name
+    for prefix in PREFIXES:
+        if filename.startswith(prefix):
+            return f"{filename[len(prefix):]}:{line}({name})"
+    return f"{filename}:{line}({name})"
+
+
+class Command(BaseCommand):
+    help = (
+        "Summarize the profiles ProfilingMiddleware stored: per endpoint, "
+        "request and SQL time, where the time went (ORM, DB driver, "
+        "serialization, JWT, Cloudinary, ...), the hottest functions by "
+        "own time and the costliest SQL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=settings.PROFILING_DIR)
+        parser.add_argument("--endpoint", help="Only endpoints containing this text, e.g. 'GET /posts/'.")
+        parser.add_argument("--top", type=int, default=10)
+
+    def handle(self, *args, **options):
+        grouped = defaultdict(list)
+        for meta, stats in profiling.stored(options["dir"]):
+            if options["endpoint"] and options["endpoint"] not in meta["endpoint"]:
+                continue
+            grouped[meta["endpoint"]].append((meta, stats))
+        if not grouped:
+            self.stdout.write(f"No profiles in {options['dir']}.")
+            return
+
+        ordered = sorted(grouped.items(), key=lambda item: -sum(meta["ms"] for meta, _ in item[1]))
+        for endpoint, profiles in ordered:
+            self.summarize(endpoint, profiles, options["top"])
+
+    def summarize(self, endpoint, profiles, top):
+        count = len(profiles)
+        durations = [meta["ms"] / 1000 for meta, _ in profiles]
+        queries = statistics.mean(meta["query_count"] for meta, _ in profiles)
+        query_time = statistics.mean(meta["query_ms"] for meta, _ in profiles) / 1000
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {endpoint}"))
+        self.stdout.write(
+            f"  {count} profiles: median {ms(statistics.median(durations))}, "
+            f"p95 {ms(percentile(durations, 95))}; {queries:.1f} queries, {ms(query_time)} in SQL"
+        )
+
+        # Own time per function, averaged over the endpoint's profiles.
+        own = defaultdict(float)
+        calls = defaultdict(int)
+        for _, stats in profiles:
+            for function, (_, primitive, tottime, _, _) in stats.stats.items():
+                own[function] += tottime / count
+                calls[function] += primitive
+        total = sum(own.values()) or 1
+
+        by_area = defaultdict(float)
+        for function, seconds in own.items():
+            by_area[area(function)] += seconds
+        self.stdout.write("  time by area: " + ", ".join(
+            f"{label} {seconds / total:.0%}"
+            for label, seconds in sorted(by_area.items(), key=lambda item: -item[1])
+            if seconds / total >= 0.01
+        ))
+
+        self.stdout.write("  hottest functions (own time per request):")
+        for function, seconds in sorted(own.items(), key=lambda item: -item[1])[:top]:
+            self.stdout.write(
+                f"    {ms(seconds):>10} {seconds / total:5.1%} {calls[function] / count:8.1f} calls  "
+                f"{describe(function)}"
+            )
+
+        statements = defaultdict(lambda: [0, 0.0])
+        for meta, _ in profiles:
+            for query in meta["queries"]:
+                statements[query["sql"]][0] += 1
+                statements[query["sql"]][1] += query["ms"] / 1000
+        if statements:
+            self.stdout.write("  costliest SQL (total over all profiles):")
+            for sql, (runs, seconds) in sorted(statements.items(), key=lambda item: -item[1][1])[:3]:
+                text = sql if len(sql) <= 150 else sql[:147] + "..."
+                self.stdout.write(f"    {ms(seconds):>10} {runs:5d}x  {text}")
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from backend import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        "Print a header that makes ProfilingMiddleware profile the requests "
+        "sending it, for PROFILING_TOKEN_MAX_AGE seconds. Anyone holding it "
+        "can trigger profiles; hand it out like a short-lived password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("label", help="Stored with each profile, e.g. your name or a ticket.")
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{settings.PROFILING_HEADER}: {profiling.token(options['label'])}")
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.reaper import reap
+
+
+class Command(BaseCommand):
+    help = (
+        "Hard-delete soft-deleted posts and comments with everything under "
+        "them (replies, likes, karma) in small batches. Safe to run from "
+        "cron or a scheduler while the site is live."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=settings.REAP_BATCH_SIZE)
+        parser.add_argument(
+            "--pause", type=float, default=settings.REAP_PAUSE_MS,
+            help="Milliseconds to sleep between batches so other writers get the locks.",
+        )
+        parser.add_argument("--limit", type=int, help="Reap at most this many posts and comments.")
+
+    def handle(self, *args, **options):
+        counts = reap(
+            batch_size=options["batch_size"],
+            pause=options["pause"] / 1000,
+            limit=options["limit"],
+        )
+        summary = ", ".join(f"{counts[kind]} {kind}" for kind in ("posts", "comments", "likes", "karma", "notifications", "sketches"))
+        self.stdout.write(self.style.SUCCESS(f"Reaped {summary}."))
@@ -0,0 +1,283 @@
+# Monthly range partitioning of Like and KarmaTransaction on created_at.
+#
+# Opt-in and Postgres only (DB_PARTITION_BY_MONTH); everywhere else the
+# tables stay single tables and every function here returns without doing
+# anything. Partitions are named <table>_pYYYY_MM and cover one UTC month;
+# a <table>_pdefault partition catches rows outside them, and
+# ``ensure`` moves those out when it creates their month.
+#
+# Postgres requires unique indexes on a partitioned table to include the
+# partition key, so the (user, post)-style unique constraints become plain
+# indexes of the same name and the like toggle serializes on an advisory
+# lock (``lock``) instead. The primary key becomes (id, created_at); ids
+# still come from one sequence, so Django can keep treating id as the key.
+from datetime import date, datetime, timezone
+
+from django.conf import settings
+from django.db import connection as default_connection
+from django.db.models import UniqueConstraint
+
+DEFAULT_SUFFIX = "_pdefault"
+
+
+def enabled(connection=None):
+    connection = connection or default_connection
+    return settings.DB_PARTITION_BY_MONTH and connection.vendor == "postgresql"
+
+
+def lock(*key, connection=None):
+    """Hold a transaction-scoped advisory lock on ``key`` when partitioning
+    is on; a no-op otherwise (the unique constraints do the job)."""
+    connection = connection or default_connection
+    if enabled(connection):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [":".join(map(str, key))])
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def _start(month):
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+
+
+def _bound(month):
+    return _start(month).isoformat()
+
+
+def _spec(model):
+    """``(table, [(name, columns)])`` of a model's unique constraints."""
+    uniques = [
+        (constraint.name, [model._meta.get_field(field).column for field in constraint.fields])
+        for constraint in model._meta.constraints
+        if isinstance(constraint, UniqueConstraint) and constraint.fields
+    ]
+    return model._meta.db_table, uniques
+
+
+def _maintenance_lock(cursor, table):
+    # Conversions and rotations of one table never overlap, even when
+    # several instances run manage_partitions from cron.
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", [f"partitions:{table}"])
+
+
+def is_partitioned(cursor, table):
+    cursor.execute(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s))", [table]
+    )
+    return cursor.fetchone()[0]
+
+
+def partitions(cursor, table):
+    """``[(name, month)]`` of the monthly partitions of ``table``, oldest first."""
+    cursor.execute(
+        "SELECT child.relname FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(%s)",
+        [table],
+    )
+    prefix = f"{table}_p"
+    found = []
+    for (name,) in cursor.fetchall():
+        year, _, month = name[len(prefix):].partition("_")
+        if name.startswith(prefix) and year.isdigit() and month.isdigit():
+            found.append((name, date(int(year), int(month), 1)))
+    return sorted(found, key=lambda item: item[1])
+
+
+def _create_partition(cursor, table, month, parent=None):
+    quote = default_connection.ops.quote_name
+    cursor.execute(
+        f"CREATE TABLE {quote(partition_name(table, month))} PARTITION OF {quote(parent or table)} "
+        f"FOR VALUES FROM (%s) TO (%s)",
+        [_bound(month), _bound(add_months(month, 1))],
+    )
+
+
+def _layout(cursor, table):
+    """Everything ``_swap`` has to recreate: constraints by type and the
+    definitions of indexes that don't back a constraint."""
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype IN ('p', 'u', 'f')",
+        [table],
+    )
+    constraints = cursor.fetchall()
+    owned = {name for name, _, _ in constraints}
+    cursor.execute(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s",
+        [table],
+    )
+    indexes = [(name, definition) for name, definition in cursor.fetchall() if name not in owned]
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+    sequence = cursor.fetchone()[0]
+    return constraints, indexes, sequence
+
+
+def _swap(cursor, table, create, column, partitioned, uniques):
+    """Rebuild ``table`` through ``create`` (SQL making ``<table>__new``),
+    copy the rows over and put its keys, indexes and foreign keys back."""
+    quote = default_connection.ops.quote_name
+    new = f"{table}__new"
+    cursor.execute(f"LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE")
+    constraints, indexes, sequence = _layout(cursor, table)
+    unique_names = {name for name, _ in uniques}
+
+    cursor.execute(create.format(new=quote(new), table=quote(table)))
+    if partitioned:
+        cursor.execute(f"SELECT min({quote(column)}) FROM {quote(table)}")
+        oldest = cursor.fetchone()[0]
+        current = month_start(datetime.now(timezone.utc).date())
+        month = month_start(oldest.astimezone(timezone.utc).date()) if oldest else current
+        while month <= add_months(current, settings.PARTITION_MONTHS_AHEAD):
+            _create_partition(cursor, table, month, parent=new)
+            month = add_months(month, 1)
+        cursor.execute(f"CREATE TABLE {quote(table + DEFAULT_SUFFIX)} PARTITION OF {quote(new)} DEFAULT")
+    cursor.execute(f"INSERT INTO {quote(new)} SELECT * FROM {quote(table)}")
+
+    # An identity column's sequence would go with the old table; a serial's
+    # is detached and handed over. Either way the new id draws from it.
+    cursor.execute(
+        "SELECT attidentity FROM pg_attribute WHERE attrelid = to_regclass(%s) AND attname = 'id'", [table]
+    )
+    identity = cursor.fetchone()[0] != ""
+    if not identity:
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    cursor.execute(f"DROP TABLE {quote(table)}")
+    cursor.execute(f"ALTER TABLE {quote(new)} RENAME TO {quote(table)}")
+    if identity:
+        cursor.execute(f"CREATE SEQUENCE {sequence}")
+        cursor.execute(f"ALTER TABLE {quote(table)} ALTER COLUMN id SET DEFAULT nextval(%s)", [sequence])
+    cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {quote(table)}.id")
+    cursor.execute(
+        f"SELECT setval(%s, coalesce(max(id), 1), max(id) IS NOT NULL) FROM {quote(table)}", [sequence]
+    )
+
+    for name, kind, definition in constraints:
+        if kind == "p":
+            key = f"(id, {quote(column)})" if partitioned else "(id)"
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} PRIMARY KEY {key}")
+    for name, columns in uniques:
+        column_list = ", ".join(quote(col) for col in columns)
+        if partitioned:
+            cursor.execute(f"CREATE INDEX {quote(name)} ON {quote(table)} ({column_list})")
+        else:
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} UNIQUE ({column_list})")
+    for name, definition in indexes:
+        if name not in unique_names:
+            cursor.execute(definition)
+    for name, kind, definition in constraints:
+        if kind == "f":
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
+
+
+def convert(model, connection=None, column="created_at"):
+    """Turn ``model``'s table into one partitioned by month on ``column``,
+    copying its rows. Takes an exclusive lock on the table for the copy.
+    Returns False when there was nothing to do."""
+    connection = connection or default_connection
+    if connection.vendor != "postgresql":
+        return False
+    table, uniques = _spec(model)
+    with connection.cursor() as cursor:
+        _maintenance_lock(cursor, table)
+        if is_partitioned(cursor, table):
+            return False
+        _swap(
+            cursor, table,
+            f"CREATE TABLE {{new}} (LIKE {{table}} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({connection.ops.quote_name(column)})",
+            column, True, uniques,
+        )
+    return True
+
+
+def unconvert(model, connection=None, column="created_at"):
+    """The reverse of ``convert``: one plain table with its unique
+    constraints back. Rows in detached partitions are not brought back."""
+    connection = connection or default_connection
+    if connection.vendor != "postgresql":
+        return False
+    table, uniques = _spec(model)
+    with connection.cursor() as cursor:
+        _maintenance_lock(cursor, table)
+        if not is_partitioned(cursor, table):
+            return False
+        _swap(
+            cursor, table,
+            "CREATE TABLE {new} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)",
+            column, False, uniques,
+        )
+    return True
+
+
+def ensure(model, months_ahead=None, connection=None, column="created_at"):
+    """Create the partitions from this month to ``months_ahead`` months out;
+    returns the names created. Rows already sitting in the default partition
+    for one of those months are moved into it."""
+    connection = connection or default_connection
+    table, _ = _spec(model)
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    quote = connection.ops.quote_name
+    created = []
+    with connection.cursor() as cursor:
+        _maintenance_lock(cursor, table)
+        if not is_partitioned(cursor, table):
+            return created
+        existing = {month for _, month in partitions(cursor, table)}
+        current = month_start(datetime.now(timezone.utc).date())
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            if month in existing:
+                continue
+            name = partition_name(table, month)
+            bounds = [_bound(month), _bound(add_months(month, 1))]
+            # A new partition can't overlap rows left in the default one:
+            # build it standalone, move them, then attach.
+            cursor.execute(f"CREATE TABLE {quote(name)} (LIKE {quote(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+            cursor.execute(
+                f"WITH moved AS (DELETE FROM {quote(table + DEFAULT_SUFFIX)} "
+                f"WHERE {quote(column)} >= %s AND {quote(column)} < %s RETURNING *) "
+                f"INSERT INTO {quote(name)} SELECT * FROM moved",
+                bounds,
+            )
+            cursor.execute(
+                f"ALTER TABLE {quote(table)} ATTACH PARTITION {quote(name)} FOR VALUES FROM (%s) TO (%s)", bounds
+            )
+            created.append(name)
+    return created
+
+
+def detach(model, before, forget, drop=False, connection=None):
+    """Detach (and with ``drop`` delete) the partitions of months ending on
+    or before ``before`` (a date); returns their names. ``forget(start,
+    end)`` is called for each month first, to take its rows off whatever
+    counts them (see core.reaper), so run this inside a transaction. The
+    rows stop counting anywhere: likes can be given again and the all-time
+    leaderboard forgets the karma."""
+    connection = connection or default_connection
+    table, _ = _spec(model)
+    quote = connection.ops.quote_name
+    detached = []
+    with connection.cursor() as cursor:
+        _maintenance_lock(cursor, table)
+        if not is_partitioned(cursor, table):
+            return detached
+        for name, month in partitions(cursor, table):
+            if add_months(month, 1) > before:
+                break
+            forget(_start(month), _start(add_months(month, 1)))
+            cursor.execute(f"ALTER TABLE {quote(table)} DETACH PARTITION {quote(name)}")
+            if drop:
+                cursor.execute(f"DROP TABLE {quote(name)}")
+            detached.append(name)
+    return detached
@@ -0,0 +1,181 @@
+# Hiding and hard deletion of posts and comments.
+#
+# DELETE and the admin's hide actions only stamp deleted_at (``hide_posts``,
+# ``hide_comments``). Everything under a deleted post or comment
+# is removed here in batches of at most ``batch_size`` rows, each in its own
+# short transaction, deepest comments first. By the time a comment row is
+# deleted its likes, ledger rows, closure rows, notifications and replies
+# are already gone, and a post's notifications, view sketches and image
+# variants go before the post, so Django's collector never cascades into a
+# large subtree.
+#
+# ``forget_likes`` and ``forget_karma`` settle the counts for the likes and
+# ledger rows of a month before manage_partitions detaches its partition.
+import time
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils.timezone import now
+
+from backend.response_cache import invalidate
+
+from accounts import stats
+from comments.models import Comment, CommentClosure
+from counters import sharded
+from impressions.models import ViewSketch
+from karma import ledger
+from karma.models import KarmaTransaction
+from likes.models import Like
+from notifications import delivery
+from notifications.models import Notification
+from posts import images
+from posts.models import Post
+from sync import log
+from sync.models import Change
+
+
+def hide_posts(ids):
+    """Soft-delete the posts in ``ids``: they leave reads, cached responses
+    and unread counts now, and the sync log tells clients to drop them."""
+    with transaction.atomic():
+        Post.objects.filter(id__in=ids).update(deleted_at=now())
+        invalidate("feed", *(f"comments:{post_id}" for post_id in ids))
+        delivery.forget_posts(ids)
+        for post_id in ids:
+            log.record(Change.POST, post_id, post_id, deleted=True)
+
+
+def hide_comments(rows):
+    """Soft-delete comments, given as ``(id, post_id, parent_id)`` rows,
+    with their replies."""
+    with transaction.atomic():
+        Comment.objects.filter(id__in=[comment_id for comment_id, _, _ in rows]).update(deleted_at=now())
+        invalidate("feed", *{f"comments:{post_id}" for _, post_id, _ in rows})
+        for comment_id, post_id, parent_id in rows:
+            # Replies disappear with it; clients drop the whole subtree.
+            log.record(Change.COMMENT, comment_id, post_id, deleted=True)
+            if parent_id is None:
+                log.record(Change.POST_COUNTS, post_id, post_id)
+
+
+def _batches(queryset, batch_size, pause):
+    """Yield id lists from ``queryset`` until it is empty. Each batch is
+    deleted by the caller before the next is read."""
+    while True:
+        ids = list(queryset[:batch_size])
+        if not ids:
+            return
+        yield ids
+        if pause:
+            time.sleep(pause)
+
+
+def _delete_comments(ids, counts):
+    with transaction.atomic():
+        counts["karma"] += ledger.remove(KarmaTransaction.objects.filter(comment_id__in=ids))
+        counts["likes"] += Like.objects.filter(comment_id__in=ids).delete()[0]
+        sharded.discard(sharded.COMMENT_LIKES, ids)
+        CommentClosure.objects.filter(descendant_id__in=ids).delete()
+        counts["notifications"] += delivery.discard(Notification.objects.filter(comment_id__in=ids))
+        authors = Comment.objects.filter(id__in=ids).values_list("author_id").annotate(total=Count("*"))
+        for author_id, total in authors:
+            stats.bump(author_id, comments=-total)
+        Comment.objects.filter(id__in=ids).delete()
+        counts["comments"] += len(ids)
+
+
+def _reap_comments(comments, batch_size, pause, counts):
+    # Children sort after their parent by path, so descending path order
+    # removes replies before the comments they reply to.
+    ids = comments.order_by("-path", "-id").values_list("id", flat=True)
+    for batch in _batches(ids, batch_size, pause):
+        _delete_comments(batch, counts)
+
+
+def reap_comment(comment_id, batch_size=500, pause=0, counts=None):
+    counts = Counter() if counts is None else counts
+    _reap_comments(
+        Comment.objects.filter(ancestor_links__ancestor_id=comment_id), batch_size, pause, counts
+    )
+    return counts
+
+
+def reap_post(post_id, batch_size=500, pause=0, counts=None):
+    counts = Counter() if counts is None else counts
+    _reap_comments(Comment.objects.filter(post_id=post_id), batch_size, pause, counts)
+
+    entries = KarmaTransaction.objects.filter(post_id=post_id).values_list("id", flat=True)
+    for batch in _batches(entries, batch_size, pause):
+        with transaction.atomic():
+            counts["karma"] += ledger.remove(KarmaTransaction.objects.filter(id__in=batch))
+
+    likes = Like.objects.filter(post_id=post_id).values_list("id", flat=True)
+    for batch in _batches(likes, batch_size, pause):
+        with transaction.atomic():
+            counts["likes"] += Like.objects.filter(id__in=batch).delete()[0]
+
+    notifications = Notification.objects.filter(post_id=post_id).values_list("id", flat=True)
+    for batch in _batches(notifications, batch_size, pause):
+        with transaction.atomic():
+            counts["notifications"] += delivery.discard(Notification.objects.filter(id__in=batch))
+
+    sketches = ViewSketch.objects.filter(post_id=post_id).values_list("id", flat=True)
+    for batch in _batches(sketches, batch_size, pause):
+        counts["sketches"] += ViewSketch.objects.filter(id__in=batch).delete()[0]
+
+    owner_id = Post.objects.filter(id=post_id).values_list("user_id", flat=True).first()
+    with transaction.atomic():
+        sharded.discard(sharded.POST_LIKES, [post_id])
+        images.discard([post_id])
+        if owner_id is not None:
+            stats.bump(owner_id, posts=-1)
+        counts["posts"] += Post.objects.filter(id=post_id).delete()[1].get("posts.Post", 0)
+    return counts
+
+
+def reap(batch_size=500, pause=0, limit=None):
+    """Remove every soft-deleted comment subtree and post; returns counts."""
+    counts = Counter()
+    comments = Comment.objects.filter(deleted_at__isnull=False).order_by("deleted_at")
+    for comment_id in list(comments.values_list("id", flat=True)[:limit]):
+        # Already gone if it sat under another deleted comment.
+        reap_comment(comment_id, batch_size, pause, counts)
+
+    posts = Post.objects.filter(deleted_at__isnull=False).order_by("deleted_at")
+    for post_id in list(posts.values_list("id", flat=True)[:limit]):
+        reap_post(post_id, batch_size, pause, counts)
+    return counts
+
+
+def forget_likes(start, end):
+    """Take the likes created in ``[start, end)`` off the like counters and
+    the owners' likes received, and log the changed counts; the rows
+    themselves are left to whoever removes them. Returns how many posts and
+    comments changed."""
+    likes = Like.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+    received = Counter()
+    changed = 0
+    for post_id, owner_id, total in likes.filter(post__isnull=False).values_list("post_id", "post__user_id").annotate(
+        total=Count("*")
+    ):
+        sharded.increment(sharded.POST_LIKES, post_id, -total)
+        log.record(Change.POST_COUNTS, post_id, post_id)
+        received[owner_id] += total
+        changed += 1
+    for comment_id, post_id, author_id, total in likes.filter(comment__isnull=False).values_list(
+        "comment_id", "comment__post_id", "comment__author_id"
+    ).annotate(total=Count("*")):
+        sharded.increment(sharded.COMMENT_LIKES, comment_id, -total)
+        log.record(Change.COMMENT_COUNTS, comment_id, post_id)
+        received[author_id] += total
+        changed += 1
+    for user_id, total in received.items():
+        stats.bump_after_commit(user_id, likes_received=-total)
+    return changed
+
+
+def forget_karma(start, end):
+    """Take the karma of the ledger rows created in ``[start, end)`` off
+    their owners; returns how many owners changed."""
+    return ledger.forget(KarmaTransaction.objects.filter(created_at__gte=start, created_at__lt=end), at=start)
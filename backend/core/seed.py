@@ -0,0 +1,132 @@
+# Bulk data generators for benchmarks. Only run these against a throwaway
+# database (see core.benchmarks.benchmark_database).
+import random
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.color import no_style
+from django.db import connection
+from django.db.models import Max
+from django.utils.timezone import now
+
+from comments import closure
+from comments.models import Comment
+from karma.models import KarmaTransaction
+from likes.models import Like
+from posts.models import Post
+
+
+def reset_sequences(*models):
+    """Move id sequences past rows inserted with explicit ids (no-op on SQLite)."""
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def _next_id(model):
+    return (model.objects.aggregate(top=Max("id"))["top"] or 0) + 1
+
+
+def seed_users(count, prefix="user", batch_size=5000):
+    start = _next_id(User)
+    User.objects.bulk_create(
+        (
+            User(id=start + i, username=f"{prefix}{start + i}", password="!")
+            for i in range(count)
+        ),
+        batch_size=batch_size,
+    )
+    reset_sequences(User)
+    return list(range(start, start + count))
+
+
+def seed_posts(count, author_ids, batch_size=5000):
+    start = _next_id(Post)
+    Post.objects.bulk_create(
+        (
+            Post(id=start + i, user_id=random.choice(author_ids), content=f"Post {start + i}")
+            for i in range(count)
+        ),
+        batch_size=batch_size,
+    )
+    reset_sequences(Post)
+    return list(range(start, start + count))
+
+
+def random_forest(ids, root_ratio=0.2, max_depth=30):
+    """Return ``{id: parent_id}`` mixing wide threads with deep reply chains.
+
+    Parents always come earlier in ``ids`` than their children.
+    """
+    parent_of = {}
+    depth_of = {}
+    seen = []
+    for comment_id in ids:
+        parent_id = None
+        if seen and random.random() >= root_ratio:
+            # Half the replies go to recent comments to build deeper chains.
+            pool = seen[-20:] if random.random() < 0.5 else seen
+            parent_id = random.choice(pool)
+            if depth_of[parent_id] >= max_depth:
+                parent_id = None
+        depth_of[comment_id] = depth_of[parent_id] + 1 if parent_id else 0
+        parent_of[comment_id] = parent_id
+        seen.append(comment_id)
+    return parent_of
+
+
+def seed_comment_tree(post_id, count, author_ids, batch_size=5000):
+    """Create ``count`` comments on one post shaped by ``random_forest``."""
+    start = _next_id(Comment)
+    parent_of = random_forest(range(start, start + count))
+    Comment.objects.bulk_create(
+        (
+            Comment(
+                id=comment_id,
+                post_id=post_id,
+                author_id=random.choice(author_ids),
+                parent_id=parent_id,
+                content=f"Comment {comment_id} " + "lorem ipsum " * random.randint(1, 8),
+            )
+            for comment_id, parent_id in parent_of.items()
+        ),
+        batch_size=batch_size,
+    )
+    reset_sequences(Comment)
+    closure.rebuild([post_id], batch_size=batch_size)
+    return list(parent_of)
+
+
+def seed_likes(count, user_ids, post_ids, days=8, batch_size=5000):
+    """Create ``count`` distinct post likes plus their ledger rows, with karma
+    timestamps spread over the last ``days`` days. Counters and the
+    leaderboard are not updated."""
+    count = min(count, len(user_ids) * len(post_ids))
+    pairs = set()
+    while len(pairs) < count:
+        pairs.add((random.choice(user_ids), random.choice(post_ids)))
+
+    owners = dict(Post.objects.values_list("id", "user_id"))
+    started = now()
+    Like.objects.bulk_create(
+        (Like(user_id=user_id, post_id=post_id) for user_id, post_id in pairs),
+        batch_size=batch_size,
+    )
+    stamps = (started - timedelta(seconds=random.uniform(0, days * 86400)) for _ in pairs)
+    KarmaTransaction.objects.bulk_create(
+        (
+            KarmaTransaction(
+                user_id=owners[post_id],
+                actor_id=user_id,
+                post_id=post_id,
+                points=5,
+                source="post_like",
+                created_at=at,
+                updated_at=at,
+            )
+            for (user_id, post_id), at in zip(pairs, stamps)
+        ),
+        batch_size=batch_size,
+    )
+    return len(pairs)
@@ -0,0 +1,293 @@
+# Query budgets for the API.
+#
+# QueryBudgetTestCase seeds the same scenario at each of SIZES (that many
+# users, posts, likes, and comments, notifications and sync changes on a
+# probe user's content) and requests every one of its ``endpoints`` at each
+# size. An endpoint's query count must not change with the size: a count
+# that grows is an N+1 or a lookup that depends on how much data there is.
+# Reads must also stay within a generous TIME_FACTOR of their time at the
+# smallest size, unless their response grows with the data. Failures print a
+# per-endpoint report with the statements repeated at the largest size.
+#
+# Each size is seeded in a transaction that is rolled back afterwards, so
+# writes act on the same probe content every time.
+import random
+import re
+import time
+from collections import Counter
+from datetime import timedelta
+from typing import NamedTuple, Optional
+from unittest import mock
+
+import cloudinary
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts import search, stats
+from core.seed import seed_comment_tree, seed_likes, seed_posts, seed_users
+from counters import sharded
+from impressions import buffer
+from karma import leaderboard, snapshots
+from notifications.delivery import Event, deliver
+from notifications.models import Notification
+from posts.models import Post
+from sync import log
+from sync.models import Change
+
+SIZES = (10, 100, 1000)
+# Reads are timed as the best of REPEAT runs.
+REPEAT = 5
+# A read at any size may take TIME_FACTOR times its time at the smallest
+# size, plus TIME_SLACK seconds. Loose on purpose: shared CI runners are
+# noisy, and the query count is the budget that has to hold exactly; this
+# only catches a read that gets slower by an order of magnitude.
+TIME_FACTOR = 10
+TIME_SLACK = 0.05
+PASSWORD = "probe-password"
+
+
+class Endpoint(NamedTuple):
+    """One request. ``path`` and string values in ``data`` are formatted
+    with the scenario's attributes, e.g. ``/comments/{comment}/thread/``."""
+
+    method: str
+    path: str
+    data: Optional[dict] = None
+    anonymous: bool = False
+    # The response itself grows with the data (a whole comment tree, an
+    # admin page until it is full), so only its query count is budgeted,
+    # not its time.
+    scales: bool = False
+    # The scenario's user to send it as; "admin" also has an admin session.
+    user: str = "probe"
+
+    @property
+    def read(self):
+        return self.method in ("GET", "HEAD") or self.path == "/batch/"
+
+    def label(self):
+        if self.anonymous:
+            return f"{self.method} {self.path} (anonymous)"
+        return f"{self.method} {self.path}" + (f" (as {self.user})" if self.user != "probe" else "")
+
+
+class Scenario:
+    """A probe user with a post that has ``size`` comments, notifications
+    and sync changes, among ``size`` users, posts and likes. The probe's
+    own activity goes through the API so counters, karma and the sync log
+    are all real. Also everything a single endpoint needs: a post with an
+    image, a refresh token and a staff user."""
+
+    def __init__(self, testcase, size):
+        self.size = size
+        self.probe = User.objects.create_user("probe", password=PASSWORD)
+        self.friend = User.objects.create_user("friend", password=PASSWORD)
+        self.admin = User.objects.create_superuser("admin", password=PASSWORD)
+        self.username = self.probe.username
+        self.refresh = str(RefreshToken.for_user(self.probe))
+        self.since = log.head()
+
+        users = seed_users(size, prefix="member")
+        posts = seed_posts(size, users)
+
+        # Fixed from here on, e.g. which counter shard a like lands in.
+        random.seed(0)
+        as_probe, as_friend = client(self.probe), client(self.friend)
+        with testcase.captureOnCommitCallbacks(execute=True):
+            self.post = as_probe.post("/posts/", {"content": "Probe post"}).data["id"]
+            self.spare = as_probe.post("/posts/", {"content": "Spare post"}).data["id"]
+            self.photo = as_probe.post("/posts/", {"content": "Photo post"}).data["id"]
+            self.friend_post = as_friend.post("/posts/", {"content": "Friend post"}).data["id"]
+            self.comment = as_friend.post(f"/comments/post/{self.post}/", {"content": "First"}).data["id"]
+            self.reply = as_probe.post(
+                f"/comments/post/{self.post}/", {"content": "Reply", "parent_id": self.comment}
+            ).data["id"]
+            self.leaf = as_friend.post(
+                f"/comments/post/{self.post}/", {"content": "Deeper", "parent_id": self.reply}
+            ).data["id"]
+            as_friend.post(f"/likes/post/{self.post}/")
+            as_friend.post(f"/likes/comment/{self.reply}/")
+            as_probe.post(f"/likes/post/{self.friend_post}/")
+
+        # Uploads need Cloudinary; the stored reference is all reads use.
+        Post.objects.filter(id=self.photo).update(
+            image="image/upload/v1/probe.jpg", image_width=900, image_height=600
+        )
+
+        comments = seed_comment_tree(self.post, size, users)
+        # Interleaved, so every page of the log has both kinds.
+        Change.objects.bulk_create(
+            change
+            for post_id, comment_id in zip(posts, comments)
+            for change in (
+                Change(kind=Change.POST, object_id=post_id, post_id=post_id),
+                Change(kind=Change.COMMENT, object_id=comment_id, post_id=self.post),
+            )
+        )
+        seed_likes(size, users, posts)
+        deliver([
+            Event(self.probe.id, Notification.COMMENT_LIKE, users[0], self.post, comment_id)
+            for comment_id in comments
+        ])
+        for user_id in users:
+            buffer.record(f"user:{user_id}", [self.post])
+        buffer.flush()
+
+        stats.rebuild()
+        sharded.rebuild()
+        snapshots.take(at=now() - timedelta(days=1), full=True)
+        snapshots.take()
+        leaderboard._board = None
+
+    def format(self, value):
+        if isinstance(value, str):
+            # A lone placeholder keeps its type: "{post}" is the post's id.
+            match = re.fullmatch(r"\{(\w+)\}", value)
+            return getattr(self, match[1]) if match else value.format_map(vars(self))
+        if isinstance(value, list):
+            return [self.format(item) for item in value]
+        if isinstance(value, dict):
+            return {key: self.format(item) for key, item in value.items()}
+        return value
+
+
+def client(user=None):
+    api = APIClient()
+    if user is not None:
+        api.credentials(HTTP_AUTHORIZATION=f"Bearer {RefreshToken.for_user(user).access_token}")
+        if user.is_staff:
+            # The admin site authenticates by session, not token.
+            api.force_login(user)
+    return api
+
+
+def _reset_caches():
+    cache.clear()
+    search.cache.clear()
+    buffer.flush()
+
+
+class Measurement(NamedTuple):
+    status: int
+    queries: list
+    seconds: float
+
+
+@override_settings(
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],
+    # Admin pages render without a collectstatic manifest.
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class QueryBudgetTestCase(TestCase):
+    """Subclasses list their ``endpoints``; reads run before writes, in
+    list order, at every size."""
+
+    endpoints = []
+
+    def setUp(self):
+        # Image URLs are built locally; deleting an original never leaves
+        # the process.
+        for patch in (
+            mock.patch.object(cloudinary.config(), "cloud_name", "budget"),
+            mock.patch("cloudinary.uploader.destroy"),
+        ):
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_query_budget(self):
+        if not self.endpoints:
+            return
+        # The first pass warms per-process caches (content types, the
+        # leaderboard module, ...) and is thrown away.
+        ordered = sorted(self.endpoints, key=lambda endpoint: not endpoint.read)
+        results = [{} for _ in ordered]
+        for index, size in enumerate((SIZES[0],) + SIZES):
+            measured = self.measure(size, ordered)
+            if index:
+                for by_size, measurement in zip(results, measured):
+                    by_size[size] = measurement
+
+        failures = {
+            position for position, (endpoint, by_size) in enumerate(zip(ordered, results))
+            if self.over_budget(endpoint, by_size)
+        }
+        if failures:
+            self.fail(report(ordered, results, failures))
+
+    def measure(self, size, endpoints):
+        measured = []
+        with transaction.atomic():
+            scenario = Scenario(self, size)
+            clients = {}
+            for endpoint in endpoints:
+                user = None if endpoint.anonymous else getattr(scenario, endpoint.user)
+                if user not in clients:
+                    clients[user] = client(user)
+                api = clients[user]
+                path, data = scenario.format(endpoint.path), scenario.format(endpoint.data)
+                runs = REPEAT if endpoint.read else 1
+                if endpoint.read:
+                    _reset_caches()
+                    self.request(api, endpoint.method, path, data)
+                best = None
+                for _ in range(runs):
+                    _reset_caches()
+                    measurement = self.request(api, endpoint.method, path, data)
+                    if best is None or measurement.seconds < best.seconds:
+                        best = measurement
+                self.assertLess(best.status, 400, f"{endpoint.label()} at size {size}: {best.status}")
+                measured.append(best)
+            buffer.flush()
+            transaction.set_rollback(True)
+        return measured
+
+    def request(self, api, method, path, data):
+        random.seed(0)
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                started = time.perf_counter()
+                response = getattr(api, method.lower())(path, data, format="json")
+                if response.streaming:
+                    b"".join(response.streaming_content)
+                seconds = time.perf_counter() - started
+        return Measurement(response.status_code, [query["sql"] for query in queries.captured_queries], seconds)
+
+    def over_budget(self, endpoint, by_size):
+        baseline = by_size[SIZES[0]]
+        for measurement in by_size.values():
+            if len(measurement.queries) != len(baseline.queries):
+                return True
+            if endpoint.read and not endpoint.scales and measurement.seconds > baseline.seconds * TIME_FACTOR + TIME_SLACK:
+                return True
+        return False
+
+
+def _shape(sql):
+    """``sql`` with its literals replaced, so repeats of one statement match."""
+    return re.sub(r"'[^']*'|\b\d+(\.\d+)?\b", "?", sql)
+
+
+def report(endpoints, results, failures):
+    header = "".join(f"{size:>16,}" for size in SIZES)
+    lines = ["Query budget exceeded.", "", f"{'endpoint':<48}{header}   (queries / ms)"]
+    for position, (endpoint, by_size) in enumerate(zip(endpoints, results)):
+        cells = "".join(
+            f"{len(by_size[size].queries):>7} / {by_size[size].seconds * 1000:>6.1f}" for size in SIZES
+        )
+        mark = "  <-- over budget" if position in failures else ""
+        lines.append(f"{endpoint.label():<48}{cells}{mark}")
+    for position in sorted(failures):
+        endpoint = endpoints[position]
+        largest = results[position][SIZES[-1]]
+        repeated = Counter(_shape(sql) for sql in largest.queries)
+        lines += ["", f"{endpoint.label()} at {SIZES[-1]:,}:"]
+        lines += [f"  {count:>5}x {sql[:300]}" for sql, count in repeated.most_common() if count > 1] or [
+            f"  {sql[:300]}" for sql in largest.queries
+        ]
+    return "\n".join(lines)
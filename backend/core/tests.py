@@ -0,0 +1,588 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+
+from accounts import stats
+from comments.models import Comment
+from core import batch, partitions, reaper, seed, testing, transfer
+from core.management.commands.explain_endpoints import explain, flags
+from core.management.commands.loadtest import Connection, parse_mix
+from core.management.commands.manage_partitions import MODELS
+from core.testing import Endpoint
+from counters import sharded
+from counters.models import CounterShard
+from impressions import buffer
+from impressions.models import ViewSketch
+from karma import snapshots
+from karma.models import KarmaRemoval, KarmaTransaction, SnapshotRank
+from likes.models import Like
+from notifications.delivery import unread_count
+from notifications.models import Notification
+from posts.models import Post
+from sync.models import Change
+
+
+class BatchQueryBudgetTests(testing.QueryBudgetTestCase):
+    endpoints = [
+        Endpoint("POST", "/batch/", {"requests": [
+            "/posts/", "/leaderboard/", "/leaderboard/me/", "/notifications/unread/",
+            "/notifications/", "/accounts/{username}/",
+        ]}),
+        Endpoint("GET", "/cache-stats/", user="admin"),
+    ]
+
+
+class BatchTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("member")
+        Post.objects.create(user=self.user, content="Hello")
+
+    def batch(self, data, user=None):
+        return testing.client(user).post("/batch/", data, format="json")
+
+    def test_matches_the_individual_requests(self):
+        paths = ["/posts/", "/leaderboard/me/", "/notifications/unread/", "/accounts/member/"]
+        response = self.batch({"requests": paths[:2] + [{"path": path} for path in paths[2:]]}, self.user)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()["responses"]
+        self.assertEqual([result["path"] for result in results], paths)
+        for path, result in zip(paths, results):
+            single = testing.client(self.user).get(path)
+            self.assertEqual((result["status"], result["body"]), (single.status_code, single.json()), path)
+
+    def test_failures_stay_in_their_item(self):
+        paths = [
+            "/posts/", "/posts/nowhere/", "http://example.com/posts/", "/batch/", "/admin/", "/leaderboard/me/",
+        ]
+        results = self.batch({"requests": paths}).json()["responses"]
+        self.assertEqual([result["status"] for result in results], [200, 404, 400, 400, 400, 401])
+        self.assertEqual(results[3]["body"], {"error": "batch requests can't be nested"})
+
+    def test_rejects_bad_batches(self):
+        self.assertEqual(self.batch({"requests": []}).status_code, 400)
+        self.assertEqual(self.batch({"requests": [{"path": "/posts/", "method": "POST"}]}).status_code, 400)
+        self.assertEqual(self.batch({"requests": [42]}).status_code, 400)
+        with override_settings(BATCH_MAX_REQUESTS=2):
+            self.assertEqual(self.batch({"requests": ["/posts/"] * 3}).status_code, 400)
+
+    def test_parallel_keeps_request_order(self):
+        def dispatch(request, path):
+            time.sleep(0.01 * (5 - int(path[1:])))
+            return 200, "application/json", path.encode()
+
+        paths = [f"/{index}" for index in range(5)]
+        with mock.patch.object(batch, "dispatch", dispatch):
+            results = batch.run(None, paths, workers=5)
+        self.assertEqual([body for _, _, body in results], [path.encode() for path in paths])
+
+
+class FlagTests(SimpleTestCase):
+    def test_sqlite_plan_lines(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("SQLite plan wording")
+        self.assertEqual(flags([
+            "SCAN posts_post USING INDEX post_created_idx",
+            "SEARCH auth_user USING INTEGER PRIMARY KEY (rowid=?)",
+            "SCAN CONSTANT ROW",
+        ]), [])
+        self.assertEqual(flags(["SCAN comments_comment", "USE TEMP B-TREE FOR ORDER BY"]), [
+            "full scan: SCAN comments_comment",
+            "sort: USE TEMP B-TREE FOR ORDER BY",
+        ])
+
+
+class EndpointPlanTests(TestCase):
+    def setUp(self):
+        users = seed.seed_users(20)
+        posts = seed.seed_posts(200, users)
+        self.post = posts[-1]
+        self.deepest = seed.seed_comment_tree(self.post, 200, users)[-1]
+        seed.seed_likes(200, users, posts)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.get(id=users[0]))
+
+    def assertPlansClean(self, path):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.api.get(path)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        selects = [query["sql"] for query in captured.captured_queries if query["sql"].startswith("SELECT")]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertEqual(flags(explain(sql)), [], sql)
+
+    def test_indexed_endpoints_neither_scan_nor_sort(self):
+        self.assertPlansClean("/posts/?limit=10")
+        self.assertPlansClean(f"/comments/post/{self.post}/")
+        self.assertPlansClean(f"/comments/post/{self.post}/?stream=1")
+        self.assertPlansClean(f"/comments/{self.deepest}/ancestors/")
+
+
+class LoadTestClientTests(SimpleTestCase):
+    def test_parse_mix(self):
+        self.assertEqual(parse_mix("feed=3, likes"), {"feed": 3.0, "likes": 1.0})
+        with self.assertRaises(CommandError):
+            parse_mix("feed=1,search=2")
+
+    def test_chunked_and_keep_alive(self):
+        responses = [
+            b"HTTP/1.1 200 OK\r\nTransfer-Encoding: chunked\r\n\r\n3\r\nabc\r\n2\r\nde\r\n0\r\n\r\n",
+            b"HTTP/1.1 404 Not Found\r\nContent-Length: 2\r\nConnection: close\r\n\r\nno",
+        ]
+
+        async def serve(reader, writer):
+            for response in responses:
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+                writer.write(response)
+                await writer.drain()
+            writer.close()
+
+        async def run():
+            server = await asyncio.start_server(serve, "127.0.0.1", 0)
+            conn = Connection("127.0.0.1", server.sockets[0].getsockname()[1], False)
+            first = await conn.request("GET", "/a")
+            second = await conn.request("GET", "/b")
+            reused = conn.writer
+            server.close()
+            await server.wait_closed()
+            return first, second, reused
+
+        first, second, reused = asyncio.run(run())
+        self.assertEqual(first, (200, b"abcde"))
+        self.assertEqual(second, (404, b"no"))
+        self.assertIsNone(reused)
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class LoadTestCommandTests(LiveServerTestCase):
+    # One connection: the live server's threads share the in-memory SQLite
+    # connection, so concurrent writes would fail for reasons of their own.
+    def totals(self, **options):
+        out = StringIO()
+        call_command("loadtest", url=self.live_server_url, duration=0.3, users=2, stdout=out, **options)
+        total = next(line for line in out.getvalue().splitlines() if line.startswith("total"))
+        return total.split()
+
+    def test_closed_loop(self):
+        total = self.totals(mix="feed=1,comments=1,likes=1", clients=1)
+        self.assertGreater(int(total[1]), 0)
+        self.assertEqual(total[-3:], ["0", "0", "0"])
+
+    def test_open_loop(self):
+        total = self.totals(rate=50, clients=1, compressed=True)
+        self.assertGreater(int(total[1]), 0)
+        self.assertEqual(total[-3:], ["0", "0", "0"])
+
+
+class Crash(Exception):
+    pass
+
+
+class TransferTests(TestCase):
+    def setUp(self):
+        users = seed.seed_users(5)
+        posts = seed.seed_posts(10, users)
+        seed.seed_comment_tree(posts[0], 30, users)
+        seed.seed_likes(20, users, posts)
+        self.post = posts[0]
+        self.before = self.dump()
+        self.paths = dict(Comment.objects.values_list("id", "path"))
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "community.ndjson.gz")
+        transfer.export(self.path)
+        self.wipe()
+
+    def dump(self):
+        return {
+            transfer._label(model): list(model.objects.order_by("id").values_list(*columns))
+            for model, columns, _ in transfer.TABLES
+        }
+
+    def wipe(self):
+        for model, _, _ in reversed(transfer.TABLES):
+            model.objects.all().delete()
+
+    def crash_after(self, flushes):
+        calls = []
+
+        def progress(counts):
+            calls.append(counts)
+            if len(calls) == flushes:
+                raise Crash
+
+        return progress
+
+    def test_round_trip(self):
+        counts = transfer.import_(self.path, batch_size=7)
+
+        self.assertEqual(self.dump(), self.before)
+        self.assertEqual(counts, {label: len(rows) for label, rows in self.before.items()})
+        self.assertEqual(dict(Comment.objects.values_list("id", "path")), self.paths)
+        likes = Post.objects.get(id=self.post).likes.count()
+        self.assertEqual(sharded.get_count(sharded.POST_LIKES, self.post), likes)
+        self.assertFalse(os.path.exists(transfer.checkpoint_path(self.path)))
+
+    def test_resume_after_a_crash(self):
+        with self.assertRaises(Crash):
+            transfer.import_(self.path, batch_size=7, progress=self.crash_after(6))
+        crashed_at = transfer._read_checkpoint(self.path)
+        self.assertGreater(crashed_at, 0)
+
+        written = []
+        write = transfer._write_checkpoint
+        with mock.patch.object(transfer, "_write_checkpoint", lambda path, line: (written.append(line), write(path, line))):
+            transfer.import_(self.path, batch_size=7, resume=True)
+
+        self.assertEqual(self.dump(), self.before)
+        self.assertEqual(written, sorted(written))
+        self.assertGreater(written[0], crashed_at)
+
+    def test_timestamps_restored_after_a_failed_import(self):
+        field = Post._meta.get_field("created_at")
+        with self.assertRaises(Crash):
+            transfer.import_(self.path, progress=self.crash_after(1))
+        self.assertTrue(field.auto_now_add)
+
+
+class ReaperTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user("owner")
+        self.fan = User.objects.create_user("fan")
+        owner, fan = testing.client(self.owner), testing.client(self.fan)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = owner.post("/posts/", {"content": "Doomed"}).data["id"]
+            self.comment = owner.post(f"/comments/post/{self.post}/", {"content": "Mine"}).data["id"]
+            self.reply = fan.post(
+                f"/comments/post/{self.post}/", {"content": "Reply", "parent_id": self.comment}
+            ).data["id"]
+            fan.post(f"/likes/post/{self.post}/")
+            fan.post(f"/likes/comment/{self.comment}/")
+            owner.post(f"/likes/comment/{self.reply}/")
+        buffer.record("user:fan", [self.post])
+        buffer.flush()
+
+    def assertNothingLeft(self, comment_ids):
+        self.assertFalse(Comment.objects.filter(id__in=comment_ids).exists())
+        self.assertFalse(Like.objects.filter(comment_id__in=comment_ids).exists())
+        self.assertFalse(KarmaTransaction.objects.filter(comment_id__in=comment_ids).exists())
+        self.assertFalse(Notification.objects.filter(comment_id__in=comment_ids).exists())
+        self.assertFalse(
+            CounterShard.objects.filter(name=sharded.COMMENT_LIKES, object_id__in=comment_ids).exists()
+        )
+
+    def test_comment_subtree(self):
+        self.assertEqual(unread_count(self.owner.id), 3)
+        self.assertEqual(unread_count(self.fan.id), 1)
+        testing.client(self.owner).delete(f"/comments/{self.comment}/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            counts = reaper.reap(batch_size=1)
+
+        self.assertEqual(counts["comments"], 2)
+        self.assertNothingLeft([self.comment, self.reply])
+        self.assertEqual(unread_count(self.owner.id), Notification.objects.filter(recipient=self.owner).count())
+        self.assertEqual(unread_count(self.fan.id), 0)
+        self.assertEqual(sharded.get_count(sharded.USER_KARMA, self.owner.id), 5)
+
+    def test_post_and_everything_on_it(self):
+        self.assertGreater(unread_count(self.owner.id), 0)
+        testing.client(self.owner).delete(f"/posts/{self.post}/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            counts = reaper.reap(batch_size=1)
+
+        self.assertEqual((counts["posts"], counts["comments"], counts["sketches"]), (1, 2, 2))
+        self.assertFalse(Post.objects.filter(id=self.post).exists())
+        self.assertNothingLeft([self.comment, self.reply])
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(ViewSketch.objects.exists())
+        self.assertFalse(KarmaTransaction.objects.exists())
+        self.assertEqual(unread_count(self.owner.id), 0)
+        self.assertEqual(unread_count(self.fan.id), 0)
+        self.assertEqual(sharded.get_count(sharded.POST_LIKES, self.post), 0)
+        self.assertEqual(sharded.get_count(sharded.USER_KARMA, self.owner.id), 0)
+        self.assertEqual(list(stats.check()), [])
+
+
+class PartitionDetachTests(TestCase):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    end = datetime(2024, 2, 1, tzinfo=timezone.utc)
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user("owner")
+        self.fan, self.recent = User.objects.create_user("fan"), User.objects.create_user("recent")
+        owner = testing.client(self.owner)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = owner.post("/posts/", {"content": "Old news"}).data["id"]
+            self.comment = owner.post(f"/comments/post/{self.post}/", {"content": "Mine"}).data["id"]
+            testing.client(self.fan).post(f"/likes/post/{self.post}/")
+            testing.client(self.fan).post(f"/likes/comment/{self.comment}/")
+            testing.client(self.recent).post(f"/likes/post/{self.post}/")
+        # The fan's likes (and the karma they earned) are in January 2024.
+        old = self.start + timedelta(days=3)
+        Like.objects.filter(user=self.fan).update(created_at=old)
+        KarmaTransaction.objects.filter(actor=self.fan).update(created_at=old)
+
+    def detach_january(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            reaper.forget_likes(self.start, self.end)
+            reaper.forget_karma(self.start, self.end)
+            # What DETACH PARTITION does to the rows.
+            Like.objects.filter(created_at__lt=self.end).delete()
+            KarmaTransaction.objects.filter(created_at__lt=self.end).delete()
+
+    def test_counts_match_what_is_left(self):
+        since = Change.objects.count()
+        self.detach_january()
+
+        self.assertEqual(sharded.get_count(sharded.POST_LIKES, self.post), 1)
+        self.assertEqual(sharded.get_count(sharded.COMMENT_LIKES, self.comment), 0)
+        self.assertEqual(sharded.get_count(sharded.USER_KARMA, self.owner.id), 5)
+        self.assertEqual(list(stats.check()), [])
+        self.assertEqual(
+            set(Change.objects.order_by("id")[since:].values_list("kind", "object_id")),
+            {(Change.POST_COUNTS, self.post), (Change.COMMENT_COUNTS, self.comment)},
+        )
+        self.assertEqual(testing.client(self.fan).post(f"/likes/post/{self.post}/").data["like_count"], 2)
+
+    def test_incremental_snapshot_sees_the_forgotten_karma(self):
+        snapshots.take(at=now() - timedelta(days=1), full=True)
+        self.detach_january()
+        self.assertTrue(KarmaRemoval.objects.filter(user=self.owner).exists())
+
+        incremental = snapshots.take()
+        full = snapshots.take(at=now() + timedelta(days=1), full=True)
+        self.assertEqual(self.ranks(incremental), [(self.owner.id, 5)])
+        self.assertEqual(self.ranks(incremental), self.ranks(full))
+
+    def ranks(self, snapshot):
+        rows = SnapshotRank.objects.filter(taken_at=snapshot.taken_at).order_by("rank")
+        return list(rows.values_list("user_id", "karma"))
+
+    def test_each_month_is_settled_before_it_is_detached(self):
+        calls = []
+        cursor = mock.MagicMock()
+        cursor.execute.side_effect = lambda sql, params=None: calls.append(sql)
+        connection = mock.MagicMock()
+        connection.cursor.return_value.__enter__.return_value = cursor
+        connection.ops.quote_name = lambda name: f'"{name}"'
+        months = [
+            ("likes_like_p2024_01", date(2024, 1, 1)),
+            ("likes_like_p2024_02", date(2024, 2, 1)),
+            ("likes_like_p2024_03", date(2024, 3, 1)),
+        ]
+        with mock.patch.object(partitions, "is_partitioned", return_value=True), \
+                mock.patch.object(partitions, "partitions", return_value=months):
+            detached = partitions.detach(
+                Like, date(2024, 3, 1), lambda start, end: calls.append((start, end)), connection=connection
+            )
+
+        self.assertEqual(detached, ["likes_like_p2024_01", "likes_like_p2024_02"])
+        # After the maintenance lock:
+        self.assertEqual(calls[1:], [
+            (self.start, self.end),
+            'ALTER TABLE "likes_like" DETACH PARTITION "likes_like_p2024_01"',
+            (self.end, datetime(2024, 3, 1, tzinfo=timezone.utc)),
+            'ALTER TABLE "likes_like" DETACH PARTITION "likes_like_p2024_02"',
+        ])
+
+
+def _convert(*models, reverse=False):
+    with transaction.atomic():
+        for model in models:
+            (partitions.unconvert if reverse else partitions.convert)(model)
+
+
+@skipUnless(connection.vendor == "postgresql", "partitioning needs Postgres")
+@override_settings(DB_PARTITION_BY_MONTH=True, PARTITION_MONTHS_AHEAD=1)
+class PostgresPartitionTests(TestCase):
+    """The real DDL, rolled back with each test."""
+
+    january = date(2024, 1, 1)
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user("owner")
+        self.fans = [User.objects.create_user(f"fan{index}") for index in range(3)]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post = testing.client(self.owner).post("/posts/", {"content": "Hello"}).data["id"]
+            for fan in self.fans:
+                testing.client(fan).post(f"/likes/post/{self.post}/")
+        old = partitions._start(self.january) + timedelta(days=3)
+        Like.objects.filter(user=self.fans[0]).update(created_at=old)
+        KarmaTransaction.objects.filter(actor=self.fans[0]).update(created_at=old)
+        with connection.cursor() as cursor:
+            # For the rest of the test's transaction: foreign key checks
+            # left pending would block the ALTER TABLEs.
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+
+    def months(self, model):
+        with connection.cursor() as cursor:
+            return [month for _, month in partitions.partitions(cursor, model._meta.db_table)]
+
+    def stray(self, model):
+        table = connection.ops.quote_name(model._meta.db_table + partitions.DEFAULT_SUFFIX)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {table}")
+            return cursor.fetchone()[0]
+
+    def test_convert_ensure_detach(self):
+        current = partitions.month_start(now().date())
+        for model in (Like, KarmaTransaction):
+            self.assertTrue(partitions.convert(model))
+            self.assertFalse(partitions.convert(model))
+            months = self.months(model)
+            self.assertEqual((months[0], months[-1]), (self.january, partitions.add_months(current, 1)))
+        self.assertEqual(Like.objects.count(), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            unliked = testing.client(self.fans[1]).post(f"/likes/post/{self.post}/")
+            liked = testing.client(self.fans[1]).post(f"/likes/post/{self.post}/")
+        self.assertEqual((unliked.data["like_count"], liked.data["like_count"]), (2, 3))
+
+        # A row past the last partition waits in the default one until
+        # ensure creates its month.
+        later = partitions.add_months(current, 3)
+        Like.objects.filter(user=self.fans[2]).update(created_at=partitions._start(later))
+        self.assertEqual(self.stray(Like), 1)
+        self.assertEqual(partitions.ensure(Like, months_ahead=3), [
+            partitions.partition_name(Like._meta.db_table, partitions.add_months(current, 2)),
+            partitions.partition_name(Like._meta.db_table, later),
+        ])
+        self.assertEqual(self.stray(Like), 0)
+        self.assertEqual(Like.objects.count(), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for model, forget in MODELS:
+                detached = partitions.detach(model, partitions.add_months(self.january, 1), forget, drop=True)
+                self.assertEqual(detached, [partitions.partition_name(model._meta.db_table, self.january)])
+        self.assertEqual(Like.objects.count(), 2)
+        self.assertEqual(sharded.get_count(sharded.POST_LIKES, self.post), 2)
+        self.assertEqual(sharded.get_count(sharded.USER_KARMA, self.owner.id), 10)
+        self.assertEqual(list(stats.check()), [])
+
+
+@skipUnless(connection.vendor == "postgresql", "partitioning needs Postgres")
+@override_settings(DB_PARTITION_BY_MONTH=True)
+class PostgresLikeLockTests(TransactionTestCase):
+    """Without unique constraints on the partitioned tables, concurrent
+    toggles by one user must still take turns."""
+
+    def setUp(self):
+        cache.clear()
+        self.owner, self.fan = User.objects.create_user("owner"), User.objects.create_user("fan")
+        self.post = Post.objects.create(user=self.owner, content="Hello")
+        _convert(Like, KarmaTransaction)
+        self.addCleanup(_convert, Like, KarmaTransaction, reverse=True)
+
+    def test_concurrent_toggles_take_turns(self):
+        barrier = threading.Barrier(4)
+        liked = []
+
+        def toggle():
+            try:
+                api = testing.client(self.fan)
+                barrier.wait()
+                liked.append(api.post(f"/likes/post/{self.post.id}/").data["liked"])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=toggle) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(liked), [False, False, True, True])
+        self.assertEqual(Like.objects.filter(user=self.fan).count(), 0)
+        self.assertEqual(KarmaTransaction.objects.filter(actor=self.fan).count(), 1)
+        self.assertEqual(sharded.get_count(sharded.POST_LIKES, self.post.id, fresh=True), 0)
+        self.assertEqual(sharded.get_count(sharded.USER_KARMA, self.owner.id, fresh=True), 0)
+
+
+@override_settings(
+    ADMIN_EXACT_COUNT_LIMIT=5,
+    # Pages render without a collectstatic manifest.
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class ScalableAdminTests(TestCase):
+    url = "/admin/posts/post/"
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser("admin", password=testing.PASSWORD)
+        self.author = User.objects.create_user("author")
+        self.posts = [Post.objects.create(user=self.author, content=f"Post {index}") for index in range(8)]
+        self.client.force_login(self.admin)
+
+    def ids(self, response):
+        return [post.id for post in response.context["cl"].result_list]
+
+    def test_count_stops_at_the_limit(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, "More than 5 posts")
+        with self.settings(ADMIN_EXACT_COUNT_LIMIT=100):
+            self.assertContains(self.client.get(self.url), "8 posts")
+
+    def test_keyset_pages_newest_first(self):
+        newest = [post.id for post in reversed(self.posts)]
+        with mock.patch("posts.admin.PostAdmin.list_per_page", 3):
+            first = self.client.get(self.url)
+            self.assertEqual(self.ids(first), newest[:3])
+            more = first.context["cl"].more_url
+            self.assertEqual(more, f"?before={newest[2]}")
+
+            second = self.client.get(self.url + more)
+            self.assertEqual(self.ids(second), newest[3:6])
+            last = self.client.get(self.url + second.context["cl"].more_url)
+            self.assertEqual(self.ids(last), newest[6:])
+            self.assertIsNone(last.context["cl"].more_url)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url + more)
+        self.assertFalse([query["sql"] for query in queries if "OFFSET" in query["sql"]])
+
+    def test_search_is_an_exact_match_on_indexed_columns(self):
+        other = Post.objects.create(user=User.objects.create_user("authority"), content="Elsewhere")
+        self.assertEqual(self.ids(self.client.get(self.url, {"q": "authority"})), [other.id])
+        self.assertEqual(self.ids(self.client.get(self.url, {"q": "auth"})), [])
+        self.assertEqual(self.ids(self.client.get(self.url, {"q": str(self.posts[0].id)})), [self.posts[0].id])
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {"q": "author"})
+        searched = [query["sql"] for query in queries if "posts_post" in query["sql"] and "LIKE" in query["sql"]]
+        self.assertEqual(searched, [])
+
+    def test_status_filter(self):
+        Post.objects.filter(id=self.posts[0].id).update(deleted_at=now())
+        self.assertEqual(self.ids(self.client.get(self.url, {"deleted": "yes"})), [self.posts[0].id])
+        self.assertNotIn(self.posts[0].id, self.ids(self.client.get(self.url, {"deleted": "no"})))
+
+    def test_derived_tables_are_read_only(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            testing.client(self.admin).post(f"/likes/post/{self.posts[0].id}/")
+        like = Like.objects.get()
+        self.assertContains(self.client.get("/admin/likes/like/"), f"/admin/likes/like/{like.id}/")
+        self.assertEqual(self.client.get("/admin/likes/like/add/").status_code, 403)
+        self.client.post(f"/admin/likes/like/{like.id}/change/", {"user": self.author.id})
+        self.assertEqual(Like.objects.get().user_id, self.admin.id)
+        self.assertEqual(self.client.get(f"/admin/likes/like/{like.id}/delete/").status_code, 403)
@@ -0,0 +1,178 @@
+# Streaming export/import of community data as gzipped NDJSON.
+#
+# A file is a sequence of sections. Each starts with a header object
+# {"table": "posts.post", "columns": [...]} and is followed by one JSON
+# array per row. Tables are written parents first and comments in tree
+# order, so every row's foreign keys point at rows earlier in the file.
+import gzip
+import json
+import os
+from contextlib import contextmanager, suppress
+
+import orjson
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import DateTimeField
+
+from accounts import stats
+from comments import closure
+from comments.models import Comment
+from counters import sharded
+from karma.leaderboard import rebuild as rebuild_leaderboard
+from karma.models import KarmaTransaction, Snapshot, SnapshotRank
+from likes.models import Like
+from posts.models import Post, PostImageVariant
+from sync import log as sync_log
+from .seed import reset_sequences
+
+TABLES = (
+    (User, (
+        "id", "username", "password", "email", "first_name", "last_name",
+        "is_active", "is_staff", "is_superuser", "date_joined", "last_login",
+    ), ("id",)),
+    (Post, (
+        "id", "user_id", "content", "image", "image_width", "image_height", "image_placeholder",
+        "created_at", "deleted_at",
+    ), ("id",)),
+    # Only the rows; the files stay where the storage put them.
+    (PostImageVariant, ("id", "post_id", "format", "width", "height", "file", "bytes"), ("id",)),
+    # Tree order: a parent's path is a prefix of its children's.
+    (Comment, (
+        "id", "post_id", "author_id", "parent_id", "content", "created_at", "deleted_at",
+    ), ("post_id", "path", "id")),
+    (Like, ("id", "user_id", "post_id", "comment_id", "created_at"), ("id",)),
+    (KarmaTransaction, (
+        "id", "user_id", "actor_id", "post_id", "comment_id", "points", "source", "created_at", "updated_at",
+    ), ("id",)),
+    # Rank history can't be recomputed from the ledger, so it travels too.
+    (Snapshot, ("id", "taken_at", "computed_at", "users", "full"), ("id",)),
+    (SnapshotRank, ("id", "user_id", "taken_at", "rank", "karma"), ("id",)),
+)
+
+
+def _label(model):
+    return model._meta.label_lower
+
+
+def _encoders(model, columns):
+    # Fields with a custom from_db_value (e.g. CloudinaryField) come back as
+    # objects; get_prep_value turns them back into what the column stores.
+    fields = (model._meta.get_field(column) for column in columns)
+    return [field.get_prep_value if hasattr(field, "from_db_value") else None for field in fields]
+
+
+def export(path, chunk_size=2000):
+    """Write every table to ``path``; returns ``{label: rows}``."""
+    counts = {}
+    with gzip.open(path, "wb", compresslevel=6) as out:
+        for model, columns, ordering in TABLES:
+            out.write(orjson.dumps({"table": _label(model), "columns": columns}) + b"\n")
+            encoders = _encoders(model, columns)
+            convert = any(encoders)
+            rows = model.objects.order_by(*ordering).values_list(*columns).iterator(chunk_size=chunk_size)
+            count = 0
+            for row in rows:
+                if convert:
+                    row = [encode(value) if encode else value for encode, value in zip(encoders, row)]
+                out.write(orjson.dumps(row) + b"\n")
+                count += 1
+            counts[_label(model)] = count
+    return counts
+
+
+def checkpoint_path(path):
+    return f"{path}.checkpoint"
+
+
+def _read_checkpoint(path):
+    try:
+        with open(checkpoint_path(path)) as handle:
+            return json.load(handle)["line"]
+    except FileNotFoundError:
+        return 0
+
+
+def _write_checkpoint(path, line):
+    tmp = checkpoint_path(path) + ".tmp"
+    with open(tmp, "w") as handle:
+        json.dump({"line": line}, handle)
+    os.replace(tmp, checkpoint_path(path))
+
+
+@contextmanager
+def _keep_timestamps():
+    # bulk_create runs pre_save, which would stamp auto_now_add fields with
+    # the import time instead of the exported value.
+    # The flag is process-wide, so it is put back however the import ends.
+    fields = [
+        field for model, _, _ in TABLES for field in model._meta.fields
+        if isinstance(field, DateTimeField) and field.auto_now_add
+    ]
+    try:
+        for field in fields:
+            field.auto_now_add = False
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def import_(path, batch_size=5000, resume=False, rebuild=True, progress=None):
+    """Load a file written by ``export`` in batches; returns ``{label: rows}``.
+
+    After each committed batch the number of lines consumed is written to
+    ``<path>.checkpoint``. With ``resume=True`` lines up to the checkpoint
+    are skipped, and rows that already exist (a batch that committed just
+    before a crash) are ignored. Derived data (comment paths and closure,
+    counters, profile stats, leaderboard) is rebuilt at the end unless ``rebuild`` is False.
+    """
+    start = _read_checkpoint(path) if resume else 0
+    counts = {}
+    model = columns = None
+    batch = []
+    line_no = 0
+    checkpoint = start
+
+    def flush():
+        nonlocal checkpoint
+        if batch:
+            with transaction.atomic():
+                model.objects.bulk_create(batch, ignore_conflicts=resume)
+            counts[_label(model)] = counts.get(_label(model), 0) + len(batch)
+            batch.clear()
+        # Headers before the resume point are re-read; they mustn't move
+        # the checkpoint back.
+        if line_no > checkpoint:
+            _write_checkpoint(path, line_no)
+            checkpoint = line_no
+        if progress:
+            progress(counts)
+
+    with _keep_timestamps(), gzip.open(path, "rb") as source:
+        for line_no, line in enumerate(source, start=1):
+            record = orjson.loads(line)
+            if isinstance(record, dict):
+                flush()
+                model = apps.get_model(record["table"])
+                columns = record["columns"]
+                counts.setdefault(_label(model), 0)
+                continue
+            if line_no <= start:
+                continue
+            batch.append(model(**dict(zip(columns, record))))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+    reset_sequences(*(model for model, _, _ in TABLES))
+    # Ids may now mean different rows; no sync token can be trusted.
+    sync_log.expire()
+    if rebuild:
+        closure.rebuild()
+        sharded.rebuild()
+        stats.rebuild()
+        rebuild_leaderboard()
+    with suppress(FileNotFoundError):
+        os.remove(checkpoint_path(path))
+    return counts
@@ -0,0 +1,53 @@
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from backend import response_cache
+from . import batch
+
+
+class ResponseCacheStatsView(APIView):
+    """Hit/miss/stale counters of the anonymous response cache, per view."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        stats = response_cache.stats()
+        for counts in stats.values():
+            total = sum(counts.values())
+            counts["hit_ratio"] = round((counts["hit"] + counts["stale"]) / total, 3) if total else None
+        return Response(stats)
+
+
+class BatchView(APIView):
+    """Run several GET requests in one round-trip.
+
+    Body: ``{"requests": ["/posts/", {"path": "/leaderboard/me/"}, ...],
+    "parallel": false}``. Returns ``{"responses": [{"path", "status",
+    "body"}, ...]}`` in request order; one failing item doesn't fail the rest.
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        items = request.data.get("requests") if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            return Response({"error": "requests must be a non-empty list"}, status=400)
+        if len(items) > settings.BATCH_MAX_REQUESTS:
+            return Response(
+                {"error": f"At most {settings.BATCH_MAX_REQUESTS} requests per batch"}, status=400
+            )
+
+        paths = []
+        for item in items:
+            if isinstance(item, dict):
+                if item.get("method", "GET").upper() != "GET":
+                    return Response({"error": "Only GET requests can be batched"}, status=400)
+                item = item.get("path")
+            if not isinstance(item, str):
+                return Response({"error": "Each request must be a path or {\"path\": ...}"}, status=400)
+            paths.append(item)
+
+        workers = settings.BATCH_MAX_WORKERS if request.data.get("parallel") else 1
+        results = batch.run(request, paths, workers)
+        return HttpResponse(batch.render(paths, results), content_type="application/json")
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, transaction
+
+from core.benchmarks import benchmark_database, ms, percentile, run_threads
+from counters import sharded
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare lock wait on a single counter row vs sharded counters with many "
+        "concurrent likers on one post. Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=50)
+        parser.add_argument("--likes", type=int, default=20, help="Likes per worker.")
+        parser.add_argument("--shards", type=int, default=16)
+        parser.add_argument(
+            "--hold-ms", type=float, default=2.0,
+            help="Time each like transaction keeps its locks after the counter update.",
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            owner = User.objects.create_user(username="bench_owner", password="x")
+            post = Post.objects.create(user=owner, content="viral")
+
+            if connection.vendor == "sqlite":
+                self.stdout.write(
+                    "Note: SQLite locks the whole database on write, so sharding "
+                    "cannot reduce contention here. Run against Postgres for row-lock numbers.\n"
+                )
+
+            for label, shards in (("single row", 1), (f"{options['shards']} shards", options["shards"])):
+                sharded.reset(sharded.POST_LIKES, {})
+                sharded.reset(sharded.USER_KARMA, {})
+                self._run(label, shards, post, owner, options)
+
+    def _run(self, label, shards, post, owner, options):
+        waits = []
+        retries = [0]
+        lock = threading.Lock()
+        hold = options["hold_ms"] / 1000
+
+        def liker(index):
+            local_waits = []
+            local_retries = 0
+            for _ in range(options["likes"]):
+                while True:
+                    try:
+                        with transaction.atomic():
+                            started = time.perf_counter()
+                            sharded.increment(sharded.POST_LIKES, post.id, 1, shards=shards)
+                            sharded.increment(sharded.USER_KARMA, owner.id, 5, shards=shards)
+                            local_waits.append(time.perf_counter() - started)
+                            time.sleep(hold)
+                        break
+                    except OperationalError:
+                        local_retries += 1
+            with lock:
+                waits.extend(local_waits)
+                retries[0] += local_retries
+
+        started = time.perf_counter()
+        run_threads(liker, options["workers"])
+        elapsed = time.perf_counter() - started
+
+        expected = options["workers"] * options["likes"]
+        total = sharded.get_count(sharded.POST_LIKES, post.id, fresh=True)
+        self.stdout.write(
+            f"{label:>12}: {expected} likes in {elapsed:.2f}s "
+            f"({expected / elapsed:.0f}/s) | counter update wait "
+            f"avg {ms(sum(waits) / len(waits))} p95 {ms(percentile(waits, 95))} "
+            f"p99 {ms(percentile(waits, 99))} | retries {retries[0]} | "
+            f"total {total} {'OK' if total == expected else 'MISMATCH'}"
+        )
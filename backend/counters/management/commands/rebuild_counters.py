@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from counters.sharded import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recompute sharded like and karma counters from the source tables."
+
+    def handle(self, *args, **options):
+        rebuild()
+        self.stdout.write(self.style.SUCCESS("Counters rebuilt."))
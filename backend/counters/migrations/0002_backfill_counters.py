@@ -0,0 +1,50 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill(apps, schema_editor):
+    CounterShard = apps.get_model("counters", "CounterShard")
+    Like = apps.get_model("likes", "Like")
+    KarmaTransaction = apps.get_model("karma", "KarmaTransaction")
+
+    totals = {
+        "post_likes": (
+            Like.objects.filter(post__isnull=False)
+            .values_list("post_id").annotate(total=Count("id"))
+        ),
+        "comment_likes": (
+            Like.objects.filter(comment__isnull=False)
+            .values_list("comment_id").annotate(total=Count("id"))
+        ),
+        "user_karma": (
+            KarmaTransaction.objects
+            .values_list("user_id").annotate(total=Sum("points"))
+        ),
+    }
+
+    for name, rows in totals.items():
+        CounterShard.objects.bulk_create(
+            [
+                CounterShard(name=name, object_id=object_id, shard=0, value=total)
+                for object_id, total in rows
+                if total
+            ],
+            batch_size=1000,
+        )
+
+
+def clear(apps, schema_editor):
+    apps.get_model("counters", "CounterShard").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("counters", "0001_initial"),
+        ("likes", "0002_alter_like_comment_alter_like_post_alter_like_user"),
+        ("karma", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, clear),
+    ]
@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class CounterShard(models.Model):
+    # One logical counter (e.g. post_likes for post 12) is spread over
+    # COUNTER_SHARDS rows so concurrent writers don't queue on a single row lock.
+    name = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    shard = models.PositiveSmallIntegerField()
+    value = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "object_id", "shard"],
+                name="unique_counter_shard"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name}:{self.object_id}[{self.shard}] = {self.value}"
@@ -0,0 +1,155 @@
+import random
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from karma.models import KarmaTransaction
+from likes.models import Like
+from .models import CounterShard
+
+POST_LIKES = "post_likes"
+COMMENT_LIKES = "comment_likes"
+USER_KARMA = "user_karma"
+
+
+def _cache_key(name, object_id):
+    return f"counter:{name}:{object_id}"
+
+
+def increment(name, object_id, delta=1, shards=None):
+    """Add ``delta`` to a random shard of the counter.
+
+    Call this inside the same transaction as the write it is counting. The
+    cached total is dropped now and again once the transaction commits, so a
+    reader that re-caches the pre-commit value in between can't keep it.
+    """
+    shard = random.randrange(shards or settings.COUNTER_SHARDS)
+    rows = CounterShard.objects.filter(name=name, object_id=object_id, shard=shard)
+
+    if not rows.update(value=F("value") + delta):
+        try:
+            with transaction.atomic():
+                CounterShard.objects.create(
+                    name=name, object_id=object_id, shard=shard, value=delta
+                )
+        except IntegrityError:
+            # Someone else created the shard between our update and insert.
+            rows.update(value=F("value") + delta)
+
+    key = _cache_key(name, object_id)
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def get_count(name, object_id, fresh=False):
+    """Return the summed value of a counter, served from cache when possible
+    (for COUNTER_CACHE_TIMEOUT seconds, which is short unless the cache is
+    shared by every worker).
+
+    Pass ``fresh=True`` to read the shards directly, e.g. right after
+    ``increment`` inside a transaction that has not committed yet.
+    """
+    key = _cache_key(name, object_id)
+    if not fresh:
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+    value = (
+        CounterShard.objects
+        .filter(name=name, object_id=object_id)
+        .aggregate(total=Sum("value"))["total"]
+    ) or 0
+
+    if not fresh:
+        cache.set(key, value, settings.COUNTER_CACHE_TIMEOUT)
+    return value
+
+
+def get_counts(name, object_ids):
+    """Batch version of ``get_count``: one cache round-trip plus at most one query."""
+    object_ids = list(object_ids)
+    keys = {_cache_key(name, object_id): object_id for object_id in object_ids}
+    cached = cache.get_many(keys)
+    counts = {keys[key]: value for key, value in cached.items()}
+
+    missing = [object_id for object_id in object_ids if object_id not in counts]
+    if missing:
+        fetched = dict.fromkeys(missing, 0)
+        rows = (
+            CounterShard.objects
+            .filter(name=name, object_id__in=missing)
+            .values("object_id")
+            .annotate(total=Sum("value"))
+        )
+        for row in rows:
+            fetched[row["object_id"]] = row["total"]
+        cache.set_many(
+            {_cache_key(name, object_id): value for object_id, value in fetched.items()},
+            settings.COUNTER_CACHE_TIMEOUT,
+        )
+        counts.update(fetched)
+
+    return counts
+
+
+def discard(name, object_ids):
+    """Drop the counters for objects that no longer exist."""
+    object_ids = list(object_ids)
+    CounterShard.objects.filter(name=name, object_id__in=object_ids).delete()
+    keys = [_cache_key(name, object_id) for object_id in object_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def reset(name, values, batch_size=1000):
+    """Replace the counters for ``name`` with ``values`` (all on shard 0).
+
+    ``values`` is ``{object_id: value}`` or any iterable of ``(object_id,
+    value)`` pairs, which is consumed ``batch_size`` pairs at a time.
+    """
+    pairs = iter(values.items() if isinstance(values, dict) else values)
+    with transaction.atomic():
+        CounterShard.objects.filter(name=name).delete()
+        while True:
+            batch = list(islice(pairs, batch_size))
+            if not batch:
+                break
+            CounterShard.objects.bulk_create(
+                [
+                    CounterShard(name=name, object_id=object_id, shard=0, value=value)
+                    for object_id, value in batch
+                    if value
+                ]
+            )
+            cache.delete_many([_cache_key(name, object_id) for object_id, _ in batch])
+
+
+def rebuild(batch_size=1000):
+    """Recompute every counter from the Like table and the karma ledger,
+    streaming the totals so memory doesn't grow with the tables."""
+    post_likes = (
+        Like.objects.filter(post__isnull=False)
+        .order_by()
+        .values_list("post_id")
+        .annotate(total=Count("id"))
+    )
+    comment_likes = (
+        Like.objects.filter(comment__isnull=False)
+        .order_by()
+        .values_list("comment_id")
+        .annotate(total=Count("id"))
+    )
+    karma = (
+        KarmaTransaction.objects
+        .order_by()
+        .values_list("user_id")
+        .annotate(total=Sum("points"))
+    )
+
+    reset(POST_LIKES, post_likes.iterator(chunk_size=batch_size), batch_size)
+    reset(COMMENT_LIKES, comment_likes.iterator(chunk_size=batch_size), batch_size)
+    reset(USER_KARMA, karma.iterator(chunk_size=batch_size), batch_size)
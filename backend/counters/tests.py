@@ -0,0 +1,61 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core.testing import client
+from posts.models import Post
+from . import sharded
+from .models import CounterShard
+
+
+@override_settings(COUNTER_SHARDS=4)
+class ShardedCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_total_sums_every_shard(self):
+        for _ in range(20):
+            sharded.increment(sharded.POST_LIKES, 7, 1)
+        sharded.increment(sharded.POST_LIKES, 7, -3)
+
+        self.assertEqual(sharded.get_count(sharded.POST_LIKES, 7), 17)
+        self.assertLessEqual(CounterShard.objects.filter(name=sharded.POST_LIKES, object_id=7).count(), 4)
+
+    def test_increment_drops_the_cached_total(self):
+        sharded.increment(sharded.POST_LIKES, 7, 1)
+        self.assertEqual(sharded.get_count(sharded.POST_LIKES, 7), 1)
+        sharded.increment(sharded.POST_LIKES, 7, 1)
+        self.assertEqual(sharded.get_count(sharded.POST_LIKES, 7), 2)
+
+    def test_get_counts_fills_missing_with_zero(self):
+        sharded.increment(sharded.COMMENT_LIKES, 1, 2)
+        self.assertEqual(sharded.get_counts(sharded.COMMENT_LIKES, [1, 2]), {1: 2, 2: 0})
+        # Second call is served from the cache.
+        with self.assertNumQueries(0):
+            self.assertEqual(sharded.get_counts(sharded.COMMENT_LIKES, [1, 2]), {1: 2, 2: 0})
+
+    def test_like_and_unlike_through_the_api(self):
+        owner = User.objects.create_user("owner")
+        post = Post.objects.create(user=owner, content="Hello")
+        fans = [User.objects.create_user(f"fan{index}") for index in range(5)]
+
+        for fan in fans:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client(fan).post(f"/likes/post/{post.id}/")
+            self.assertTrue(response.data["liked"])
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client(fans[0]).post(f"/likes/post/{post.id}/")
+
+        self.assertEqual(response.data, {"message": "Post unliked", "liked": False, "like_count": 4})
+        self.assertEqual(sharded.get_count(sharded.POST_LIKES, post.id), 4)
+        self.assertEqual(sharded.get_count(sharded.USER_KARMA, owner.id), 20)
+
+    def test_rebuild_matches_the_likes(self):
+        owner, fan = User.objects.create_user("owner"), User.objects.create_user("fan")
+        post = Post.objects.create(user=owner, content="Hello")
+        with self.captureOnCommitCallbacks(execute=True):
+            client(fan).post(f"/likes/post/{post.id}/")
+        sharded.increment(sharded.POST_LIKES, post.id, 10)  # drift
+
+        sharded.rebuild()
+        self.assertEqual(sharded.get_count(sharded.POST_LIKES, post.id), 1)
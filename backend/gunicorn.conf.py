@@ -0,0 +1,47 @@
+# gunicorn settings for the Cloud Run container: `gunicorn -c gunicorn.conf.py`.
+#
+# The image serves backend.settings, admin included. To run a slim
+# API-only service from the same image (no admin or sessions, faster cold
+# starts), set DJANGO_SETTINGS_MODULE=backend.settings_api on it and keep
+# one service on the full settings for /admin/.
+import os
+
+wsgi_app = "backend.wsgi:application"
+bind = f"0.0.0.0:{os.getenv('PORT', '8080')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "3"))
+timeout = 120
+
+# Load Django, the URLconf and every view once in the master and fork the
+# workers from it: they start ready to serve and share the imported code
+# pages, so a cold instance answers sooner and uses less memory.
+preload_app = os.getenv("GUNICORN_PRELOAD", "True").lower() == "true"
+
+
+def when_ready(server):
+    # Without Redis each worker keeps its own leaderboard. Loading it here,
+    # once, means workers fork with it and only catch up from then on.
+    if not preload_app:
+        return
+    try:
+        from django.db import connections
+        from karma import leaderboard
+
+        leaderboard.warm()
+        connections.close_all()
+    except Exception:
+        server.log.exception("Loading the leaderboard failed; the first read will")
+
+
+def post_fork(server, worker):
+    # Nothing should have connected while loading the app, but a socket
+    # inherited from the master must never be shared between workers.
+    from django.db import connections
+
+    connections.close_all()
+
+    # Buffered writes (notifications, impressions) are flushed by a thread
+    # in each worker instead of by the requests that fill the buffers.
+    from django.conf import settings
+    from core import background
+
+    background.start(settings.BACKGROUND_FLUSH_INTERVAL)
@@ -0,0 +1,137 @@
+# Impressions are merged into the sketches in batches.
+#
+# ``record`` only hashes each viewer and keeps, per post and day, the
+# highest rank seen per register, in this process's memory. The flusher
+# thread (core.background) writes the buffer out once it holds
+# IMPRESSION_FLUSH_SIZE impressions or the oldest is IMPRESSION_FLUSH_SECONDS
+# old, and at exit; without the thread, the request that makes it due does.
+# A crashed worker loses its unflushed impressions; counts are approximate
+# anyway. One flush is one transaction: a locked read of the affected
+# sketch rows, then one batched update.
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils.timezone import localdate
+
+from core import background
+from posts.models import Post
+from .hll import Sketch, position
+from .models import ViewSketch
+
+_lock = threading.Lock()
+_pending = defaultdict(dict)  # (post_id, day) -> {register: rank}
+_count = 0
+_started = None
+
+
+def record(viewer, post_ids):
+    """Count ``viewer`` (a str key) as having seen ``post_ids`` today."""
+    global _count, _started
+    register, rank = position(viewer, settings.IMPRESSION_HLL_PRECISION)
+    day = localdate()
+    with _lock:
+        for post_id in post_ids:
+            ranks = _pending[post_id, day]
+            if rank > ranks.get(register, 0):
+                ranks[register] = rank
+        _count += len(post_ids)
+        if _started is None:
+            _started = time.monotonic()
+    if not background.running() and _due():
+        flush()
+
+
+def _due():
+    with _lock:
+        return _started is not None and (
+            _count >= settings.IMPRESSION_FLUSH_SIZE
+            or time.monotonic() - _started >= settings.IMPRESSION_FLUSH_SECONDS
+        )
+
+
+def _take():
+    global _pending, _count, _started
+    with _lock:
+        pending, _pending = _pending, defaultdict(dict)
+        _count, _started = 0, None
+    return pending
+
+
+def flush():
+    """Merge everything buffered in this process; returns the number of
+    sketch rows written."""
+    pending = _take()
+    if not pending:
+        return 0
+    return merge(pending)
+
+
+def merge(pending):
+    """Merge ``{(post_id, day): {register: rank}}`` into the day and
+    all-time sketches of each post."""
+    live = set(
+        Post.objects.filter(id__in={post_id for post_id, _ in pending}, deleted_at__isnull=True)
+        .values_list("id", flat=True)
+    )
+    updates = defaultdict(dict)  # (post_id, day or None) -> merged ranks
+    for (post_id, day), ranks in pending.items():
+        if post_id not in live:
+            continue
+        for slot in ((post_id, day), (post_id, None)):
+            merged = updates[slot]
+            for register, rank in ranks.items():
+                if rank > merged.get(register, 0):
+                    merged[register] = rank
+    if not updates:
+        return 0
+
+    precision = settings.IMPRESSION_HLL_PRECISION
+    empty = bytes(1 << precision)
+
+    with transaction.atomic():
+        ViewSketch.objects.bulk_create(
+            [ViewSketch(post_id=post_id, day=day, registers=empty) for post_id, day in updates],
+            ignore_conflicts=True,
+        )
+        # Locked in id order, so two flushes can't deadlock on each other.
+        rows = [
+            row for row in ViewSketch.objects.select_for_update().filter(
+                Q(day__isnull=True) | Q(day__in={day for _, day in updates if day}),
+                post_id__in={post_id for post_id, _ in updates},
+            ).order_by("id")
+            if (row.post_id, row.day) in updates
+        ]
+        params = []
+        for row in rows:
+            sketch = Sketch(precision, row.registers)
+            sketch.update(updates[row.post_id, row.day])
+            params.append((bytes(sketch.registers), sketch.estimate(), row.id))
+        # As in comments.closure: bulk_update's CASE per row costs more
+        # than the merge itself.
+        table = connection.ops.quote_name(ViewSketch._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.executemany(f"UPDATE {table} SET registers = %s, estimate = %s WHERE id = %s", params)
+    return len(rows)
+
+
+def prune(days=None, batch_size=5000):
+    """Delete the day sketches older than the last ``days`` days (default
+    IMPRESSION_MAX_DAYS, the longest window GET can ask for) in batches;
+    returns how many went. All-time sketches stay."""
+    days = settings.IMPRESSION_MAX_DAYS if days is None else days
+    cutoff = localdate() - timedelta(days=days - 1)
+    total = 0
+    while True:
+        ids = list(ViewSketch.objects.filter(day__lt=cutoff).order_by("id").values_list("id", flat=True)[:batch_size])
+        if not ids:
+            return total
+        ViewSketch.objects.filter(id__in=ids).delete()
+        total += len(ids)
+
+
+background.register(flush, _due)
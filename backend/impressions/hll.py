@@ -0,0 +1,99 @@
+# HyperLogLog: a fixed-size estimate of how many distinct keys were added.
+#
+# A sketch with precision p keeps m = 2**p one-byte registers. Each key is
+# hashed to 64 bits; the top p bits pick a register and the register keeps
+# the longest run of leading zeros (+1) seen in the remaining bits. Two
+# sketches merge by taking the larger value per register, so per-day
+# sketches add up to any range of days without double counting anyone.
+#
+# Standard error is about 1.04 / sqrt(m): 1.6% at the default p=12, for
+# 4 KB per sketch however many people are counted. ``bench_impressions``
+# measures it.
+import hashlib
+import math
+
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+
+def position(key, precision):
+    """``(register, rank)`` that ``key`` (a str) sets in a sketch."""
+    value = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+    rest_bits = 64 - precision
+    register = value >> rest_bits
+    rest = value & ((1 << rest_bits) - 1)
+    return register, rest_bits - rest.bit_length() + 1
+
+
+def _sigma(x):
+    if x == 1:
+        return math.inf
+    y, z = 1.0, x
+    while True:
+        x *= x
+        previous = z
+        z += x * y
+        y += y
+        if z == previous:
+            return z
+
+
+def _tau(x):
+    if x == 0 or x == 1:
+        return 0.0
+    y, z = 1.0, 1 - x
+    while True:
+        x = math.sqrt(x)
+        previous = z
+        y *= 0.5
+        z -= (1 - x) ** 2 * y
+        if z == previous:
+            return z / 3
+
+
+class Sketch:
+    __slots__ = ("precision", "registers")
+
+    def __init__(self, precision, registers=None):
+        if not MIN_PRECISION <= precision <= MAX_PRECISION:
+            raise ValueError(f"precision must be between {MIN_PRECISION} and {MAX_PRECISION}")
+        self.precision = precision
+        size = 1 << precision
+        if registers is None:
+            self.registers = bytearray(size)
+        elif len(registers) != size:
+            raise ValueError(f"expected {size} registers, got {len(registers)}")
+        else:
+            self.registers = bytearray(registers)
+
+    def add(self, key):
+        register, rank = position(key, self.precision)
+        if rank > self.registers[register]:
+            self.registers[register] = rank
+
+    def update(self, ranks):
+        """Apply ``{register: rank}``, as buffered by ``impressions.buffer``."""
+        registers = self.registers
+        for register, rank in ranks.items():
+            if rank > registers[register]:
+                registers[register] = rank
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError("can't merge sketches of different precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self):
+        # Ertl's improved estimator ("New cardinality estimation algorithms
+        # for HyperLogLog sketches", 2017): unbiased from one key upwards,
+        # without the switch to linear counting the original paper needs,
+        # and computed from a histogram of register values.
+        m = len(self.registers)
+        q = 64 - self.precision
+        top = max(self.registers)
+        counts = [self.registers.count(rank) for rank in range(top + 1)] + [0] * (q + 1 - top)
+        z = m * _tau(1 - counts[q + 1] / m)
+        for rank in range(q, 0, -1):
+            z = 0.5 * (z + counts[rank])
+        z += m * _sigma(counts[0] / m)
+        return round(m * m / (2 * math.log(2) * z))
@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core import seed
+from core.benchmarks import benchmark_database
+from impressions import buffer
+from impressions.hll import Sketch
+from impressions.models import ViewSketch
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the HyperLogLog view counts: estimate error against the "
+        "true count and bytes per sketch for each precision, then the cost "
+        "of buffering and flushing feed impressions on a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--precisions", default="10,12,14")
+        parser.add_argument("--cardinalities", default="100,1000,10000,100000")
+        parser.add_argument("--trials", type=int, default=5)
+        parser.add_argument("--posts", type=int, default=500)
+        parser.add_argument("--viewers", type=int, default=2000)
+        parser.add_argument("--page", type=int, default=10, help="Posts per reported feed page.")
+
+    def handle(self, *args, **options):
+        self.accuracy(options)
+        with benchmark_database():
+            self.flushing(options)
+
+    def accuracy(self, options):
+        self.stdout.write(self.style.MIGRATE_HEADING("== Estimate error (mean / worst over trials)"))
+        for precision in (int(value) for value in options["precisions"].split(",")):
+            size = 1 << precision
+            self.stdout.write(
+                f"  p={precision}: {size} registers = {size} bytes per sketch, "
+                f"expected standard error {104 / size ** 0.5:.2f}%"
+            )
+            for cardinality in (int(value) for value in options["cardinalities"].split(",")):
+                errors = []
+                started = time.perf_counter()
+                for trial in range(options["trials"]):
+                    sketch = Sketch(precision)
+                    salt = random.getrandbits(32)
+                    for viewer in range(cardinality):
+                        sketch.add(f"{salt}:{viewer}")
+                    errors.append(abs(sketch.estimate() - cardinality) / cardinality * 100)
+                per_add = (time.perf_counter() - started) / (options["trials"] * cardinality) * 1e6
+                self.stdout.write(
+                    f"    {cardinality:>8} people: error {statistics.mean(errors):5.2f}% / "
+                    f"{max(errors):5.2f}%   ({per_add:.1f}us per add)"
+                )
+
+    def flushing(self, options):
+        users = seed.seed_users(options["viewers"], prefix="viewer")
+        posts = seed.seed_posts(options["posts"], users)
+        rng = random.Random(1)
+        # Feed pages: each viewer reports a page of mostly recent posts.
+        pages = [
+            (viewer, rng.sample(posts[-options["page"] * 20:], options["page"]))
+            for viewer in users
+        ]
+        impressions = len(pages) * options["page"]
+
+        buffer.flush()
+        started = time.perf_counter()
+        flushes = []
+        with CaptureQueriesContext(connection) as queries:
+            for viewer, page in pages:
+                before = len(queries)
+                at = time.perf_counter()
+                buffer.record(f"user:{viewer}", page)
+                if len(queries) > before:
+                    flushes.append(time.perf_counter() - at)
+            at = time.perf_counter()
+            buffer.flush()
+            flushes.append(time.perf_counter() - at)
+        elapsed = time.perf_counter() - started
+
+        rows = ViewSketch.objects.count()
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"== {impressions} impressions from {len(users)} viewers over {len(posts)} posts "
+            f"(flush every {settings.IMPRESSION_FLUSH_SIZE})"
+        ))
+        self.stdout.write(f"  total                {elapsed * 1000:8.1f}ms  ({elapsed / impressions * 1e6:.1f}us per impression)")
+        self.stdout.write(f"  flushes              {len(flushes):8d}  (median {statistics.median(flushes) * 1000:.1f}ms)")
+        self.stdout.write(f"  queries              {len(queries):8d}  (one row per view would be {impressions} inserts)")
+        self.stdout.write(
+            f"  sketch rows          {rows:8d}  ({rows * (1 << settings.IMPRESSION_HLL_PRECISION) // 1024} KB of registers)"
+        )
+
+        exact = len({(viewer, post) for viewer, page in pages for post in page})
+        estimated = sum(ViewSketch.objects.filter(day__isnull=True).values_list("estimate", flat=True))
+        self.stdout.write(
+            f"  distinct views       {exact:8d}  exact vs {estimated} estimated "
+            f"({abs(estimated - exact) / exact * 100:.2f}% off, summed over posts)"
+        )
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from impressions.buffer import prune
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the per-day view sketches older than --days. All-time view "
+        "counts are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.IMPRESSION_MAX_DAYS)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        removed = prune(days=options["days"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {removed} day sketches."))
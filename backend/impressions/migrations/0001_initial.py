@@ -0,0 +1,30 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("posts", "0007_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ViewSketch",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("day", models.DateField(blank=True, null=True)),
+                ("registers", models.BinaryField()),
+                ("estimate", models.IntegerField(default=0)),
+                ("post", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="view_sketches", to="posts.post")),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(condition=models.Q(("day__isnull", True)), fields=("post",), name="unique_view_sketch_total"),
+                    models.UniqueConstraint(condition=models.Q(("day__isnull", False)), fields=("post", "day"), name="unique_view_sketch_day"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("impressions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="viewsketch",
+            index=models.Index(condition=models.Q(("day__isnull", False)), fields=["day"], name="view_sketch_day_idx"),
+        ),
+    ]
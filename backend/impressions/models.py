@@ -0,0 +1,28 @@
+from django.db import models
+
+from posts.models import Post
+
+
+class ViewSketch(models.Model):
+    """HyperLogLog registers of the people who saw a post: one row for all
+    time (``day`` null) and one per day with views."""
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="view_sketches")
+    day = models.DateField(null=True, blank=True)
+    registers = models.BinaryField()
+    # Kept next to the registers so reads never decode them.
+    estimate = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["post"], condition=models.Q(day__isnull=True), name="unique_view_sketch_total"
+            ),
+            models.UniqueConstraint(
+                fields=["post", "day"], condition=models.Q(day__isnull=False), name="unique_view_sketch_day"
+            ),
+        ]
+        indexes = [
+            # buffer.prune: day sketches past retention.
+            models.Index(fields=["day"], condition=models.Q(day__isnull=False), name="view_sketch_day_idx"),
+        ]
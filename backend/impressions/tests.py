@@ -0,0 +1,117 @@
+import math
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import localdate
+
+from core import background, testing
+from core.testing import Endpoint
+from posts.models import Post
+from . import buffer
+from .hll import Sketch
+from .models import ViewSketch
+
+
+class ImpressionQueryBudgetTests(testing.QueryBudgetTestCase):
+    endpoints = [
+        Endpoint("GET", "/impressions/post/{post}/"),
+        Endpoint("GET", "/impressions/post/{post}/?days=30", anonymous=True),
+        Endpoint("POST", "/impressions/", {"posts": ["{post}", "{friend_post}"]}),
+    ]
+
+
+def sketch(precision, keys):
+    result = Sketch(precision)
+    for key in keys:
+        result.add(key)
+    return result
+
+
+class SketchTests(SimpleTestCase):
+    def test_small_counts_are_exact(self):
+        for count in (0, 1, 10, 100):
+            self.assertEqual(sketch(12, (f"user:{index}" for index in range(count))).estimate(), count)
+
+    def test_error_stays_within_three_standard_errors(self):
+        for precision in (8, 12, 14):
+            bound = 3 * 1.04 / math.sqrt(1 << precision)
+            for count in (1000, 10000, 50000):
+                for trial in range(3):
+                    estimate = sketch(precision, (f"trial{trial}:{index}" for index in range(count))).estimate()
+                    self.assertLess(
+                        abs(estimate - count) / count, bound, f"p={precision}, n={count}, trial {trial}"
+                    )
+
+    def test_merge_counts_the_union_once(self):
+        first = sketch(12, (f"user:{index}" for index in range(6000)))
+        second = sketch(12, (f"user:{index}" for index in range(4000, 10000)))
+        first.merge(second)
+        self.assertEqual(first.registers, sketch(12, (f"user:{index}" for index in range(10000))).registers)
+        self.assertLess(abs(first.estimate() - 10000) / 10000, 3 * 1.04 / 64)
+
+    def test_adding_a_key_again_changes_nothing(self):
+        once = sketch(12, ["user:1", "user:2"])
+        twice = sketch(12, ["user:1", "user:2", "user:1"])
+        self.assertEqual(once.registers, twice.registers)
+
+
+class BufferTests(TestCase):
+    def setUp(self):
+        buffer.flush()
+        self.user = User.objects.create_user("author")
+        self.post = Post.objects.create(user=self.user, content="Hello")
+
+    def tearDown(self):
+        buffer.flush()
+
+    def views(self):
+        return ViewSketch.objects.filter(post=self.post, day__isnull=True).values_list("estimate", flat=True).first()
+
+    @override_settings(IMPRESSION_FLUSH_SIZE=3)
+    def test_with_a_flusher_thread_requests_only_buffer(self):
+        with mock.patch.object(background, "running", return_value=True):
+            for viewer in range(3):
+                with self.assertNumQueries(0):
+                    buffer.record(f"user:{viewer}", [self.post.id])
+        self.assertTrue(buffer._due())
+        self.assertIsNone(self.views())
+
+        background.run()
+        self.assertEqual(self.views(), 3)
+        self.assertFalse(buffer._due())
+
+    @override_settings(IMPRESSION_FLUSH_SIZE=3)
+    def test_without_one_the_request_that_fills_the_buffer_flushes(self):
+        buffer.record("user:1", [self.post.id])
+        buffer.record("user:2", [self.post.id])
+        self.assertIsNone(self.views())
+        buffer.record("user:3", [self.post.id])
+        self.assertEqual(self.views(), 3)
+        self.assertEqual(ViewSketch.objects.get(post=self.post, day=localdate()).estimate, 3)
+
+    def test_merge_locks_rows_in_id_order(self):
+        buffer.record("user:1", [self.post.id])
+        with CaptureQueriesContext(connection) as queries:
+            buffer.flush()
+        locked = [query["sql"] for query in queries if "FROM \"impressions_viewsketch\"" in query["sql"]]
+        self.assertTrue(locked)
+        self.assertIn("ORDER BY \"impressions_viewsketch\".\"id\" ASC", locked[-1])
+
+    def test_prune_keeps_the_reported_window_and_the_total(self):
+        today = localdate()
+        empty = bytes(1 << 12)
+        for age in (0, 89, 90, 400):
+            ViewSketch.objects.create(post=self.post, day=today - timedelta(days=age), registers=empty)
+        ViewSketch.objects.create(post=self.post, day=None, registers=empty)
+
+        with self.settings(IMPRESSION_MAX_DAYS=90):
+            self.assertEqual(buffer.prune(batch_size=1), 2)
+        self.assertEqual(
+            sorted(ViewSketch.objects.exclude(day=None).values_list("day", flat=True)),
+            [today - timedelta(days=89), today],
+        )
+        self.assertTrue(ViewSketch.objects.filter(day=None).exists())
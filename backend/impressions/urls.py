@@ -0,0 +1,7 @@
+from django.urls import path
+from .views import ImpressionView, PostViewsView
+
+urlpatterns = [
+    path("", ImpressionView.as_view()),
+    path("post/<int:post_id>/", PostViewsView.as_view()),
+]
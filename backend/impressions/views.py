@@ -0,0 +1,67 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.shortcuts import get_object_or_404
+from django.utils.timezone import localdate
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+
+from posts.models import Post
+from . import buffer
+from .hll import Sketch
+from .models import ViewSketch
+
+
+class ImpressionView(APIView):
+    """The feed reports the posts a user saw: ``{"posts": [id, ...]}``."""
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        post_ids = request.data.get("posts")
+        if not isinstance(post_ids, list) or not all(
+            isinstance(post_id, int) and not isinstance(post_id, bool) for post_id in post_ids
+        ):
+            return Response({"error": "posts must be a list of post ids"}, status=400)
+        if len(post_ids) > settings.IMPRESSION_MAX_POSTS:
+            return Response(
+                {"error": f"At most {settings.IMPRESSION_MAX_POSTS} posts per request"}, status=400
+            )
+
+        buffer.record(f"user:{request.user.id}", set(post_ids))
+        return Response({"accepted": len(post_ids)}, status=202)
+
+
+class PostViewsView(APIView):
+    """Approximate distinct viewers of a post, in total and for each of the
+    last ``days`` days (the union of those days included)."""
+
+    def get(self, request, post_id):
+        post = get_object_or_404(Post, id=post_id, deleted_at__isnull=True)
+        try:
+            days = int(request.query_params.get("days", 7))
+        except ValueError:
+            return Response({"error": "days must be an integer"}, status=400)
+        days = max(1, min(days, settings.IMPRESSION_MAX_DAYS))
+
+        today = localdate()
+        first = today - timedelta(days=days - 1)
+        rows = ViewSketch.objects.filter(post=post).exclude(day__lt=first).order_by("day")
+        total = 0
+        daily = []
+        window = Sketch(settings.IMPRESSION_HLL_PRECISION)
+        for row in rows:
+            if row.day is None:
+                total = row.estimate
+                continue
+            daily.append({"day": row.day, "views": row.estimate})
+            window.merge(Sketch(settings.IMPRESSION_HLL_PRECISION, row.registers))
+
+        return Response({
+            "post_id": post.id,
+            "views": total,
+            "days": days,
+            "views_in_days": window.estimate() if daily else 0,
+            "daily": daily,
+        })
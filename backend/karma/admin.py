@@ -1,3 +1,22 @@
 from django.contrib import admin
 
-# Register your models here.
+from core.admin import ScalableAdmin
+from .models import KarmaTransaction
+
+
+@admin.register(KarmaTransaction)
+class KarmaTransactionAdmin(ScalableAdmin):
+    """Read-only: the ledger is written by ``karma.ledger`` only."""
+
+    list_display = ("id", "user", "actor", "points", "source", "post_id", "comment_id", "created_at")
+    list_select_related = ("user", "actor")
+    search_fields = ("id", "user__username", "actor__username", "post", "comment")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,321 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.utils.timezone import now
+
+from backend.response_cache import invalidate
+from .models import KarmaRemoval, KarmaTransaction
+from .sorted_sets import InMemorySortedSets
+
+# window -> (length in seconds, bucket width in seconds). "all" has no buckets.
+WINDOWS = {
+    "1h": (3600, 60),
+    "24h": (86400, 900),
+    "7d": (7 * 86400, 3600),
+    "all": (None, None),
+}
+DEFAULT_WINDOW = "24h"
+
+logger = logging.getLogger(__name__)
+
+
+class Leaderboard:
+    """Karma rankings per window, kept in sorted sets.
+
+    Every window has a total set (user id -> karma) that reads come from:
+    top-N is ZREVRANGE and a user's position is ZREVRANK, both O(log n)
+    regardless of ledger size. Windowed totals also keep per-bucket sets;
+    when a bucket falls out of the window its points are subtracted from
+    the total, so a window can include up to one bucket width of extra
+    history (a minute for 1h, 15 minutes for 24h, an hour for 7d). Users
+    with equal karma come in ZREVRANGE order: by user id as a string,
+    descending.
+
+    ``store`` is a redis-py client or an InMemorySortedSets.
+    """
+
+    def __init__(self, store, prefix="lb"):
+        self.store = store
+        self.prefix = prefix
+
+    def _total(self, window):
+        return f"{self.prefix}:{window}"
+
+    def _buckets(self, window):
+        return f"{self.prefix}:{window}:buckets"
+
+    def _bucket(self, window, start):
+        return f"{self.prefix}:{window}:{start}"
+
+    def record(self, user_id, points, at=None):
+        at = time.time() if at is None else at
+        for window, (length, width) in WINDOWS.items():
+            self.store.zincrby(self._total(window), points, user_id)
+            if length:
+                start = int(at // width * width)
+                self.store.zincrby(self._bucket(window, start), points, user_id)
+                self.store.zadd(self._buckets(window), {start: start})
+
+    def expire(self, window, at=None):
+        length, width = WINDOWS[window]
+        if not length:
+            return
+        at = time.time() if at is None else at
+        buckets = self._buckets(window)
+        for start in self.store.zrangebyscore(buckets, "-inf", at - length - width):
+            # ZREM is the claim: only the worker that removed it subtracts.
+            if not self.store.zrem(buckets, start):
+                continue
+            key = self._bucket(window, start)
+            for member, score in self.store.zrange(key, 0, -1, withscores=True):
+                self.store.zincrby(self._total(window), -score, member)
+            self.store.delete(key)
+
+    def top(self, window, limit):
+        """``[(user_id, karma), ...]`` best first.
+
+        Users whose karma in the window has gone back to zero (expired
+        buckets, reaped content) are left in the set but not listed.
+        """
+        self.expire(window)
+        rows = self.store.zrevrange(self._total(window), 0, limit - 1, withscores=True)
+        return [(int(member), int(score)) for member, score in rows if score]
+
+    def rank(self, window, user_id):
+        """``(rank, karma)`` with a 1-based rank, or ``(None, 0)`` if unranked.
+
+        As in ``top``, users with zero karma in the window are unranked and
+        don't count towards anyone else's rank.
+        """
+        self.expire(window)
+        total = self._total(window)
+        position = self.store.zrevrank(total, user_id)
+        if position is None:
+            return None, 0
+        karma = int(self.store.zscore(total, user_id))
+        if not karma:
+            return None, 0
+        if karma < 0:
+            position -= self.store.zcount(total, 0, 0)
+        return position + 1, karma
+
+    def clear(self):
+        for window, (length, _) in WINDOWS.items():
+            keys = [self._total(window)]
+            if length:
+                keys.append(self._buckets(window))
+                keys += [
+                    self._bucket(window, start)
+                    for start in self.store.zrange(self._buckets(window), 0, -1)
+                ]
+            self.store.delete(*keys)
+
+    @staticmethod
+    def _bucketed(events, at):
+        """``{window: {bucket start: {user_id: points}}}`` for the windowed totals."""
+        windowed = {window: defaultdict(lambda: defaultdict(int)) for window in WINDOWS}
+        for user_id, points, stamp in events:
+            for window, (length, width) in WINDOWS.items():
+                start = int(stamp // width * width) if length else None
+                if length and start > at - length - width:
+                    windowed[window][start][user_id] += points
+        return windowed
+
+    def load(self, totals, events, at=None):
+        """Replace the board with all-time ``totals`` ({user_id: karma}) and
+        recent ``events`` ((user_id, points, timestamp), ...)."""
+        at = time.time() if at is None else at
+        windowed = self._bucketed(events, at)
+
+        self.clear()
+        if totals:
+            self.store.zadd(self._total("all"), totals)
+        for window, buckets in windowed.items():
+            sums = defaultdict(int)
+            for start, scores in buckets.items():
+                self.store.zadd(self._bucket(window, start), scores)
+                self.store.zadd(self._buckets(window), {start: start})
+                for user_id, points in scores.items():
+                    sums[user_id] += points
+            if sums:
+                self.store.zadd(self._total(window), sums)
+
+    def replace(self, user_ids, totals, events, at=None):
+        """Set the karma of ``user_ids`` alone from their ``totals`` and
+        ``events`` (as for ``load``). Scores are overwritten, never removed
+        first, so reads meanwhile see each user's old or new karma."""
+        if not user_ids:
+            return
+        at = time.time() if at is None else at
+        windowed = self._bucketed(events, at)
+        members = [str(user_id) for user_id in user_ids]
+
+        self.store.zadd(self._total("all"), {user_id: totals.get(user_id, 0) for user_id in user_ids})
+        for window, (length, _) in WINDOWS.items():
+            if not length:
+                continue
+            fresh = windowed[window]
+            for start in self.store.zrange(self._buckets(window), 0, -1):
+                # Buckets the users no longer have points in.
+                scores = fresh.get(int(start), {})
+                stale = [member for member in members if int(member) not in scores]
+                if stale:
+                    self.store.zrem(self._bucket(window, int(start)), *stale)
+            sums = defaultdict(int)
+            for start, scores in fresh.items():
+                self.store.zadd(self._bucket(window, start), scores)
+                self.store.zadd(self._buckets(window), {start: start})
+                for user_id, points in scores.items():
+                    sums[user_id] += points
+            self.store.zadd(self._total(window), {user_id: sums[user_id] for user_id in user_ids})
+
+
+def _ledger(user_ids=None):
+    """All-time totals and recent events from the ledger, for ``user_ids``
+    or everyone."""
+    longest = max(length for length, _ in WINDOWS.values() if length)
+    width = max(width for length, width in WINDOWS.values() if length)
+    since = now() - timedelta(seconds=longest + width)
+
+    rows = KarmaTransaction.objects.all()
+    if user_ids is not None:
+        rows = rows.filter(user_id__in=user_ids)
+    totals = dict(
+        rows.values("user_id").annotate(karma=Sum("points")).values_list("user_id", "karma")
+    )
+    events = (
+        (user_id, points, created_at.timestamp())
+        for user_id, points, created_at in rows
+        .filter(created_at__gte=since)
+        .values_list("user_id", "points", "created_at")
+        .iterator(chunk_size=5000)
+    )
+    return totals, events
+
+
+def _changed_since(since):
+    """Users whose ledger rows were toggled or removed since ``since``."""
+    toggled = KarmaTransaction.objects.filter(updated_at__gte=since).values_list("user_id", flat=True)
+    removed = KarmaRemoval.objects.filter(created_at__gte=since).values_list("user_id", flat=True)
+    return sorted(set(toggled.distinct()) | set(removed.distinct()))
+
+
+def rebuild(board=None):
+    """Reload ``board`` (the shared one by default) from the ledger."""
+    board = board or get_leaderboard()
+    board.load(*_ledger())
+    return board
+
+
+class LocalLeaderboard(Leaderboard):
+    """In-process fallback used when LEADERBOARD_REDIS_URL isn't set.
+
+    Each process keeps its own copy. It is loaded from the whole ledger
+    once, by the first read; after that, every LEADERBOARD_LOCAL_REFRESH
+    seconds a background thread picks up likes handled by other workers by
+    recomputing only the users whose ledger rows changed since the last
+    catch-up (``updated_at`` and ``KarmaRemoval``, as snapshots do), while
+    reads keep using the board. Recomputing is idempotent, so each
+    catch-up looks back LEADERBOARD_SNAPSHOT_OVERLAP seconds further for
+    transactions that committed late, and also corrects any like this
+    process applied while one ran.
+    """
+
+    # Users recomputed per round of queries.
+    chunk_size = 1000
+
+    def __init__(self, refresh):
+        super().__init__(InMemorySortedSets())
+        self.refresh = refresh
+        self.loaded_at = None
+        self.synced = None
+        self._loading = threading.Lock()
+
+    def _load(self):
+        synced = now()
+        fresh = Leaderboard(InMemorySortedSets(), self.prefix)
+        fresh.load(*_ledger())
+        self.store = fresh.store
+        self.synced = synced
+        self.loaded_at = time.monotonic()
+
+    def _catch_up(self):
+        synced = now()
+        changed = _changed_since(self.synced - timedelta(seconds=settings.LEADERBOARD_SNAPSHOT_OVERLAP))
+        for index in range(0, len(changed), self.chunk_size):
+            user_ids = changed[index:index + self.chunk_size]
+            self.replace(user_ids, *_ledger(user_ids))
+        self.synced = synced
+        self.loaded_at = time.monotonic()
+
+    def _reload(self):
+        try:
+            self._catch_up()
+        except Exception:
+            # Keep serving the board as it is; the next stale read tries again.
+            logger.exception("Leaderboard catch-up failed")
+        finally:
+            self._loading.release()
+            connection.close()
+
+    def _maybe_reload(self):
+        if self.loaded_at is None:
+            with self._loading:
+                if self.loaded_at is None:
+                    self._load()
+        elif time.monotonic() - self.loaded_at >= self.refresh and self._loading.acquire(blocking=False):
+            threading.Thread(target=self._reload, name="leaderboard-reload", daemon=True).start()
+
+    def top(self, window, limit):
+        self._maybe_reload()
+        return super().top(window, limit)
+
+    def rank(self, window, user_id):
+        self._maybe_reload()
+        return super().rank(window, user_id)
+
+
+_board = None
+
+
+def get_leaderboard():
+    global _board
+    if _board is None:
+        if settings.LEADERBOARD_REDIS_URL:
+            import redis
+
+            client = redis.Redis.from_url(settings.LEADERBOARD_REDIS_URL, decode_responses=True)
+            board = Leaderboard(client)
+            # First process to start against an empty Redis fills it.
+            if client.set(f"{board.prefix}:loaded", 1, nx=True):
+                rebuild(board)
+            _board = board
+        else:
+            _board = LocalLeaderboard(settings.LEADERBOARD_LOCAL_REFRESH)
+    return _board
+
+
+def warm():
+    """Load the in-process board now instead of on the first read, e.g. in
+    the gunicorn master so every worker forks with it loaded."""
+    board = get_leaderboard()
+    if isinstance(board, LocalLeaderboard):
+        board._maybe_reload()
+
+
+def record(user_id, points, at=None):
+    """Add a karma change made at ``at`` (a datetime, default now) to the
+    board once the current transaction commits."""
+    stamp = None if at is None else at.timestamp()
+
+    def apply():
+        get_leaderboard().record(user_id, points, at=stamp)
+        invalidate("leaderboard")
+
+    transaction.on_commit(apply)
@@ -0,0 +1,104 @@
+from collections import defaultdict
+
+from django.db.models import Sum
+from django.utils.timezone import now
+
+from accounts import stats
+from counters import sharded
+from . import leaderboard
+from .models import KarmaRemoval, KarmaTransaction
+
+POST_LIKE_POINTS = 5
+COMMENT_LIKE_POINTS = 1
+
+
+def set_like(actor_id, owner_id, liked, post=None, comment=None):
+    """Record that ``actor_id`` now does (or doesn't) like ``post``/``comment``.
+
+    Upserts the single ledger row for the pair instead of appending one per
+    toggle, and moves the owner's karma counter, profile stats (after
+    commit) and leaderboard entry by the difference. The row keeps the time of the
+    first like: an unlike takes the points out of that bucket and a re-like
+    puts them back there, so like/unlike flapping nets to zero in every
+    window, as it did in the append-only ledger. Call inside the
+    transaction that changes the Like row.
+    """
+    if post is not None:
+        target = {"post": post}
+        points = POST_LIKE_POINTS if liked else 0
+        source = "post_like" if liked else "post_unlike"
+    else:
+        target = {"comment": comment}
+        points = COMMENT_LIKE_POINTS if liked else 0
+        source = "comment_like" if liked else "comment_unlike"
+
+    at = now()
+    entry = (
+        KarmaTransaction.objects.select_for_update()
+        .filter(actor_id=actor_id, **target)
+        .first()
+    )
+    if entry is None:
+        KarmaTransaction.objects.create(
+            user_id=owner_id, actor_id=actor_id, points=points, source=source,
+            created_at=at, updated_at=at, **target
+        )
+        previous = 0
+    else:
+        previous = entry.points
+        at = entry.created_at
+        KarmaTransaction.objects.filter(pk=entry.pk).update(
+            user_id=owner_id, points=points, source=source, updated_at=now()
+        )
+
+    delta = points - previous
+    if delta:
+        sharded.increment(sharded.USER_KARMA, owner_id, delta)
+    stats.bump_after_commit(owner_id, karma=delta, likes_received=(points > 0) - (previous > 0))
+    if previous:
+        leaderboard.record(owner_id, -previous, at=entry.created_at)
+    if points:
+        leaderboard.record(owner_id, points, at=at)
+    return delta
+
+
+def remove(entries):
+    """Delete ledger rows and take their points (and likes) back off the
+    owners' counters, stats and leaderboard entries. ``entries`` should be
+    a bounded queryset; call inside a transaction."""
+    rows = list(entries.values_list("id", "user_id", "actor_id", "points", "created_at"))
+    totals = defaultdict(int)
+    likes = defaultdict(int)
+    for _, user_id, actor_id, points, created_at in rows:
+        if points:
+            totals[user_id] += points
+            leaderboard.record(user_id, -points, at=created_at)
+        if actor_id is not None and points > 0:
+            likes[user_id] += 1
+    for user_id in totals.keys() | likes.keys():
+        if totals[user_id]:
+            sharded.increment(sharded.USER_KARMA, user_id, -totals[user_id])
+        stats.bump_after_commit(user_id, karma=-totals[user_id], likes_received=-likes[user_id])
+    # Snapshots can't see deleted rows; tell them whose karma to recompute.
+    KarmaRemoval.objects.bulk_create(KarmaRemoval(user_id=user_id) for user_id in totals)
+    KarmaTransaction.objects.filter(id__in=[row[0] for row in rows]).delete()
+    return len(rows)
+
+
+def forget(entries, at):
+    """Take the points of ledger rows that are about to go some other way
+    (a detached partition) off the owners' karma counters, stats and
+    leaderboard entries, without deleting the rows. Sums per owner, so
+    ``entries`` can be a whole month; their leaderboard points come off at
+    ``at``. Call inside the transaction that removes them."""
+    totals = entries.order_by().values_list("user_id").annotate(total=Sum("points"))
+    users = []
+    for user_id, total in totals:
+        if not total:
+            continue
+        users.append(user_id)
+        sharded.increment(sharded.USER_KARMA, user_id, -total)
+        stats.bump_after_commit(user_id, karma=-total)
+        leaderboard.record(user_id, -total, at=at)
+    KarmaRemoval.objects.bulk_create(KarmaRemoval(user_id=user_id) for user_id in users)
+    return len(users)
@@ -0,0 +1,95 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+
+from core import seed
+from core.benchmarks import benchmark_database, ms, percentile
+from karma import snapshots
+from karma.models import KarmaTransaction, SnapshotRank
+
+
+class Command(BaseCommand):
+    help = (
+        "Time leaderboard snapshots on a throwaway database: a full pass "
+        "over --rows ledger rows, an incremental one after --changes "
+        "toggles, and rank history reads for random users."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=500_000)
+        parser.add_argument("--users", type=int, default=20_000)
+        parser.add_argument("--changes", type=int, default=5000)
+        parser.add_argument("--reads", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            user_ids = seed.seed_users(options["users"])
+            post_ids = seed.seed_posts(options["users"], user_ids)
+            started = time.perf_counter()
+            seed.seed_likes(options["rows"], user_ids, post_ids)
+            self.stdout.write(f"Seeded {options['rows']:,} ledger rows in {time.perf_counter() - started:.1f}s")
+
+            day = now() - timedelta(days=30)
+            first = self.timed(lambda: snapshots.take(at=day))
+            self.toggle(options["changes"])
+            incremental = self.timed(lambda: snapshots.take(at=day + timedelta(days=1)))
+            full = self.timed(lambda: snapshots.take(at=day + timedelta(days=2), full=True))
+            self.compare(day + timedelta(days=1), day + timedelta(days=2))
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== Snapshots of {first[1].users:,} ranked users"))
+            for label, (elapsed, _, queries) in (
+                ("first (full)", first),
+                (f"incremental, {options['changes']:,} toggles", incremental),
+                ("full, same ledger", full),
+            ):
+                self.stdout.write(f"  {label:<30} {ms(elapsed):>10}  {queries:3d} queries")
+            self.history(user_ids, day, options["reads"])
+
+    def timed(self, call):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            result = call()
+            elapsed = time.perf_counter() - started
+        return elapsed, result, len(queries.captured_queries)
+
+    def toggle(self, changes):
+        # What set_like does to the ledger row: new points, updated_at now.
+        ids = list(KarmaTransaction.objects.order_by("?").values_list("id", flat=True)[:changes])
+        half = len(ids) // 2
+        KarmaTransaction.objects.filter(id__in=ids[:half]).update(points=0, updated_at=now())
+        KarmaTransaction.objects.filter(id__in=ids[half:]).update(points=1, updated_at=now())
+
+    def compare(self, incremental, full):
+        def rows(at):
+            return list(
+                SnapshotRank.objects.filter(taken_at=snapshots.slot(at))
+                .order_by("rank").values_list("user_id", "rank", "karma")
+            )
+
+        if rows(incremental) != rows(full):
+            self.stdout.write(self.style.ERROR("Incremental snapshot differs from the full one!"))
+        else:
+            self.stdout.write(self.style.SUCCESS("Incremental snapshot matches the full one."))
+
+    def history(self, user_ids, day, reads):
+        sample = random.sample(user_ids, min(reads, len(user_ids)))
+        usernames = list(User.objects.filter(id__in=sample).values_list("username", flat=True))
+        start, end = day - timedelta(days=1), day + timedelta(days=3)
+        latencies = []
+        with CaptureQueriesContext(connection) as queries:
+            for username in usernames:
+                started = time.perf_counter()
+                snapshots.history(username, start, end)
+                latencies.append(time.perf_counter() - started)
+        per_read = len(queries.captured_queries) / len(usernames)
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== Rank history, {len(usernames)} users"))
+        self.stdout.write(
+            f"  p50 {ms(percentile(latencies, 50))}  p99 {ms(percentile(latencies, 99))}  "
+            f"{per_read:.0f} query per read"
+        )
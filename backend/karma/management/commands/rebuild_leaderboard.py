@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from karma.leaderboard import WINDOWS, rebuild
+
+
+class Command(BaseCommand):
+    help = "Reload the leaderboard sorted sets from the karma ledger."
+
+    def handle(self, *args, **options):
+        board = rebuild()
+        for window in WINDOWS:
+            size = board.store.zcard(board._total(window))
+            self.stdout.write(f"{window:>4}: {size} users")
+        self.stdout.write(self.style.SUCCESS("Leaderboard rebuilt."))
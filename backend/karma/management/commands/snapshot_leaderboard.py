@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from karma import snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Store this interval's leaderboard snapshot (a no-op if it exists) "
+        "and delete snapshots older than --keep-days. Run from cron at "
+        "least once per LEADERBOARD_SNAPSHOT_INTERVAL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Sum the whole ledger instead of updating the previous snapshot.")
+        parser.add_argument("--keep-days", type=float, default=settings.LEADERBOARD_SNAPSHOT_RETENTION_DAYS)
+
+    def handle(self, *args, **options):
+        snapshot = snapshots.take(full=options["full"])
+        if snapshot is None:
+            self.stdout.write("This interval already has a snapshot.")
+        else:
+            kind = "full" if snapshot.full else "incremental"
+            self.stdout.write(f"Snapshot at {snapshot.taken_at:%Y-%m-%d %H:%M}: {snapshot.users} users ({kind}).")
+        pruned = snapshots.prune(options["keep_days"])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {pruned} old snapshots."))
@@ -0,0 +1,67 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("posts", "0004_alter_post_image"),
+        ("comments", "0005_comment_path"),
+        ("karma", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="karmatransaction",
+            name="actor",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="karma_given",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="karmatransaction",
+            name="comment",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="comments.comment",
+            ),
+        ),
+        migrations.AddField(
+            model_name="karmatransaction",
+            name="post",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="posts.post",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="karmatransaction",
+            name="created_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddConstraint(
+            model_name="karmatransaction",
+            constraint=models.UniqueConstraint(
+                fields=("actor", "post"), name="unique_karma_actor_post"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="karmatransaction",
+            constraint=models.UniqueConstraint(
+                fields=("actor", "comment"), name="unique_karma_actor_comment"
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+from django.db import migrations
+from django.db.models import Min, Sum
+from django.utils.timezone import now
+
+
+def convert(apps, schema_editor):
+    """Replace the append-only ledger with one row per current like.
+
+    Karma whose like no longer exists (e.g. the liked post was deleted) is
+    kept as one ``legacy_adjustment`` row per user, dated at that user's
+    oldest transaction, so every user's all-time total is unchanged.
+    """
+    KarmaTransaction = apps.get_model("karma", "KarmaTransaction")
+    Like = apps.get_model("likes", "Like")
+
+    old = {
+        user_id: (total, first)
+        for user_id, total, first in KarmaTransaction.objects
+        .values_list("user_id")
+        .annotate(total=Sum("points"), first=Min("created_at"))
+    }
+    KarmaTransaction.objects.all().delete()
+
+    new_totals = {}
+    batch = []
+    likes = (
+        Like.objects
+        .values_list("user_id", "post_id", "post__user_id", "comment_id", "comment__author_id", "created_at")
+        .order_by("id")
+    )
+    for actor_id, post_id, post_owner, comment_id, comment_owner, created_at in likes.iterator(chunk_size=2000):
+        if post_id:
+            row = KarmaTransaction(
+                user_id=post_owner, actor_id=actor_id, post_id=post_id,
+                points=5, source="post_like", created_at=created_at,
+            )
+        elif comment_id:
+            row = KarmaTransaction(
+                user_id=comment_owner, actor_id=actor_id, comment_id=comment_id,
+                points=1, source="comment_like", created_at=created_at,
+            )
+        else:
+            continue
+        new_totals[row.user_id] = new_totals.get(row.user_id, 0) + row.points
+        batch.append(row)
+        if len(batch) >= 2000:
+            KarmaTransaction.objects.bulk_create(batch)
+            batch = []
+
+    oldest = min((first for _, first in old.values()), default=None)
+    for user_id in old.keys() | new_totals.keys():
+        total, first = old.get(user_id, (0, oldest))
+        residual = (total or 0) - new_totals.get(user_id, 0)
+        if residual:
+            batch.append(KarmaTransaction(
+                user_id=user_id, points=residual, source="legacy_adjustment", created_at=first or now(),
+            ))
+    KarmaTransaction.objects.bulk_create(batch, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("karma", "0002_net_state"),
+        ("likes", "0002_alter_like_comment_alter_like_post_alter_like_user"),
+    ]
+
+    operations = [
+        # Net-state rows are valid append-only rows with the same totals,
+        # so going back needs no data change.
+        migrations.RunPython(convert, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("karma", "0003_convert_ledger"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="karmatransaction",
+            index=models.Index(fields=["created_at"], name="karma_created_idx"),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from core import partitions
+
+
+def partition(apps, schema_editor):
+    if partitions.enabled(schema_editor.connection):
+        partitions.convert(apps.get_model("karma", "KarmaTransaction"), schema_editor.connection)
+
+
+def unpartition(apps, schema_editor):
+    partitions.unconvert(apps.get_model("karma", "KarmaTransaction"), schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("karma", "0004_endpoint_indexes"),
+    ]
+
+    # Postgres with DB_PARTITION_BY_MONTH only; see core.partitions.
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,50 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("karma", "0005_partition_by_month"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Snapshot",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("taken_at", models.DateTimeField(unique=True)),
+                ("computed_at", models.DateTimeField()),
+                ("users", models.IntegerField(default=0)),
+                ("full", models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="KarmaRemoval",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("created_at", models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ("user", models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="SnapshotRank",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("taken_at", models.DateTimeField()),
+                ("rank", models.IntegerField()),
+                ("karma", models.IntegerField()),
+                ("user", models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                "indexes": [models.Index(fields=["taken_at", "rank"], name="snapshot_rank_top_idx")],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="snapshotrank",
+            constraint=models.UniqueConstraint(fields=("user", "taken_at"), name="unique_snapshot_rank_user"),
+        ),
+    ]
@@ -0,0 +1,28 @@
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill(apps, schema_editor):
+    KarmaTransaction = apps.get_model("karma", "KarmaTransaction")
+    KarmaTransaction.objects.update(updated_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("karma", "0006_leaderboard_snapshots"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="karmatransaction",
+            name="updated_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="karmatransaction",
+            index=models.Index(fields=["updated_at"], name="karma_updated_idx"),
+        ),
+    ]
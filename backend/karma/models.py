@@ -1,12 +1,96 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils.timezone import now
 
 
 class KarmaTransaction(models.Model):
+    """Karma one liker currently gives one post or comment.
+
+    There is one row per (actor, post) or (actor, comment): a like sets
+    ``points`` to 5 (post) or 1 (comment) and an unlike sets it to 0.
+    ``created_at`` is when the like was first given and stays put, so a
+    re-like counts in the windowed leaderboards at its original time
+    rather than again now; ``updated_at`` is the last toggle. Rows without
+    an actor are legacy adjustments carried over from the append-only
+    ledger.
+    """
+
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    actor = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL, related_name="karma_given"
+    )
+    post = models.ForeignKey(
+        "posts.Post", null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+    comment = models.ForeignKey(
+        "comments.Comment", null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
     points = models.IntegerField()
     source = models.CharField(max_length=50)  # post_like / comment_like
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=now)
+    updated_at = models.DateTimeField(default=now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["actor", "post"],
+                name="unique_karma_actor_post"
+            ),
+            models.UniqueConstraint(
+                fields=["actor", "comment"],
+                name="unique_karma_actor_comment"
+            ),
+        ]
+        indexes = [
+            # Windowed sums and leaderboard reloads filter on created_at.
+            models.Index(fields=["created_at"], name="karma_created_idx"),
+            # Incremental snapshots look for rows toggled since the last one.
+            models.Index(fields=["updated_at"], name="karma_updated_idx"),
+        ]
 
     def __str__(self):
         return f"{self.points} karma for {self.user.username}"
+
+
+class KarmaRemoval(models.Model):
+    """A user whose ledger rows ``reap_deleted`` removed. Those rows leave
+    no trace in the ledger, so the next leaderboard snapshot recomputes
+    these users and then clears the rows."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+", db_index=False)
+    created_at = models.DateTimeField(default=now, db_index=True)
+
+
+class Snapshot(models.Model):
+    """One leaderboard snapshot; ``taken_at`` is the start of its
+    LEADERBOARD_SNAPSHOT_INTERVAL slot, ``computed_at`` when it was read
+    from the ledger."""
+
+    taken_at = models.DateTimeField(unique=True)
+    computed_at = models.DateTimeField()
+    users = models.IntegerField(default=0)
+    full = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"Leaderboard at {self.taken_at:%Y-%m-%d %H:%M}"
+
+
+class SnapshotRank(models.Model):
+    """A user's all-time karma and 1-based rank in one snapshot. Only
+    users with karma are stored; ``taken_at`` is copied from the snapshot
+    so a user's history is a single range scan."""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+", db_index=False)
+    taken_at = models.DateTimeField()
+    rank = models.IntegerField()
+    karma = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            # Also the index for one user's history over a date range.
+            models.UniqueConstraint(fields=["user", "taken_at"], name="unique_snapshot_rank_user"),
+        ]
+        indexes = [
+            # Top-N of a snapshot.
+            models.Index(fields=["taken_at", "rank"], name="snapshot_rank_top_idx"),
+        ]
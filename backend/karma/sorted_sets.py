@@ -0,0 +1,116 @@
+import threading
+from bisect import bisect_left, insort
+
+
+class InMemorySortedSets:
+    """The subset of redis-py's sorted-set API the leaderboard uses, kept in-process.
+
+    Each set is a dict (member -> score) plus a list of (score, member)
+    pairs kept sorted with bisect, so rank lookups are O(log n) and top-N
+    reads are a slice. Ordering matches Redis: by score, ties by member.
+    Members are strings, as with ``decode_responses=True``.
+    """
+
+    def __init__(self):
+        self._scores = {}
+        self._ordered = {}
+        self._lock = threading.RLock()
+
+    def _set(self, name):
+        if name not in self._scores:
+            self._scores[name] = {}
+            self._ordered[name] = []
+        return self._scores[name], self._ordered[name]
+
+    def _put(self, name, member, score):
+        scores, ordered = self._set(name)
+        old = scores.get(member)
+        if old is not None:
+            del ordered[bisect_left(ordered, (old, member))]
+        scores[member] = score
+        insort(ordered, (score, member))
+
+    def zincrby(self, name, amount, value):
+        member = str(value)
+        with self._lock:
+            score = self._set(name)[0].get(member, 0) + amount
+            self._put(name, member, score)
+            return score
+
+    def zadd(self, name, mapping):
+        with self._lock:
+            added = sum(1 for member in mapping if str(member) not in self._set(name)[0])
+            for member, score in mapping.items():
+                self._put(name, str(member), score)
+            return added
+
+    def zrem(self, name, *values):
+        removed = 0
+        with self._lock:
+            scores, ordered = self._set(name)
+            for value in values:
+                member = str(value)
+                score = scores.pop(member, None)
+                if score is not None:
+                    del ordered[bisect_left(ordered, (score, member))]
+                    removed += 1
+        return removed
+
+    def zscore(self, name, value):
+        with self._lock:
+            return self._scores.get(name, {}).get(str(value))
+
+    def zcard(self, name):
+        with self._lock:
+            return len(self._scores.get(name, {}))
+
+    def zrevrank(self, name, value):
+        member = str(value)
+        with self._lock:
+            scores, ordered = self._set(name)
+            score = scores.get(member)
+            if score is None:
+                return None
+            return len(ordered) - 1 - bisect_left(ordered, (score, member))
+
+    def zrange(self, name, start, end, withscores=False):
+        with self._lock:
+            ordered = self._set(name)[1]
+            rows = ordered[start:len(ordered) if end == -1 else end + 1]
+        return [(m, s) for s, m in rows] if withscores else [m for _, m in rows]
+
+    def zrevrange(self, name, start, end, withscores=False):
+        with self._lock:
+            ordered = self._set(name)[1]
+            # Walk back from the top instead of reversing the whole list.
+            stop = len(ordered) - 1 - start
+            first = 0 if end == -1 else max(len(ordered) - 1 - end, 0)
+            rows = ordered[first:stop + 1][::-1] if stop >= 0 else []
+        return [(m, s) for s, m in rows] if withscores else [m for _, m in rows]
+
+    def zrangebyscore(self, name, min, max):
+        min = float("-inf") if min == "-inf" else min
+        max = float("inf") if max == "+inf" else max
+        with self._lock:
+            ordered = self._set(name)[1]
+            start = bisect_left(ordered, (min,))
+            return [m for s, m in ordered[start:] if s <= max]
+
+    def zcount(self, name, min, max):
+        with self._lock:
+            ordered = self._set(name)[1]
+            return bisect_left(ordered, (max, "\U0010ffff")) - bisect_left(ordered, (min,))
+
+    def delete(self, *names):
+        with self._lock:
+            deleted = 0
+            for name in names:
+                if self._scores.pop(name, None) is not None:
+                    self._ordered.pop(name, None)
+                    deleted += 1
+            return deleted
+
+    def keys(self, pattern="*"):
+        prefix = pattern.rstrip("*")
+        with self._lock:
+            return [name for name in self._scores if name.startswith(prefix)]
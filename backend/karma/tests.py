@@ -1,3 +1,256 @@
+import random
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Sum
 from django.test import TestCase
+from django.utils.timezone import now
+
+from core import reaper, testing
+from core.testing import Endpoint
+from counters import sharded
+from posts.models import Post
+from . import leaderboard, ledger, snapshots
+from .leaderboard import WINDOWS, Leaderboard, LocalLeaderboard
+from .models import KarmaTransaction, Snapshot, SnapshotRank
+from .sorted_sets import InMemorySortedSets
+
+
+class LeaderboardQueryBudgetTests(testing.QueryBudgetTestCase):
+    endpoints = [
+        Endpoint("GET", "/leaderboard/"),
+        Endpoint("GET", "/leaderboard/?window=all&limit=50"),
+        Endpoint("GET", "/leaderboard/", anonymous=True),
+        Endpoint("GET", "/leaderboard/me/"),
+        Endpoint("GET", "/leaderboard/me/?window=all"),
+        Endpoint("GET", "/leaderboard/history/{username}/"),
+        Endpoint("GET", "/admin/karma/karmatransaction/", user="admin", scales=True),
+    ]
+
+
+class LeaderboardTests(TestCase):
+    def setUp(self):
+        self.board = Leaderboard(InMemorySortedSets())
+
+    def test_windows_drop_expired_buckets(self):
+        at = 1_000_000_000
+        self.board.record(1, 5, at=at - 2 * 86400)
+        self.board.record(1, 1, at=at - 2 * 3600)
+        self.board.record(2, 5, at=at - 60)
+
+        with mock.patch("time.time", return_value=at):
+            self.assertEqual(self.board.rank("1h", 1), (None, 0))
+            self.assertEqual(self.board.top("1h", 5), [(2, 5)])
+            self.assertEqual(self.board.top("24h", 5), [(2, 5), (1, 1)])
+            self.assertEqual(self.board.top("7d", 5), [(1, 6), (2, 5)])
+        self.assertEqual(self.board.top("all", 5), [(1, 6), (2, 5)])
+
+    def test_load_matches_recording(self):
+        at = 1_000_000_000
+        events = [(1, 5, at - 100), (2, 1, at - 5000), (1, -5, at - 50), (3, 5, at - 90000)]
+        for user_id, points, stamp in events:
+            self.board.record(user_id, points, at=stamp)
+        loaded = Leaderboard(InMemorySortedSets(), prefix="loaded")
+        loaded.load({1: 0, 2: 1, 3: 5}, events, at=at)
+
+        with mock.patch("time.time", return_value=at):
+            for window in WINDOWS:
+                self.assertEqual(loaded.top(window, 10), self.board.top(window, 10), window)
+                for user_id in (1, 2, 3):
+                    self.assertEqual(loaded.rank(window, user_id), self.board.rank(window, user_id))
+
+    def test_zero_scores_are_unranked_in_both_top_and_rank(self):
+        self.board.record(1, 5)
+        self.board.record(2, 5)
+        self.board.record(2, -5)
+        self.board.record(3, -1)
+
+        self.assertEqual(self.board.top("all", 10), [(1, 5), (3, -1)])
+        self.assertEqual(self.board.rank("all", 1), (1, 5))
+        self.assertEqual(self.board.rank("all", 2), (None, 0))
+        self.assertEqual(self.board.rank("all", 3), (2, -1))
+
+
+class LocalLeaderboardTests(TestCase):
+    def setUp(self):
+        owner, fan = User.objects.create_user("owner"), User.objects.create_user("fan")
+        post = Post.objects.create(user=owner, content="Hi")
+        KarmaTransaction.objects.create(user=owner, actor=fan, post=post, points=5, source="post_like")
+        self.owner, self.fan = owner, fan
+
+    def test_only_the_first_read_waits_for_the_ledger(self):
+        board = LocalLeaderboard(refresh=60)
+        self.assertEqual(board.top("all", 5), [(self.owner.id, 5)])
+
+        board.loaded_at -= 61
+        with mock.patch("karma.leaderboard.threading.Thread") as thread, self.assertNumQueries(0):
+            self.assertEqual(board.rank("all", self.owner.id), (1, 5))
+            board.top("all", 5)
+        # One reload, started once, off the request.
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+
+    def catch_up(self, board):
+        board._loading.acquire()
+        with mock.patch("karma.leaderboard.connection"):
+            board._reload()
+        self.assertFalse(board._loading.locked())
+
+    def test_catch_up_recomputes_only_the_changed_users(self):
+        board = LocalLeaderboard(refresh=60)
+        board.top("all", 5)
+        other = Post.objects.create(user=self.fan, content="Mine")
+        KarmaTransaction.objects.create(user=self.fan, actor=self.owner, post=other, points=5, source="post_like")
+        # Points the ledger doesn't have, on a user whose rows are older
+        # than the look-back: a catch-up leaves them be.
+        board.record(self.owner.id, 100, at=time.time() - 7200)
+        KarmaTransaction.objects.filter(user=self.owner).update(updated_at=now() - timedelta(hours=1))
+
+        with self.settings(LEADERBOARD_SNAPSHOT_OVERLAP=60):
+            self.catch_up(board)
+        self.assertEqual(board.top("all", 5), [(self.owner.id, 105), (self.fan.id, 5)])
+
+        KarmaTransaction.objects.filter(user=self.owner).update(points=1, updated_at=now())
+        self.catch_up(board)
+        expected = leaderboard.rebuild(Leaderboard(InMemorySortedSets()))
+        self.assertEqual(board.top("all", 5), [(self.fan.id, 5), (self.owner.id, 1)])
+        for window in WINDOWS:
+            self.assertEqual(board.top(window, 5), expected.top(window, 5), window)
+            self.assertEqual(board.rank(window, self.owner.id), expected.rank(window, self.owner.id), window)
+
+    def test_catch_up_sees_removed_rows(self):
+        board = LocalLeaderboard(refresh=60)
+        board.top("all", 5)
+        with self.captureOnCommitCallbacks(execute=True):
+            ledger.remove(KarmaTransaction.objects.filter(user=self.owner))
+        # As another worker would have it: the removal never reached this board.
+        board.record(self.owner.id, 5)
+
+        self.catch_up(board)
+        self.assertEqual(board.top("all", 5), [])
+        self.assertEqual(board.rank("7d", self.owner.id), (None, 0))
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.owner, self.fan = User.objects.create_user("owner"), User.objects.create_user("fan")
+        self.post = Post.objects.create(user=self.owner, content="Hi")
+        leaderboard._board = Leaderboard(InMemorySortedSets())
+        self.addCleanup(setattr, leaderboard, "_board", None)
+
+    def toggle(self, liked, at=None):
+        with mock.patch("karma.ledger.now", return_value=at or now()), \
+                self.captureOnCommitCallbacks(execute=True):
+            ledger.set_like(self.fan.id, self.owner.id, liked, post=self.post)
+
+    def windows(self, board):
+        return {window: board.rank(window, self.owner.id)[1] for window in WINDOWS}
+
+    def test_flapping_nets_zero_in_every_window(self):
+        self.toggle(True, at=now() - timedelta(hours=2))
+        for _ in range(3):
+            self.toggle(False)
+            self.toggle(True)
+
+        expected = {"1h": 0, "24h": 5, "7d": 5, "all": 5}
+        self.assertEqual(self.windows(leaderboard._board), expected)
+        # A board reloaded from the ledger agrees with the live one.
+        reloaded = leaderboard.rebuild(Leaderboard(InMemorySortedSets(), "reloaded"))
+        self.assertEqual(self.windows(reloaded), expected)
+        self.assertEqual(KarmaTransaction.objects.count(), 1)
+
+    def test_unlike_takes_the_like_out_of_every_window(self):
+        self.toggle(True, at=now() - timedelta(hours=2))
+        self.toggle(False)
+
+        self.assertEqual(self.windows(leaderboard._board), {"1h": 0, "24h": 0, "7d": 0, "all": 0})
+        entry = KarmaTransaction.objects.get()
+        self.assertEqual(entry.points, 0)
+        self.assertLess(entry.created_at, entry.updated_at)
+
+    def test_totals_match_the_append_only_ledger(self):
+        events = [True, False, True, True, False, False, True]
+        liked = False
+        for want in events:
+            if want != liked:
+                self.toggle(want)
+                liked = want
+        self.assertEqual(sharded.get_count(sharded.USER_KARMA, self.owner.id, fresh=True), 5)
+        self.assertEqual(KarmaTransaction.objects.aggregate(total=Sum("points"))["total"], 5)
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.users = [User.objects.create_user(f"user{index}") for index in range(6)]
+        self.posts = [Post.objects.create(user=user, content="Hi") for user in self.users[:4]]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.comments = [
+                testing.client(user).post(f"/comments/post/{post.id}/", {"content": "Mine"}).data["id"]
+                for user, post in zip(self.users[:4], self.posts)
+            ]
+        self.day = now() - timedelta(days=30)
+
+    def ranks(self, snapshot):
+        rows = SnapshotRank.objects.filter(taken_at=snapshot.taken_at).order_by("rank")
+        return list(rows.values_list("user_id", "rank", "karma"))
+
+    def from_ledger(self):
+        totals = KarmaTransaction.objects.values_list("user_id").annotate(karma=Sum("points"))
+        ordered = sorted((-karma, user_id) for user_id, karma in totals if karma)
+        return [(user_id, rank, -karma) for rank, (karma, user_id) in enumerate(ordered, start=1)]
+
+    def take(self, full=False):
+        self.day += timedelta(days=1)
+        return snapshots.take(at=self.day, full=full)
+
+    def test_incremental_matches_a_full_recount(self):
+        random.seed(7)
+        self.take(full=True)
+        for _ in range(6):
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(10):
+                    fan = random.choice(self.users)
+                    if random.random() < 0.5:
+                        testing.client(fan).post(f"/likes/post/{random.choice(self.posts).id}/")
+                    else:
+                        testing.client(fan).post(f"/likes/comment/{random.choice(self.comments)}/")
+            incremental = self.take()
+            self.assertFalse(incremental.full)
+            self.assertEqual(self.ranks(incremental), self.from_ledger())
+
+        full = self.take(full=True)
+        self.assertEqual(self.ranks(full), self.ranks(Snapshot.objects.exclude(pk=full.pk).latest("taken_at")))
+
+    def test_removed_ledger_rows_are_recounted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            testing.client(self.users[4]).post(f"/likes/post/{self.posts[0].id}/")
+            testing.client(self.users[5]).post(f"/likes/comment/{self.comments[0]}/")
+            testing.client(self.users[5]).post(f"/likes/post/{self.posts[1].id}/")
+        before = self.take(full=True)
+        self.assertEqual(
+            [(user_id, karma) for user_id, _, karma in self.ranks(before)],
+            [(self.users[0].id, 6), (self.users[1].id, 5)],
+        )
+
+        testing.client(self.users[0]).delete(f"/posts/{self.posts[0].id}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            reaper.reap()
+        incremental = self.take()
+        self.assertEqual(self.ranks(incremental), [(self.users[1].id, 1, 5)])
+        self.assertEqual(self.ranks(incremental), self.from_ledger())
 
-# Create your tests here.
+    def test_ties_rank_by_user_id(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for post in reversed(self.posts[:3]):
+                testing.client(self.users[5]).post(f"/likes/post/{post.id}/")
+        self.take(full=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            testing.client(self.users[4]).post(f"/likes/post/{self.posts[2].id}/")
+        self.assertEqual(
+            self.ranks(self.take()),
+            [(self.users[2].id, 1, 10), (self.users[0].id, 2, 5), (self.users[1].id, 3, 5)],
+        )
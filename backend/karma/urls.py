@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import LeaderboardView, LeaderboardMeView
+from .views import LeaderboardView, LeaderboardMeView, RankHistoryView
 
 urlpatterns = [
     path("", LeaderboardView.as_view()),
     path("me/", LeaderboardMeView.as_view()),
+    path("history/<str:username>/", RankHistoryView.as_view()),
 ]
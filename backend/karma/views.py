@@ -1,53 +1,101 @@
+from datetime import date, datetime, time, timedelta, timezone
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.utils.timezone import now
-from datetime import timedelta
-from django.db.models import Sum
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.shortcuts import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 
-from .models import KarmaTransaction
+from backend.response_cache import cached_get
+from . import snapshots
+from .leaderboard import DEFAULT_WINDOW, WINDOWS, get_leaderboard
+
+
+def _window(request):
+    window = request.query_params.get("window", DEFAULT_WINDOW)
+    if window not in WINDOWS:
+        return None
+    return window
 
 
 class LeaderboardView(APIView):
 
+    @cached_get("leaderboard", params=("window", "limit"))
     def get(self, request):
-        since = now() - timedelta(hours=24)
-
-        leaderboard = (
-            KarmaTransaction.objects
-            .filter(created_at__gte=since)
-            .values("user__username")
-            .annotate(karma=Sum("points"))
-            .order_by("-karma")[:5]
+        window = _window(request)
+        if window is None:
+            return Response({"error": f"window must be one of {', '.join(WINDOWS)}"}, status=400)
+
+        try:
+            limit = int(request.query_params.get("limit", 5))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+        limit = max(1, min(limit, settings.LEADERBOARD_MAX_LIMIT))
+
+        rows = get_leaderboard().top(window, limit)
+        usernames = dict(
+            User.objects.filter(id__in=[user_id for user_id, _ in rows])
+            .values_list("id", "username")
         )
 
-        return Response(leaderboard)
+        return Response([
+            {"user__username": usernames[user_id], "karma": karma}
+            for user_id, karma in rows
+            if user_id in usernames
+        ])
 
 
 class LeaderboardMeView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        since = now() - timedelta(hours=24)
-
-        leaderboard = (
-            KarmaTransaction.objects
-            .filter(created_at__gte=since)
-            .values("user_id", "user__username")
-            .annotate(karma=Sum("points"))
-            .order_by("-karma")
-        )
+        window = _window(request)
+        if window is None:
+            return Response({"error": f"window must be one of {', '.join(WINDOWS)}"}, status=400)
 
-        rank = None
-        karma = 0
-        for idx, row in enumerate(leaderboard, start=1):
-            if row["user_id"] == request.user.id:
-                rank = idx
-                karma = row["karma"]
-                break
+        rank, karma = get_leaderboard().rank(window, request.user.id)
 
         return Response({
             "username": request.user.username,
+            "window": window,
             "rank": rank,
             "karma": karma,
         })
+
+
+class RankHistoryView(APIView):
+    """A user's snapshot rank and karma per day in ``from``..``to``
+    (inclusive dates, default the last 30 days)."""
+
+    def get(self, request, username):
+        params = request.query_params
+        try:
+            end = date.fromisoformat(params["to"]) if params.get("to") else datetime.now(timezone.utc).date()
+            start = date.fromisoformat(params["from"]) if params.get("from") else end - timedelta(days=30)
+        except ValueError:
+            return Response({"error": "from and to must be dates (YYYY-MM-DD)"}, status=400)
+        if start > end:
+            return Response({"error": "from must not be after to"}, status=400)
+        if (end - start).days >= settings.LEADERBOARD_HISTORY_MAX_DAYS:
+            return Response(
+                {"error": f"at most {settings.LEADERBOARD_HISTORY_MAX_DAYS} days at a time"}, status=400
+            )
+
+        rows = snapshots.history(
+            username,
+            datetime.combine(start, time.min, tzinfo=timezone.utc),
+            datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc),
+        )
+        if not rows:
+            get_object_or_404(User, username=username)
+
+        return Response({
+            "username": username,
+            "from": start,
+            "to": end,
+            "history": [
+                {"at": taken_at, "rank": rank, "karma": karma}
+                for taken_at, rank, karma in rows
+            ],
+        })
@@ -1,3 +1,23 @@
 from django.contrib import admin
 
-# Register your models here.
+from core.admin import ScalableAdmin
+from .models import Like
+
+
+@admin.register(Like)
+class LikeAdmin(ScalableAdmin):
+    """Read-only: likes move counters, karma and stats that editing a row
+    here would leave behind."""
+
+    list_display = ("id", "user", "post_id", "comment_id", "created_at")
+    list_select_related = ("user",)
+    search_fields = ("id", "user__username", "post", "comment")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
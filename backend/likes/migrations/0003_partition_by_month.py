@@ -0,0 +1,24 @@
+from django.db import migrations
+
+from core import partitions
+
+
+def partition(apps, schema_editor):
+    if partitions.enabled(schema_editor.connection):
+        partitions.convert(apps.get_model("likes", "Like"), schema_editor.connection)
+
+
+def unpartition(apps, schema_editor):
+    partitions.unconvert(apps.get_model("likes", "Like"), schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("likes", "0002_alter_like_comment_alter_like_post_alter_like_user"),
+    ]
+
+    # Postgres with DB_PARTITION_BY_MONTH only; see core.partitions.
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -1,3 +1,15 @@
-from django.test import TestCase
+from core import testing
+from core.testing import Endpoint
 
-# Create your tests here.
+
+class LikeQueryBudgetTests(testing.QueryBudgetTestCase):
+    # Each pair likes, then unlikes.
+    endpoints = [
+        Endpoint("POST", "/likes/post/{friend_post}/"),
+        Endpoint("POST", "/likes/post/{friend_post}/"),
+        Endpoint("POST", "/likes/post/{post}/"),
+        Endpoint("POST", "/likes/post/{post}/"),
+        Endpoint("POST", "/likes/comment/{comment}/"),
+        Endpoint("POST", "/likes/comment/{comment}/"),
+        Endpoint("GET", "/admin/likes/like/", user="admin", scales=True),
+    ]
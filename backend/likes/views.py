@@ -6,7 +6,14 @@ from django.shortcuts import get_object_or_404
 from posts.models import Post
 from comments.models import Comment
 from .models import Like
-from karma.models import KarmaTransaction
+from karma import ledger
+from counters import sharded
+from core import partitions
+from backend.response_cache import invalidate
+from notifications.delivery import Event, send
+from notifications.models import Notification
+from sync import log
+from sync.models import Change
 
 
 from rest_framework.permissions import IsAuthenticated
@@ -15,30 +22,30 @@ class LikePostView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, post_id):
-        post = get_object_or_404(Post, id=post_id)
+        post = get_object_or_404(Post, id=post_id, deleted_at__isnull=True)
 
         with transaction.atomic():
+            invalidate("feed")
+            # Stands in for the unique constraint when likes are partitioned.
+            partitions.lock("like", request.user.id, "post", post.id)
             existing = Like.objects.select_for_update().filter(
                 user=request.user, post=post
             ).first()
 
             if existing:
                 existing.delete()
-                KarmaTransaction.objects.create(
-                    user=post.user,
-                    points=-5,
-                    source="post_unlike"
-                )
-                like_count = Like.objects.filter(post=post).count()
+                ledger.set_like(request.user.id, post.user_id, False, post=post)
+                sharded.increment(sharded.POST_LIKES, post.id, -1)
+                log.record(Change.POST_COUNTS, post.id, post.id)
+                like_count = sharded.get_count(sharded.POST_LIKES, post.id, fresh=True)
                 return Response({"message": "Post unliked", "liked": False, "like_count": like_count})
 
             Like.objects.create(user=request.user, post=post)
-            KarmaTransaction.objects.create(
-                user=post.user,
-                points=5,
-                source="post_like"
-            )
-            like_count = Like.objects.filter(post=post).count()
+            ledger.set_like(request.user.id, post.user_id, True, post=post)
+            sharded.increment(sharded.POST_LIKES, post.id, 1)
+            log.record(Change.POST_COUNTS, post.id, post.id)
+            send([Event(post.user_id, Notification.POST_LIKE, request.user.id, post.id)])
+            like_count = sharded.get_count(sharded.POST_LIKES, post.id, fresh=True)
             return Response({"message": "Post liked", "liked": True, "like_count": like_count})
 
 
@@ -46,28 +53,29 @@ class LikeCommentView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, comment_id):
-        comment = get_object_or_404(Comment, id=comment_id)
+        comment = get_object_or_404(Comment.objects.visible(), id=comment_id)
 
         with transaction.atomic():
+            invalidate(f"comments:{comment.post_id}")
+            partitions.lock("like", request.user.id, "comment", comment.id)
             existing = Like.objects.select_for_update().filter(
                 user=request.user, comment=comment
             ).first()
 
             if existing:
                 existing.delete()
-                KarmaTransaction.objects.create(
-                    user=comment.author,
-                    points=-1,
-                    source="comment_unlike"
-                )
-                like_count = Like.objects.filter(comment=comment).count()
+                ledger.set_like(request.user.id, comment.author_id, False, comment=comment)
+                sharded.increment(sharded.COMMENT_LIKES, comment.id, -1)
+                log.record(Change.COMMENT_COUNTS, comment.id, comment.post_id)
+                like_count = sharded.get_count(sharded.COMMENT_LIKES, comment.id, fresh=True)
                 return Response({"message": "Comment unliked", "liked": False, "like_count": like_count})
 
             Like.objects.create(user=request.user, comment=comment)
-            KarmaTransaction.objects.create(
-                user=comment.author,
-                points=1,
-                source="comment_like"
-            )
-            like_count = Like.objects.filter(comment=comment).count()
+            ledger.set_like(request.user.id, comment.author_id, True, comment=comment)
+            sharded.increment(sharded.COMMENT_LIKES, comment.id, 1)
+            log.record(Change.COMMENT_COUNTS, comment.id, comment.post_id)
+            send([Event(
+                comment.author_id, Notification.COMMENT_LIKE, request.user.id, comment.post_id, comment.id
+            )])
+            like_count = sharded.get_count(sharded.COMMENT_LIKES, comment.id, fresh=True)
             return Response({"message": "Comment liked", "liked": True, "like_count": like_count})
@@ -0,0 +1,202 @@
+import threading
+import time
+from collections import Counter
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils.timezone import now
+
+from core import background
+from posts.models import Post
+from .models import Notification
+
+_lock = threading.Lock()
+_pending = []
+_started = None
+
+
+class Event(NamedTuple):
+    recipient_id: int
+    kind: str
+    actor_id: int
+    post_id: int
+    comment_id: Optional[int] = None
+
+
+def _key(event):
+    return f"{event.kind}:{event.post_id}:{event.comment_id or ''}"
+
+
+def _unread_key(user_id):
+    return f"notifications:unread:{user_id}"
+
+
+def send(events):
+    """Deliver ``events`` once the current transaction commits, so a rolled
+    back reply or like notifies nobody. Events about the actor's own
+    content are dropped. With a flusher thread running they are buffered
+    and delivered together (see ``flush``)."""
+    events = [event for event in events if event.recipient_id != event.actor_id]
+    if events:
+        transaction.on_commit(lambda: _enqueue(events))
+
+
+def _enqueue(events):
+    global _started
+    if not background.running():
+        deliver(events)
+        return
+    with _lock:
+        _pending.extend(events)
+        if _started is None:
+            _started = time.monotonic()
+
+
+def _due():
+    with _lock:
+        return _started is not None and (
+            len(_pending) >= settings.NOTIFICATION_FLUSH_SIZE
+            or time.monotonic() - _started >= settings.NOTIFICATION_FLUSH_SECONDS
+        )
+
+
+def flush():
+    """Deliver every buffered event in one batch; returns how many."""
+    global _pending, _started
+    with _lock:
+        events, _pending = _pending, []
+        _started = None
+    if events:
+        deliver(events)
+    return len(events)
+
+
+def deliver(events):
+    """Coalesce ``events`` into notifications: bump the matching unread ones
+    and ``bulk_create`` the rest. Events on posts deleted in the meantime
+    are dropped."""
+    live = set(
+        Post.objects.filter(id__in={event.post_id for event in events}, deleted_at__isnull=True)
+        .values_list("id", flat=True)
+    )
+    groups = {}
+    for event in events:
+        if event.post_id not in live:
+            continue
+        slot = (event.recipient_id, _key(event))
+        if slot in groups:
+            first, count, _ = groups[slot]
+            groups[slot] = (first, count + 1, event.actor_id)
+        else:
+            groups[slot] = (event, 1, event.actor_id)
+    if not groups:
+        return
+
+    at = now()
+    with transaction.atomic():
+        # Locked in id order, so two batches can't deadlock on each other.
+        existing = dict(
+            ((recipient_id, key), pk)
+            for pk, recipient_id, key in Notification.objects.select_for_update()
+            .filter(
+                read_at__isnull=True,
+                recipient_id__in={recipient_id for recipient_id, _ in groups},
+                key__in={key for _, key in groups},
+            )
+            .order_by("id")
+            .values_list("id", "recipient_id", "key")
+        )
+        created = []
+        for slot, (event, count, actor_id) in groups.items():
+            if slot in existing:
+                # The latest actor acting again (like, unlike, like) isn't
+                # another person. Repeats by earlier actors still count.
+                Notification.objects.filter(pk=existing[slot]).update(
+                    actor_count=F("actor_count") + Case(
+                        When(actor_id=actor_id, then=Value(count - 1)), default=Value(count)
+                    ),
+                    actor_id=actor_id,
+                    updated_at=at,
+                )
+            else:
+                created.append(Notification(
+                    recipient_id=event.recipient_id, kind=event.kind, key=slot[1],
+                    post_id=event.post_id, comment_id=event.comment_id,
+                    actor_id=actor_id, actor_count=count, updated_at=at,
+                ))
+        inserted = Counter()
+        if created:
+            # A concurrent delivery may have just created the same unread
+            # notification; that event is dropped rather than failing. Only
+            # the rows this batch inserted carry its timestamp.
+            Notification.objects.bulk_create(created, ignore_conflicts=True)
+            slots = {(n.recipient_id, n.key) for n in created}
+            inserted.update(
+                recipient_id for recipient_id, key in Notification.objects.filter(
+                    read_at__isnull=True, updated_at=at,
+                    recipient_id__in={recipient_id for recipient_id, _ in slots},
+                    key__in={key for _, key in slots},
+                ).values_list("recipient_id", "key")
+                if (recipient_id, key) in slots
+            )
+
+    for recipient_id, count in inserted.items():
+        try:
+            cache.incr(_unread_key(recipient_id), count)
+        except ValueError:
+            pass  # not cached; the next read counts
+
+
+def unread_count(user_id):
+    """Unread notifications for the badge, from cache after the first call."""
+    key = _unread_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(
+            recipient_id=user_id, read_at__isnull=True, post__deleted_at__isnull=True
+        ).count()
+        cache.set(key, count, settings.NOTIFICATION_UNREAD_TTL)
+    return count
+
+
+def forget_posts(post_ids):
+    """Drop the cached unread counts that include notifications on
+    ``post_ids``, which stop counting once they are deleted."""
+    recipients = set(
+        Notification.objects.filter(post_id__in=post_ids, read_at__isnull=True).values_list("recipient_id", flat=True)
+    )
+    _drop_unread(recipients)
+
+
+def _drop_unread(recipient_ids):
+    keys = [_unread_key(recipient_id) for recipient_id in recipient_ids]
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def discard(notifications):
+    """Delete ``notifications`` (a queryset), e.g. for content being removed,
+    and drop the cached unread counts they were part of. Returns how many
+    were deleted."""
+    recipients = set(notifications.filter(read_at__isnull=True).values_list("recipient_id", flat=True))
+    deleted = notifications.delete()[0]
+    _drop_unread(recipients)
+    return deleted
+
+
+def mark_read(user_id, ids=None):
+    """Mark the given notifications (default: all) read; returns how many."""
+    rows = Notification.objects.filter(recipient_id=user_id, read_at__isnull=True)
+    if ids is not None:
+        rows = rows.filter(id__in=ids)
+    changed = rows.update(read_at=now())
+    # Recounted on the next read rather than set to a value a concurrent
+    # delivery could already have changed.
+    cache.delete(_unread_key(user_id))
+    return changed
+
+
+background.register(flush, _due)
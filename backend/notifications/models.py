@@ -0,0 +1,50 @@
+from django.db import models
+from django.contrib.auth.models import User
+from django.utils.timezone import now
+
+
+class Notification(models.Model):
+    """One line in a user's notification list.
+
+    Events with the same recipient and ``key`` (kind plus target) are
+    coalesced into the single unread notification for that key:
+    ``actor_count`` grows, ``actor`` becomes the latest one and
+    ``updated_at`` moves it back to the top. Once read, the next event
+    starts a new notification.
+    """
+
+    REPLY = "reply"
+    COMMENT = "comment"
+    POST_LIKE = "post_like"
+    COMMENT_LIKE = "comment_like"
+
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name="notifications")
+    kind = models.CharField(max_length=20)
+    key = models.CharField(max_length=64)
+    post = models.ForeignKey("posts.Post", on_delete=models.CASCADE, related_name="+")
+    comment = models.ForeignKey(
+        "comments.Comment", null=True, blank=True, on_delete=models.CASCADE, related_name="+"
+    )
+    actor = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    actor_count = models.IntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=now)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # At most one unread notification per target; also serves the
+            # unread count.
+            models.UniqueConstraint(
+                fields=["recipient", "key"],
+                condition=models.Q(read_at__isnull=True),
+                name="unique_unread_notification",
+            ),
+        ]
+        indexes = [
+            # The list, newest first, keyset-paginated on (updated_at, id).
+            models.Index(fields=["recipient", "-updated_at", "-id"], name="notification_list_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} x{self.actor_count} for {self.recipient_id}"
@@ -0,0 +1,82 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from core import background, testing
+from core.testing import Endpoint
+from posts.models import Post
+from . import delivery
+from .delivery import Event
+from .models import Notification
+
+
+class NotificationQueryBudgetTests(testing.QueryBudgetTestCase):
+    endpoints = [
+        Endpoint("GET", "/notifications/"),
+        Endpoint("GET", "/notifications/unread/"),
+        Endpoint("POST", "/notifications/read/", {}),
+    ]
+
+
+class DeliveryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user("owner")
+        self.fans = [User.objects.create_user(f"fan{index}") for index in range(3)]
+        self.post = Post.objects.create(user=self.owner, content="Hello")
+
+    def like(self, fan):
+        with self.captureOnCommitCallbacks(execute=True):
+            testing.client(fan).post(f"/likes/post/{self.post.id}/")
+
+    @override_settings(NOTIFICATION_FLUSH_SIZE=3)
+    def test_events_are_buffered_and_flushed_as_one_batch(self):
+        with mock.patch.object(background, "running", return_value=True):
+            self.like(self.fans[0])
+            self.like(self.fans[1])
+            self.assertFalse(delivery._due())
+            self.like(self.fans[2])
+        self.assertFalse(Notification.objects.exists())
+        self.assertTrue(delivery._due())
+
+        with self.assertNumQueries(6):
+            self.assertEqual(delivery.flush(), 3)
+        notification = Notification.objects.get()
+        self.assertEqual((notification.actor_count, notification.actor_id), (3, self.fans[2].id))
+        self.assertFalse(delivery._due())
+
+    def test_unread_grows_by_the_rows_inserted(self):
+        self.assertEqual(delivery.unread_count(self.owner.id), 0)
+        create = Notification.objects.bulk_create
+
+        def concurrent(rows, **kwargs):
+            # Another delivery commits the same unread notification first.
+            Notification.objects.create(
+                recipient=self.owner, kind=rows[0].kind, key=rows[0].key, post=self.post,
+                actor=self.fans[1], updated_at=rows[0].updated_at - timedelta(seconds=1),
+            )
+            cache.incr(delivery._unread_key(self.owner.id))
+            return create(rows, **kwargs)
+
+        with mock.patch.object(Notification.objects, "bulk_create", side_effect=concurrent):
+            delivery.deliver([
+                Event(self.owner.id, Notification.POST_LIKE, self.fans[0].id, self.post.id),
+                Event(self.owner.id, Notification.COMMENT, self.fans[0].id, self.post.id),
+            ])
+        self.assertEqual(Notification.objects.count(), 2)
+        self.assertEqual(delivery.unread_count(self.owner.id), 2)
+
+    def test_deleted_posts_stop_counting(self):
+        self.like(self.fans[0])
+        self.assertEqual(delivery.unread_count(self.owner.id), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            testing.client(self.owner).delete(f"/posts/{self.post.id}/")
+        self.assertEqual(delivery.unread_count(self.owner.id), 0)
+        self.assertEqual(testing.client(self.owner).get("/notifications/").data["results"], [])
+
+        delivery.deliver([Event(self.owner.id, Notification.POST_LIKE, self.fans[1].id, self.post.id)])
+        self.assertEqual(Notification.objects.count(), 1)
@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import MarkReadView, NotificationListView, UnreadCountView
+
+urlpatterns = [
+    path("", NotificationListView.as_view()),
+    path("unread/", UnreadCountView.as_view()),
+    path("read/", MarkReadView.as_view()),
+]
@@ -0,0 +1,114 @@
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+
+from .delivery import mark_read, unread_count
+from .models import Notification
+
+MESSAGES = {
+    Notification.REPLY: "replied to your comment",
+    Notification.COMMENT: "commented on your post",
+    Notification.POST_LIKE: "liked your post",
+    Notification.COMMENT_LIKE: "liked your comment",
+}
+
+
+def encode_cursor(notification):
+    raw = f"{notification.updated_at.isoformat()},{notification.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(value):
+    try:
+        stamp, _, pk = base64.urlsafe_b64decode(value.encode()).decode().rpartition(",")
+        return datetime.fromisoformat(stamp), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def message(notification):
+    actor = notification.actor.username if notification.actor else "Someone"
+    others = notification.actor_count - 1
+    if others > 0:
+        actor += f" and {others} other{'s' if others > 1 else ''}"
+    return f"{actor} {MESSAGES.get(notification.kind, notification.kind)}"
+
+
+class NotificationListView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            limit = int(request.query_params.get("limit", settings.NOTIFICATION_PAGE_SIZE))
+        except ValueError:
+            return Response({"error": "limit must be an integer"}, status=400)
+        limit = max(1, min(limit, settings.NOTIFICATION_MAX_PAGE_SIZE))
+
+        rows = (
+            Notification.objects
+            .filter(recipient=request.user, post__deleted_at__isnull=True)
+            .select_related("actor")
+            .order_by("-updated_at", "-id")
+        )
+        before = request.query_params.get("before")
+        if before:
+            cursor = decode_cursor(before)
+            if cursor is None:
+                return Response({"error": "Invalid cursor"}, status=400)
+            # Keyset: rows strictly after the cursor in list order, so a page
+            # costs the same however deep it is.
+            updated_at, pk = cursor
+            rows = rows.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=pk))
+
+        page = list(rows[:limit + 1])
+        more = len(page) > limit
+        page = page[:limit]
+
+        return Response({
+            "results": [
+                {
+                    "id": notification.id,
+                    "kind": notification.kind,
+                    "message": message(notification),
+                    "actor": notification.actor.username if notification.actor else None,
+                    "actor_count": notification.actor_count,
+                    "post_id": notification.post_id,
+                    "comment_id": notification.comment_id,
+                    "read": notification.read_at is not None,
+                    "updated_at": notification.updated_at,
+                }
+                for notification in page
+            ],
+            "next": encode_cursor(page[-1]) if more else None,
+        })
+
+
+class UnreadCountView(APIView):
+    # Trust the token's user id instead of loading the user, so a cached
+    # count is served without touching the database.
+    authentication_classes = [JWTStatelessUserAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread": unread_count(int(request.user.id))})
+
+
+class MarkReadView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        ids = request.data.get("ids")
+        if ids is not None and (
+            not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids)
+        ):
+            return Response({"error": "ids must be a list of integers"}, status=400)
+
+        marked = mark_read(request.user.id, ids)
+        return Response({"marked": marked})
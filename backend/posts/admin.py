@@ -1,4 +1,32 @@
 from django.contrib import admin
+from django.utils.text import Truncator
+
+from core import reaper
+from core.admin import DeletedFilter, ScalableAdmin
 from .models import Post
 
-admin.site.register(Post)
+
+@admin.register(Post)
+class PostAdmin(ScalableAdmin):
+    list_display = ("id", "user", "excerpt", "created_at", "deleted_at")
+    list_select_related = ("user",)
+    list_filter = (DeletedFilter,)
+    search_fields = ("id", "user__username")
+    raw_id_fields = ("user",)
+    readonly_fields = ("image_width", "image_height", "image_placeholder", "created_at", "deleted_at")
+    actions = ("hide",)
+
+    @admin.display(description="content")
+    def excerpt(self, post):
+        return Truncator(post.content).chars(80)
+
+    def has_delete_permission(self, request, obj=None):
+        # Deleting here would cascade through every comment and like in one
+        # request; hiding leaves that to reap_deleted, as the API does.
+        return False
+
+    @admin.action(description="Hide selected posts", permissions=["change"])
+    def hide(self, request, queryset):
+        ids = list(queryset.filter(deleted_at__isnull=True).values_list("id", flat=True))
+        reaper.hide_posts(ids)
+        self.message_user(request, f"Hid {len(ids)} posts.")
@@ -0,0 +1,179 @@
+# Responsive variants of post images, made with Pillow when a post is created.
+#
+# ``generate`` is pure: it decodes the upload once, resizes it down through
+# POST_IMAGE_WIDTHS (largest first, each step from the previous one) and
+# encodes every width in every POST_IMAGE_FORMATS format the local Pillow
+# supports, plus a tiny blurred placeholder. ``upload`` writes the result
+# through Django's default storage, which is the local filesystem when
+# Cloudinary isn't configured, before the post's transaction starts;
+# ``record`` adds the rows inside it.
+import base64
+import io
+import uuid
+from typing import List, NamedTuple
+
+from cloudinary import uploader
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageFilter, ImageOps, UnidentifiedImageError, features
+
+from .models import PostImageVariant
+
+MIME_TYPES = {"webp": "image/webp", "avif": "image/avif"}
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+class Variant(NamedTuple):
+    format: str
+    width: int
+    height: int
+    data: bytes
+
+
+class Processed(NamedTuple):
+    width: int
+    height: int
+    placeholder: str
+    variants: List[Variant]
+
+
+def formats():
+    """Configured formats this Pillow build can encode, best first."""
+    return [name for name in settings.POST_IMAGE_FORMATS if features.check(name)]
+
+
+def _encode(image, name):
+    out = io.BytesIO()
+    image.save(out, format=name.upper(), **settings.POST_IMAGE_ENCODER_OPTIONS.get(name, {}))
+    return out.getvalue()
+
+
+def _open(upload):
+    try:
+        image = Image.open(upload)
+        if image.width * image.height > settings.POST_IMAGE_MAX_PIXELS:
+            raise InvalidImage("Image is too large")
+        # Let JPEG decode at a reduced scale when even the biggest variant
+        # is much smaller than the original.
+        widest = max(settings.POST_IMAGE_WIDTHS)
+        image.draft("RGB", (widest, round(image.height * widest / image.width)))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        raise InvalidImage("Invalid image") from exc
+    return image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+
+def generate(upload):
+    """Decode ``upload`` (a file object) and build every variant in memory.
+
+    Raises ``InvalidImage`` for anything Pillow can't read or that exceeds
+    POST_IMAGE_MAX_PIXELS.
+    """
+    image = _open(upload)
+    width, height = image.size
+    names = formats()
+
+    # Widths the original can fill; a small original still gets one
+    # variant at its own size so every post has a modern encoding.
+    targets = {target for target in settings.POST_IMAGE_WIDTHS if target < width}
+    targets.add(min(width, max(settings.POST_IMAGE_WIDTHS)))
+    variants = []
+    current = image
+    for target in sorted(targets, reverse=True):
+        if target != current.width:
+            current = current.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+        for name in names:
+            variants.append(Variant(name, current.width, current.height, _encode(current, name)))
+
+    placeholder = ""
+    if features.check("webp"):
+        tiny_width = settings.POST_IMAGE_PLACEHOLDER_WIDTH
+        tiny = current.resize((tiny_width, max(1, round(height * tiny_width / width))), Image.BILINEAR)
+        data = _encode(tiny.filter(ImageFilter.GaussianBlur(1)), "webp")
+        placeholder = "data:image/webp;base64," + base64.b64encode(data).decode()
+    return Processed(width, height, placeholder, variants)
+
+
+class Stored(NamedTuple):
+    variant: Variant
+    name: str
+
+
+def upload(processed):
+    """Write every variant of ``processed`` to storage and return where.
+
+    Call before the transaction that records them (``record``), so no
+    upload holds it open; if that transaction fails, ``delete_files`` the
+    result.
+    """
+    stem = uuid.uuid4().hex[:12]
+    stored = []
+    try:
+        for variant in processed.variants:
+            name = default_storage.save(
+                f"post-variants/{stem}-{variant.width}.{variant.format}", ContentFile(variant.data)
+            )
+            stored.append(Stored(variant, name))
+    except Exception:
+        delete_files(stored)
+        raise
+    return stored
+
+
+def record(post, processed, stored):
+    """Create the variant rows for files ``upload`` wrote and set the
+    post's image size and placeholder. Call inside the post's transaction."""
+    PostImageVariant.objects.bulk_create(
+        PostImageVariant(
+            post=post, format=variant.format, width=variant.width, height=variant.height,
+            file=name, bytes=len(variant.data),
+        )
+        for variant, name in stored
+    )
+    post.image_width = processed.width
+    post.image_height = processed.height
+    post.image_placeholder = processed.placeholder
+    post.save(update_fields=["image_width", "image_height", "image_placeholder"])
+
+
+def delete_files(stored):
+    for _, name in stored:
+        default_storage.delete(name)
+
+
+def discard(post_ids):
+    """Delete the variant rows of ``post_ids``, and their files once the
+    transaction commits."""
+    variants = PostImageVariant.objects.filter(post_id__in=post_ids)
+    names = list(variants.values_list("file", flat=True))
+    variants.delete()
+
+    def delete():
+        for name in names:
+            default_storage.delete(name)
+
+    transaction.on_commit(delete)
+
+
+def discard_original(image):
+    """Delete a post's uploaded original (a CloudinaryResource) from
+    Cloudinary once the transaction commits."""
+    public_id = image.public_id
+    transaction.on_commit(lambda: uploader.destroy(public_id), robust=True)
+
+
+def srcset(post):
+    """``[{"url", "width", "type"}, ...]``, best format first, narrowest first
+    within a format. Uses prefetched ``image_variants`` when present."""
+    order = {name: index for index, name in enumerate(settings.POST_IMAGE_FORMATS)}
+    variants = sorted(post.image_variants.all(), key=lambda v: (order.get(v.format, len(order)), v.width))
+    return [
+        {"url": variant.file.url, "width": variant.width, "type": MIME_TYPES.get(variant.format, "")}
+        for variant in variants
+    ]
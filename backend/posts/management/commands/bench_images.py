@@ -0,0 +1,101 @@
+import io
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageDraw
+
+from posts import images
+
+# (label, CSS width, device pixel ratio) of the clients the feed serves.
+CLIENTS = (("phone 1x", 400, 1), ("phone 2x", 400, 2), ("desktop", 680, 1), ("desktop 2x", 680, 2))
+
+
+def photo(width, height, quality):
+    """A JPEG with gradients, shapes and sensor-like noise, so it compresses
+    roughly like a phone photo rather than a flat test card."""
+    gradients = [Image.linear_gradient("L").rotate(angle).resize((width, height)) for angle in (0, 90, 45)]
+    image = Image.merge("RGB", gradients)
+    draw = ImageDraw.Draw(image)
+    for _ in range(40):
+        x, y = random.randrange(width), random.randrange(height)
+        size = random.randint(width // 20, width // 4)
+        color = tuple(random.randrange(256) for _ in range(3))
+        draw.ellipse((x, y, x + size, y + size), fill=color)
+    noise = Image.effect_noise((width, height), 24).convert("RGB")
+    image = Image.blend(image, noise, 0.15)
+    out = io.BytesIO()
+    image.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+def pick(variants, pixels, preferred):
+    """What a browser takes from the srcset: the narrowest variant at least
+    ``pixels`` wide (else the widest), in the best format it has."""
+    candidates = [v for v in variants if v.format == preferred]
+    wide_enough = [v for v in candidates if v.width >= pixels]
+    return min(wide_enough, key=lambda v: v.width) if wide_enough else max(candidates, key=lambda v: v.width)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate responsive variants for a feed page of synthetic phone "
+        "photos and report processing time and the bytes each kind of "
+        "client downloads compared with the original uploads. Needs no database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=10, help="Images per feed page.")
+        parser.add_argument("--width", type=int, default=3024)
+        parser.add_argument("--height", type=int, default=4032)
+        parser.add_argument("--quality", type=int, default=90, help="JPEG quality of the uploads.")
+
+    def handle(self, *args, **options):
+        random.seed(42)
+        formats = images.formats()
+        self.stdout.write(
+            f"{options['count']} uploads of {options['width']}x{options['height']} JPEG q{options['quality']}; "
+            f"formats {', '.join(formats)}; widths {', '.join(map(str, settings.POST_IMAGE_WIDTHS))}"
+        )
+        uploads = [photo(options["width"], options["height"], options["quality"]) for _ in range(options["count"])]
+
+        timings = []
+        results = []
+        for upload in uploads:
+            started = time.perf_counter()
+            results.append(images.generate(io.BytesIO(upload)))
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(
+            f"processing per image: median {statistics.median(timings) * 1000:.0f}ms, "
+            f"max {max(timings) * 1000:.0f}ms, page total {sum(timings):.2f}s"
+        )
+
+        # Where the time goes on one image, resizing step by step like generate().
+        started = time.perf_counter()
+        resized = images._open(io.BytesIO(uploads[0]))
+        self.stdout.write(f"  decode {(time.perf_counter() - started) * 1000:6.1f}ms")
+        for width in sorted(settings.POST_IMAGE_WIDTHS, reverse=True):
+            started = time.perf_counter()
+            resized = resized.resize((width, round(resized.height * width / resized.width)), Image.LANCZOS)
+            resize = time.perf_counter() - started
+            encodes = []
+            for name in formats:
+                started = time.perf_counter()
+                data = images._encode(resized, name)
+                encodes.append(f"{name} {(time.perf_counter() - started) * 1000:6.1f}ms {len(data) / 1024:6.1f}KB")
+            self.stdout.write(f"  {width:>5}w  resize {resize * 1000:6.1f}ms  " + "  ".join(encodes))
+
+        original = sum(len(upload) for upload in uploads)
+        placeholders = sum(len(result.placeholder) for result in results)
+        self.stdout.write(
+            f"bytes per feed page: originals {original / 1024:.0f}KB, "
+            f"placeholders {placeholders / 1024:.1f}KB inline"
+        )
+        for name in formats:
+            for label, css, dpr in CLIENTS:
+                served = sum(len(pick(result.variants, css * dpr, name).data) for result in results)
+                self.stdout.write(
+                    f"  {name:<5} {label:<11} {served / 1024:8.0f}KB  saves {(1 - served / original) * 100:5.1f}%"
+                )
@@ -0,0 +1,43 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("posts", "0006_soft_delete"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="image_height",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="image_placeholder",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="image_width",
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="PostImageVariant",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("format", models.CharField(max_length=8)),
+                ("width", models.PositiveIntegerField()),
+                ("height", models.PositiveIntegerField()),
+                ("file", models.FileField(max_length=255, upload_to="post-variants/")),
+                ("bytes", models.PositiveIntegerField()),
+                ("post", models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name="image_variants", to="posts.post")),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="postimagevariant",
+            constraint=models.UniqueConstraint(fields=("post", "format", "width"), name="unique_post_image_variant"),
+        ),
+    ]
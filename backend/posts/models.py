@@ -6,9 +6,46 @@ class Post(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="posts")
     content = models.TextField(blank=True)
     image = CloudinaryField('image', null=True, blank=True)
+    # Filled from the upload by posts.images: the original's size and a
+    # tiny blurred data: URI to show while a variant loads.
+    image_width = models.PositiveIntegerField(null=True, blank=True)
+    image_height = models.PositiveIntegerField(null=True, blank=True)
+    image_placeholder = models.TextField(blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
+    # Set by DELETE; the row and everything under it is removed later by
+    # reap_deleted in small batches.
+    deleted_at = models.DateTimeField(null=True, blank=True)
 
-
+    class Meta:
+        indexes = [
+            # The feed: newest first.
+            models.Index(fields=["-created_at"], name="post_created_idx"),
+            # Only deleted rows, for the reaper.
+            models.Index(
+                fields=["deleted_at"],
+                condition=models.Q(deleted_at__isnull=False),
+                name="post_deleted_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"Post {self.id} by {self.user.username}"
+
+
+class PostImageVariant(models.Model):
+    """A resized, re-encoded copy of a post's image, generated at upload."""
+
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="image_variants")
+    format = models.CharField(max_length=8)  # webp / avif
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    file = models.FileField(upload_to="post-variants/", max_length=255)
+    bytes = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["post", "format", "width"], name="unique_post_image_variant"),
+        ]
+
+    def __str__(self):
+        return f"{self.format} {self.width}w of post {self.post_id}"
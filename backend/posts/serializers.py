@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from cloudinary.utils import cloudinary_url
+from . import images
 from .models import Post
 
 
@@ -7,10 +8,18 @@ class PostSerializer(serializers.ModelSerializer):
     user = serializers.CharField(source="user.username", read_only=True)
     created_at = serializers.SerializerMethodField()
     like_count = serializers.IntegerField(read_only=True)
+    # Approximate distinct viewers (impressions app), refreshed as
+    # impressions are flushed.
+    view_count = serializers.IntegerField(read_only=True)
     comment_count = serializers.IntegerField(read_only=True)
 
     # ⭐ IMPORTANT
     image = serializers.SerializerMethodField()
+    # Resized WebP/AVIF copies for <img srcset>, and what to show meanwhile.
+    srcset = serializers.SerializerMethodField()
+    placeholder = serializers.CharField(source="image_placeholder", read_only=True)
+    width = serializers.IntegerField(source="image_width", read_only=True)
+    height = serializers.IntegerField(source="image_height", read_only=True)
 
     class Meta:
         model = Post
@@ -19,8 +28,13 @@ class PostSerializer(serializers.ModelSerializer):
             "user",
             "content",
             "image",
+            "srcset",
+            "placeholder",
+            "width",
+            "height",
             "created_at",
             "like_count",
+            "view_count",
             "comment_count",
         ]
 
@@ -39,3 +53,8 @@ class PostSerializer(serializers.ModelSerializer):
             return url
         except Exception:
             return None
+
+    def get_srcset(self, obj):
+        if not obj.image:
+            return []
+        return images.srcset(obj)
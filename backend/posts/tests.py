@@ -1,3 +1,143 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from cloudinary.models import CloudinaryField
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from core import testing
+from core.testing import Endpoint
+from notifications import delivery
+from sync.models import Change
+from .models import Post, PostImageVariant
+
+
+class PostQueryBudgetTests(testing.QueryBudgetTestCase):
+    endpoints = [
+        Endpoint("GET", "/posts/"),
+        Endpoint("GET", "/posts/?limit=50"),
+        Endpoint("GET", "/posts/", anonymous=True),
+        Endpoint("POST", "/posts/", {"content": "Another post"}),
+        Endpoint("DELETE", "/posts/{spare}/"),
+        Endpoint("DELETE", "/posts/{photo}/image/"),
+        Endpoint("GET", "/admin/posts/post/", user="admin", scales=True),
+        Endpoint("GET", "/admin/posts/post/?q={username}&deleted=no", user="admin", scales=True),
+    ]
+
+
+class ImageUploadTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        settings_override = override_settings(MEDIA_ROOT=self.media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user("author")
+
+    def create(self):
+        out = io.BytesIO()
+        Image.new("RGB", (900, 600), "teal").save(out, "JPEG")
+        upload = SimpleUploadedFile("photo.jpg", out.getvalue(), content_type="image/jpeg")
+        return testing.client(self.user).post("/posts/", {"content": "Photo", "image": upload}, format="multipart")
+
+    def stored_files(self):
+        return [name for _, _, names in os.walk(self.media) for name in names]
+
+    def test_variants_upload_before_the_transaction(self):
+        depth = len(connection.atomic_blocks)
+        save = default_storage.save
+        depths = []
+
+        def tracked(name, content, **kwargs):
+            depths.append(len(connection.atomic_blocks))
+            return save(name, content, **kwargs)
+
+        with mock.patch.object(CloudinaryField, "pre_save", return_value="image/upload/v1/photo.jpg"), \
+                mock.patch.object(default_storage, "save", side_effect=tracked):
+            response = self.create()
+
+        self.assertEqual(response.status_code, 201)
+        variants = PostImageVariant.objects.filter(post_id=response.data["id"])
+        self.assertEqual(variants.count(), len(depths))
+        self.assertTrue(depths)
+        self.assertEqual(set(depths), {depth})
+        self.assertEqual(sorted(self.stored_files()), sorted(os.path.basename(v.file.name) for v in variants))
+
+    def test_failed_post_leaves_no_files(self):
+        # The original's upload fails inside the transaction, after the
+        # variants were written.
+        failing = mock.patch.object(CloudinaryField, "pre_save", side_effect=ValueError("upload failed"))
+        with failing, self.assertRaises(ValueError):
+            self.create()
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(PostImageVariant.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_deleting_the_image_removes_the_original_after_commit(self):
+        with mock.patch.object(CloudinaryField, "pre_save", return_value="image/upload/v1/photo.jpg"):
+            post_id = self.create().data["id"]
+        self.assertTrue(self.stored_files())
+
+        with mock.patch("cloudinary.uploader.destroy") as destroy:
+            with self.captureOnCommitCallbacks() as callbacks:
+                response = testing.client(self.user).delete(f"/posts/{post_id}/image/")
+            self.assertEqual(response.status_code, 204)
+            destroy.assert_not_called()
+            for callback in callbacks:
+                callback()
+        destroy.assert_called_once_with("photo")
+        post = Post.objects.get(id=post_id)
+        self.assertFalse(post.image)
+        self.assertFalse(PostImageVariant.objects.filter(post_id=post_id).exists())
+        self.assertEqual(self.stored_files(), [])
+
+
+class AdminHideTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("author")
+        self.posts = [Post.objects.create(user=self.user, content=f"Post {index}") for index in range(3)]
+        self.client.force_login(User.objects.create_superuser("admin"))
+
+    def test_hide_soft_deletes_and_leaves_the_rows(self):
+        self.assertEqual(len(testing.client().get("/posts/").data), 3)
+        hidden = [self.posts[0].id, self.posts[2].id]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/admin/posts/post/", {"action": "hide", "_selected_action": hidden})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(
+            sorted(Post.objects.filter(deleted_at__isnull=False).values_list("id", flat=True)), hidden
+        )
+        self.assertEqual([post["id"] for post in testing.client().get("/posts/").data], [self.posts[1].id])
+        self.assertEqual(
+            sorted(Change.objects.filter(kind=Change.POST, deleted=True).values_list("object_id", flat=True)), hidden
+        )
+
+    def test_hidden_posts_leave_the_unread_count(self):
+        fan = User.objects.create_user("fan")
+        with self.captureOnCommitCallbacks(execute=True):
+            testing.client(fan).post(f"/likes/post/{self.posts[0].id}/")
+        self.assertEqual(delivery.unread_count(self.user.id), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/admin/posts/post/", {"action": "hide", "_selected_action": [self.posts[0].id]})
+        self.assertEqual(delivery.unread_count(self.user.id), 0)
+
+    def test_delete_is_not_offered(self):
+        response = self.client.post(
+            "/admin/posts/post/", {"action": "delete_selected", "_selected_action": [self.posts[0].id]}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(self.client.get(f"/admin/posts/post/{self.posts[0].id}/delete/").status_code, 403)
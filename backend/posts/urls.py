@@ -1,7 +1,8 @@
 from django.urls import path
-from .views import PostListCreateView, PostImageDeleteView
+from .views import PostListCreateView, PostDetailView, PostImageDeleteView
 
 urlpatterns = [
     path("", PostListCreateView.as_view(), name="post-list-create"),
+    path("<int:post_id>/", PostDetailView.as_view(), name="post-detail"),
     path("<int:post_id>/image/", PostImageDeleteView.as_view(), name="post-image-delete"),
 ]
@@ -1,11 +1,51 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from . import images
 from .models import Post
 from .serializers import PostSerializer
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Count, Q
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db import transaction
 from django.shortcuts import get_object_or_404
+from accounts import stats
+from core import reaper
+from comments.models import Comment
+from impressions.models import ViewSketch
+from counters import sharded
+from backend.response_cache import cached_get, invalidate
+from sync import log
+from sync.models import Change
+
+def with_counts(posts):
+    """Evaluate ``posts`` with everything PostSerializer needs, including
+    ``comment_count``, ``like_count`` and ``view_count``."""
+    # A correlated count instead of JOIN + GROUP BY lets the database
+    # walk post_created_idx and stop after the first page of posts.
+    comment_count = (
+        Comment.objects
+        .filter(post=OuterRef("pk"), parent__isnull=True, deleted_at__isnull=True)
+        .values("post")
+        .annotate(total=Count("*"))
+        .values("total")
+    )
+    view_count = ViewSketch.objects.filter(post=OuterRef("pk"), day__isnull=True).values("estimate")
+    posts = list(
+        posts
+        .select_related("user")
+        .prefetch_related("image_variants")
+        .annotate(
+            comment_count=Coalesce(Subquery(comment_count), 0),
+            view_count=Coalesce(Subquery(view_count), 0),
+        )
+    )
+    # Like totals come from the sharded counters instead of a COUNT over likes.
+    like_counts = sharded.get_counts(sharded.POST_LIKES, [post.id for post in posts])
+    for post in posts:
+        post.like_count = like_counts[post.id]
+    return posts
+
 
 class PostListCreateView(APIView):
     permission_classes = [IsAuthenticated]
@@ -15,6 +55,7 @@ class PostListCreateView(APIView):
             return []
         return super().get_permissions()
 
+    @cached_get("feed", params=("limit",))
     def get(self, request):
         limit = request.query_params.get("limit", "10")
         try:
@@ -22,14 +63,8 @@ class PostListCreateView(APIView):
         except ValueError:
             limit = 10
 
-        posts = (
-            Post.objects
-            .select_related("user")
-            .annotate(
-                like_count=Count("likes", distinct=True),
-                comment_count=Count("comments", filter=Q(comments__parent__isnull=True), distinct=True),
-            )
-            .order_by("-created_at")[:limit]
+        posts = with_counts(
+            Post.objects.filter(deleted_at__isnull=True).order_by("-created_at")[:limit]
         )
         serializer = PostSerializer(posts, many=True)
         return Response(serializer.data)
@@ -44,21 +79,62 @@ class PostListCreateView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        post = Post.objects.create(user=request.user, content=content, image=image)
+        processed = None
+        if image:
+            try:
+                processed = images.generate(image)
+            except images.InvalidImage as exc:
+                return Response({"error": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+            image.seek(0)
+
+        # Variant uploads happen before the transaction; only their rows
+        # are written inside it.
+        stored = images.upload(processed) if processed else []
+        try:
+            with transaction.atomic():
+                post = Post.objects.create(user=request.user, content=content, image=image)
+                if processed:
+                    images.record(post, processed, stored)
+                stats.bump(request.user.id, posts=1)
+                invalidate("feed")
+                log.record(Change.POST, post.id, post.id)
+        except Exception:
+            images.delete_files(stored)
+            raise
         serializer = PostSerializer(post)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+class PostDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def delete(self, request, post_id):
+        # Hide now; reap_deleted removes the post, its comments, likes and
+        # karma in small batches later.
+        post = get_object_or_404(Post, id=post_id, deleted_at__isnull=True)
+        if post.user != request.user:
+            return Response({"error": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
+
+        reaper.hide_posts([post.id])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class PostImageDeleteView(APIView):
     permission_classes = [IsAuthenticated]
 
     def delete(self, request, post_id):
-        post = get_object_or_404(Post, id=post_id)
+        post = get_object_or_404(Post, id=post_id, deleted_at__isnull=True)
         if post.user != request.user:
             return Response({"error": "Forbidden"}, status=status.HTTP_403_FORBIDDEN)
 
         if post.image:
-            post.image.delete(save=False)
-            post.image = None
-            post.save(update_fields=["image"])
+            with transaction.atomic():
+                images.discard_original(post.image)
+                images.discard([post.id])
+                post.image = None
+                post.image_width = post.image_height = None
+                post.image_placeholder = ""
+                post.save(update_fields=["image", "image_width", "image_height", "image_placeholder"])
+                invalidate("feed")
+                log.record(Change.POST, post.id, post.id)
         return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,115 @@
+# The change log behind GET /sync/.
+#
+# Write paths call ``record`` inside their transaction, after the write
+# itself, so a rolled back write leaves no entry. Row ids are handed out at
+# insert, not at commit, so two overlapping transactions can commit out of
+# id order and a client paging by id could jump over the slower one.
+# Clients page by ``seq`` instead: ``sequence`` numbers committed changes,
+# one batch at a time under the Horizon row's lock, so anything it numbers
+# later sorts after everything already served. A flusher thread
+# (core.background) does that every BACKGROUND_FLUSH_INTERVAL seconds;
+# without one, reads sequence first.
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from core import background
+from .models import Change, Horizon
+
+
+def record(kind, object_id, post_id, deleted=False):
+    Change.objects.create(kind=kind, object_id=object_id, post_id=post_id, deleted=deleted)
+
+
+def sequence(batch_size=5000):
+    """Give every committed change without a ``seq`` the next numbers, in
+    id order; returns how many were numbered."""
+    total = 0
+    while True:
+        with transaction.atomic():
+            state, _ = Horizon.objects.select_for_update().get_or_create(pk=1)
+            ids = list(
+                Change.objects.filter(seq__isnull=True).order_by("id").values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                return total
+            # As in comments.closure: bulk_update's CASE per row costs more
+            # than the numbering itself.
+            table = connection.ops.quote_name(Change._meta.db_table)
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"UPDATE {table} SET seq = %s WHERE id = %s",
+                    [(state.sequenced + offset, change_id) for offset, change_id in enumerate(ids, start=1)],
+                )
+            state.sequenced += len(ids)
+            state.save(update_fields=["sequenced"])
+        total += len(ids)
+
+
+def head():
+    """The newest sequenced position: the token to start syncing from."""
+    if not background.running():
+        sequence()
+    return Horizon.objects.filter(pk=1).values_list("sequenced", flat=True).first() or 0
+
+
+def horizon():
+    return Horizon.objects.filter(pk=1).values_list("pruned_through", flat=True).first() or 0
+
+
+def page(since, limit, post_id=None):
+    """``(changes, more)``: up to ``limit`` changes after position
+    ``since``, in sequence order."""
+    if not background.running():
+        sequence()
+    changes = Change.objects.filter(seq__gt=since)
+    if post_id is not None:
+        changes = changes.filter(post_id=post_id)
+    rows = list(changes.order_by("seq")[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def _advance(through):
+    with transaction.atomic():
+        horizon, _ = Horizon.objects.select_for_update().get_or_create(pk=1)
+        if through > horizon.pruned_through:
+            horizon.pruned_through = through
+            horizon.save(update_fields=["pruned_through"])
+
+
+def prune(days=None, batch_size=5000):
+    """Delete changes older than ``days`` (default SYNC_RETENTION_DAYS) in
+    batches and move the horizon past them; returns how many went."""
+    cutoff = now() - timedelta(days=settings.SYNC_RETENTION_DAYS if days is None else days)
+    sequence()
+    total = 0
+    while True:
+        rows = list(
+            Change.objects.filter(created_at__lt=cutoff, seq__isnull=False)
+            .order_by("seq").values_list("id", "seq")[:batch_size]
+        )
+        if not rows:
+            return total
+        # Horizon first: a client racing the delete gets a 410 rather than a
+        # page with a hole in it.
+        _advance(rows[-1][1])
+        Change.objects.filter(id__in=[change_id for change_id, _ in rows]).delete()
+        total += len(rows)
+
+
+def expire():
+    """Invalidate every token handed out so far, e.g. after an import
+    replaced the data wholesale."""
+    sequence()
+    with transaction.atomic():
+        state, _ = Horizon.objects.select_for_update().get_or_create(pk=1)
+        # Skip a number so even a token equal to the current head is older
+        # than the horizon, while the new head is not.
+        state.sequenced += 1
+        state.pruned_through = state.sequenced
+        state.save(update_fields=["sequenced", "pruned_through"])
+
+
+background.register(sequence)
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from sync.log import prune
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete sync change log entries older than --days. Clients whose "
+        "token is older get a 410 from /sync/ and reload in full."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=float, default=settings.SYNC_RETENTION_DAYS)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        removed = prune(days=options["days"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Pruned {removed} changes."))
@@ -0,0 +1,45 @@
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def number_existing(apps, schema_editor):
+    # Everything already logged has committed, so id order is commit order.
+    Change = apps.get_model("sync", "Change")
+    Horizon = apps.get_model("sync", "Horizon")
+    Change.objects.update(seq=models.F("id"))
+    last = Change.objects.aggregate(last=Max("id"))["last"]
+    if last is not None:
+        Horizon.objects.update_or_create(pk=1, defaults={"sequenced": last})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("sync", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="change",
+            name="change_post_idx",
+        ),
+        migrations.AddField(
+            model_name="change",
+            name="seq",
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name="horizon",
+            name="sequenced",
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(number_existing, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(fields=["post_id", "seq"], name="change_post_seq_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="change",
+            index=models.Index(condition=models.Q(("seq__isnull", True)), fields=["id"], name="change_unsequenced_idx"),
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import models
+
+
+class Change(models.Model):
+    """One entry in the change log read by GET /sync/.
+
+    ``seq`` is the position clients sync from, given by ``log.sequence``
+    once the row has committed (null until then). Rows only say *what*
+    changed; the current state is read when the change is served, so
+    repeated changes to one object cost a client nothing extra.
+    """
+
+    POST = "post"
+    COMMENT = "comment"
+    # Counters only: like and comment counts of a post, like count of a comment.
+    POST_COUNTS = "post_counts"
+    COMMENT_COUNTS = "comment_counts"
+
+    kind = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    # Not a foreign key: the log outlives the posts the reaper removes.
+    post_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    seq = models.BigIntegerField(null=True, blank=True, unique=True)
+
+    class Meta:
+        indexes = [
+            # ?post=<id>: one post's changes in sequence order.
+            models.Index(fields=["post_id", "seq"], name="change_post_seq_idx"),
+            # The rows log.sequence has yet to number.
+            models.Index(fields=["id"], condition=models.Q(seq__isnull=True), name="change_unsequenced_idx"),
+        ]
+
+
+class Horizon(models.Model):
+    """A single row: every change up to ``pruned_through`` may be gone, so
+    older tokens need a full resync. ``sequenced`` is the last ``seq``
+    handed out; ``log.sequence`` holds this row's lock while numbering."""
+
+    pruned_through = models.BigIntegerField(default=0)
+    sequenced = models.BigIntegerField(default=0)
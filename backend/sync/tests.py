@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils.timezone import now
+
+from core import testing
+from core.testing import Endpoint, client
+from posts.models import Post
+from . import log
+from .models import Change, Horizon
+
+
+class SyncQueryBudgetTests(testing.QueryBudgetTestCase):
+    endpoints = [
+        Endpoint("GET", "/sync/"),
+        Endpoint("GET", "/sync/?since={since}", scales=True),
+        Endpoint("GET", "/sync/?since={since}&post={post}", scales=True),
+        Endpoint("GET", "/sync/?since={since}&limit=5"),
+    ]
+
+
+class SyncLogTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("author")
+        self.posts = [Post.objects.create(user=self.user, content=f"Post {index}") for index in range(3)]
+
+    def change(self, post, **fields):
+        return Change.objects.create(kind=Change.POST, object_id=post.id, post_id=post.id, **fields)
+
+    def sync(self, since, **params):
+        query = "".join(f"&{name}={value}" for name, value in params.items())
+        return client().get(f"/sync/?since={since}{query}")
+
+    def test_sequence_numbers_in_id_order(self):
+        changes = [self.change(post) for post in self.posts]
+        self.assertEqual(log.sequence(batch_size=2), 3)
+        self.assertEqual(log.sequence(), 0)
+        self.assertEqual([Change.objects.get(id=change.id).seq for change in changes], [1, 2, 3])
+        self.assertEqual(Horizon.objects.get().sequenced, 3)
+
+        later = self.change(self.posts[0])
+        log.sequence()
+        later.refresh_from_db()
+        self.assertEqual(later.seq, 4)
+
+    def test_late_commit_with_a_lower_id_is_not_skipped(self):
+        self.change(self.posts[0], id=100)
+        token = client().get("/sync/").data["token"]
+        # A transaction that took its id earlier but committed after the
+        # token was handed out.
+        self.change(self.posts[1], id=50)
+
+        response = self.sync(token)
+        self.assertEqual([post["id"] for post in response.data["posts"]], [self.posts[1].id])
+        self.assertGreater(int(response.data["token"]), int(token))
+        self.assertEqual(self.sync(response.data["token"]).data["posts"], [])
+
+    def test_pages_follow_the_token(self):
+        token = log.head()
+        for post in self.posts:
+            self.change(post)
+        seen = []
+        more = True
+        while more:
+            response = self.sync(token, limit=2)
+            seen += [post["id"] for post in response.data["posts"]]
+            token, more = response.data["token"], response.data["more"]
+        self.assertEqual(seen, [post.id for post in self.posts])
+
+    def test_pruned_and_expired_tokens_are_gone(self):
+        token = log.head()
+        old = self.change(self.posts[0])
+        Change.objects.filter(id=old.id).update(created_at=now() - timedelta(days=30))
+        self.change(self.posts[1])
+
+        self.assertEqual(log.prune(days=7), 1)
+        self.assertEqual(self.sync(token).status_code, 410)
+        fresh = log.head()
+        self.assertEqual(self.sync(fresh).status_code, 200)
+
+        log.expire()
+        self.assertEqual(self.sync(fresh).status_code, 410)
+        self.assertEqual(self.sync(log.head()).status_code, 200)
@@ -0,0 +1,113 @@
+from django.conf import settings
+from rest_framework.views import APIView
+from rest_framework.response import Response
+
+from comments.models import Comment
+from comments.tree import FIELDS, comment_rows
+from counters import sharded
+from posts.models import Post
+from posts.serializers import PostSerializer
+from posts.views import with_counts
+from . import log
+from .models import Change
+
+COMMENT_FIELDS = FIELDS + ("post_id",)
+
+
+def _int_param(request, name):
+    value = request.query_params.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+
+def _latest(changes):
+    """The last change per object; later entries win."""
+    latest = {}
+    for change in changes:
+        latest[change.kind, change.object_id] = change
+    return latest
+
+
+def collect(changes):
+    """The current state of everything ``changes`` touched, as the response
+    body minus the token."""
+    latest = _latest(changes)
+    wanted = {kind: set() for kind in (Change.POST, Change.COMMENT, Change.POST_COUNTS, Change.COMMENT_COUNTS)}
+    deleted = {Change.POST: set(), Change.COMMENT: set()}
+    for (kind, object_id), change in latest.items():
+        if change.deleted:
+            deleted[kind].add(object_id)
+        else:
+            wanted[kind].add(object_id)
+
+    # A post in the page carries its own counts.
+    wanted[Change.POST_COUNTS] -= wanted[Change.POST] | deleted[Change.POST]
+
+    posts = with_counts(
+        Post.objects.filter(id__in=wanted[Change.POST] | wanted[Change.POST_COUNTS], deleted_at__isnull=True)
+        .order_by("id")
+    ) if wanted[Change.POST] or wanted[Change.POST_COUNTS] else []
+    full_posts = [post for post in posts if post.id in wanted[Change.POST]]
+    post_counts = [
+        {
+            "id": post.id, "like_count": post.like_count,
+            "comment_count": post.comment_count, "view_count": post.view_count,
+        }
+        for post in posts if post.id not in wanted[Change.POST]
+    ]
+    # Asked for but no longer there: hidden since the change was written.
+    deleted[Change.POST] |= wanted[Change.POST] - {post.id for post in posts}
+
+    comment_ids = wanted[Change.COMMENT] | wanted[Change.COMMENT_COUNTS]
+    comments = list(comment_rows(
+        Comment.objects.visible().filter(id__in=comment_ids).order_by("id"), COMMENT_FIELDS
+    )) if comment_ids else []
+    full_comments = [dict(zip(COMMENT_FIELDS, row)) for row in comments if row[0] in wanted[Change.COMMENT]]
+    counted = [row[0] for row in comments if row[0] not in wanted[Change.COMMENT]]
+    like_counts = sharded.get_counts(sharded.COMMENT_LIKES, counted)
+    comment_counts = [{"id": comment_id, "like_count": like_counts[comment_id]} for comment_id in counted]
+    deleted[Change.COMMENT] |= wanted[Change.COMMENT] - {row[0] for row in comments}
+
+    return {
+        "posts": PostSerializer(full_posts, many=True).data,
+        "comments": full_comments,
+        "counts": {"posts": post_counts, "comments": comment_counts},
+        "deleted": {"posts": sorted(deleted[Change.POST]), "comments": sorted(deleted[Change.COMMENT])},
+    }
+
+
+class SyncView(APIView):
+    """Everything created, changed or deleted since a token.
+
+    Without ``since`` only the current token is returned: take it, load the
+    feed or comment tree in full, then sync from the token. Pages hold at
+    most ``limit`` changes; keep following ``token`` while ``more`` is
+    true. ``post=<id>`` narrows the log to one post and its comments.
+    A 410 means the token predates the retained log and the client has to
+    load everything again.
+    """
+
+    permission_classes = []
+
+    def get(self, request):
+        try:
+            since = _int_param(request, "since")
+            post_id = _int_param(request, "post")
+            limit = _int_param(request, "limit")
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+        limit = max(1, min(limit or settings.SYNC_PAGE_SIZE, settings.SYNC_MAX_PAGE_SIZE))
+
+        if since is None:
+            return Response({"token": str(log.head()), "more": False})
+        if since < log.horizon():
+            return Response({"error": "Sync token expired; reload everything", "resync": True}, status=410)
+
+        changes, more = log.page(since, limit, post_id)
+        body = {"token": str(changes[-1].seq if changes else since), "more": more}
+        body.update(collect(changes))
+        return Response(body)